@@ -3,34 +3,75 @@
 Exposes API routes including market price retrieval.
 """
 
-from flask import Flask, jsonify, request, make_response
+import time
+
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, jsonify, request, make_response, stream_with_context
 from flask_cors import CORS
-from sqlalchemy import create_engine
 
 # Support both package and script imports
 try:
-    from .market_data import get_international_price, get_morocco_price_iam
+    from .market_data import get_price, get_prices, price_cache, iam_scoreboard
+    from .price_refresher import price_refresher
+    from .http_client import http_client
+    from .price_stream import price_broker, format_sse
     from .routes import api as api_blueprint
-    from .models import Base
-    from .config import SQLALCHEMY_DATABASE_URL
+    from .db import init_schema, pool_stats
+    from . import metrics
+    from .response_cache import response_cache
+    from .chat_cache import chat_cache
+    from .candles import COLUMNS, candle_store, parse_range
+    from .risk import risk_engine
+    from . import auth
+    from .auth import hash_pool
+    from . import startup
+    from .config import DB_AUTO_MIGRATE, RISK_ENGINE_ENABLED
 except ImportError:
-    from market_data import get_international_price, get_morocco_price_iam
+    from market_data import get_price, get_prices, price_cache, iam_scoreboard
+    from price_refresher import price_refresher
+    from http_client import http_client
+    from price_stream import price_broker, format_sse
     from routes import api as api_blueprint
-    from models import Base
-    from config import SQLALCHEMY_DATABASE_URL
+    from db import init_schema, pool_stats
+    import metrics
+    from response_cache import response_cache
+    from chat_cache import chat_cache
+    from candles import COLUMNS, candle_store, parse_range
+    from risk import risk_engine
+    import auth
+    from auth import hash_pool
+    import startup
+    from config import DB_AUTO_MIGRATE, RISK_ENGINE_ENABLED
 
+# Lazily imported dependencies (pandas, yfinance, openai...) now rather than on a user's first request
+startup.preload_modules()
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
-# Ensure database tables exist on startup (dev convenience)
-_connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
-_engine = create_engine(SQLALCHEMY_DATABASE_URL, future=True, connect_args=_connect_args)
-Base.metadata.create_all(bind=_engine)
+# Request latency / DB time per route (registered first so it also sees OPTIONS)
+metrics.init_app(app)
+startup.init_app(app)
+if __name__ == "__main__":
+    app.debug = True  # `python app.py`: local development server (app.run below)
+auth.init_app(app)
+
+# Create / migrate the schema at startup (set DB_AUTO_MIGRATE=0 and run migrations.py as a deploy step instead)
+if DB_AUTO_MIGRATE:
+    init_schema()
 
 # Register API blueprint
 app.register_blueprint(api_blueprint)
 
+# Fan refreshed quotes out to streaming clients
+price_refresher.add_listener(price_broker.publish)
+
+# Revalue open positions on each quote (the engine's sync thread starts with the first request of each worker)
+if RISK_ENGINE_ENABLED:
+    price_refresher.add_listener(risk_engine.on_quote)
+    app.before_request(risk_engine.ensure_started)
+
 @app.before_request
 def _handle_options():
     if request.method == "OPTIONS":
@@ -53,16 +94,216 @@ def api_get_price(ticker: str):
 
     - If `ticker` equals 'IAM' (case-insensitive), uses Morocco scraper.
     - Otherwise, uses yfinance for international tickers.
+
+    The ticker is registered with the background refresher and the latest
+    published quote is returned along with its age in seconds. Only the very
+    first request for a cold ticker waits on an upstream fetch (through the
+    shared TTL cache, so concurrent cold misses share one fetch).
     """
-    try:
-        if ticker.upper() == "IAM":
-            price = get_morocco_price_iam()
+    quote = price_refresher.get(ticker)
+    if quote is None:
+        try:
+            quote = price_refresher.publish(ticker, get_price(ticker))
+        except Exception as e:
+            return jsonify({"ticker": ticker, "error": str(e)}), 502
+    return jsonify({"ticker": ticker, "price": quote.price, "age": round(quote.age, 3)})
+
+
+MAX_BATCH_TICKERS = 50
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+
+def parse_tickers(raw: str):
+    """Parse "A,B,C" into a deduplicated upper-case list. Returns (tickers, error)."""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in raw.split(",") if t.strip()))
+    if not tickers:
+        return [], "paramètre tickers requis"
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return [], f"{MAX_BATCH_TICKERS} tickers maximum"
+    return tickers, None
+
+
+@app.route("/api/prices", methods=["GET"])
+def api_get_prices():
+    """Return current prices for a comma-separated list of tickers.
+
+    Query: ?tickers=AAPL,BTC-USD,IAM
+    Warm tickers come from the background refresher; the remaining ones are
+    fetched with one batched yfinance download while IAM is scraped concurrently.
+    Returns: {"prices": {ticker: {"price", "age"}}, "errors": {ticker: message}}
+    """
+    tickers, error = parse_tickers(request.args.get("tickers", ""))
+    if error:
+        return jsonify({"error": error}), 400
+
+    results = {}
+    cold = []
+    for t in tickers:
+        quote = price_refresher.get(t)
+        if quote is None:
+            cold.append(t)
         else:
-            price = get_international_price(ticker)
-        return jsonify({"ticker": ticker, "price": price})
+            results[t] = {"price": quote.price, "age": round(quote.age, 3)}
+
+    errors = {}
+    if cold:
+        prices, errors = get_prices(cold)
+        for t, px in prices.items():
+            quote = price_refresher.publish(t, px)
+            results[t] = {"price": quote.price, "age": round(quote.age, 3)}
+
+    status = 502 if errors and not results else 200
+    return jsonify({"prices": results, "errors": errors}), status
+
+
+@app.route("/api/candles/<ticker>", methods=["GET"])
+def api_get_candles(ticker: str):
+    """Return OHLCV bars for `ticker` from the local candle store.
+
+    Query: ?interval=1d&start=2026-01-01&end=2026-03-01 (epoch seconds or
+    ISO-8601, UTC; default: the last 500 bars up to now).
+    Only the parts of the range never fetched before are downloaded from
+    yfinance; the rest is sliced straight from the memory-mapped series.
+    Returns columns: {"ticker", "interval", "t": [...], "open": [...], ...}
+    """
+    ticker = ticker.upper()
+    interval = request.args.get("interval", "1d")
+    try:
+        start, end = parse_range(interval, request.args.get("start"), request.args.get("end"))
+        bars = candle_store.candles(ticker, interval, start, end)
+    except ValueError as e:
+        return jsonify({"ticker": ticker, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"ticker": ticker, "error": str(e)}), 502
+    body = {"ticker": ticker, "interval": interval}
+    body.update((name, column.tolist()) for name, column in zip(COLUMNS, bars))
+    body["t"] = [int(t) for t in body["t"]]
+    return jsonify(body)
+
+
+@app.route("/api/stream/prices", methods=["GET"])
+def api_stream_prices():
+    """Stream price updates as Server-Sent Events.
+
+    Query: ?tickers=BTC-USD,IAM
+    Sends the current quotes first, then one `price` event each time the
+    background refresher publishes a changed price, and a comment line every
+    STREAM_HEARTBEAT_SECONDS to keep proxies open and detect disconnects.
+    Run under an async worker class (see Procfile) so an idle stream costs a
+    greenlet instead of a worker.
+    """
+    tickers, error = parse_tickers(request.args.get("tickers", ""))
+    if error:
+        return jsonify({"error": error}), 400
+
+    sub = price_broker.subscribe(tickers)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            for t in tickers:
+                quote = price_refresher.get(t, cold_fetch=False)
+                if quote is not None:
+                    yield format_sse(quote)
+            while True:
+                quotes = sub.wait(STREAM_HEARTBEAT_SECONDS)
+                for t in tickers:  # keep our tickers hot in the refresher
+                    price_refresher.touch(t)
+                if not quotes:
+                    yield ": keepalive\n\n"
+                    continue
+                for quote in quotes:
+                    yield format_sse(quote)
+        finally:
+            sub.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/stream/stats", methods=["GET"])
+def api_stream_stats():
+    """Return pub/sub counters (subscriptions, published, suppressed, deliveries)."""
+    return jsonify(price_broker.stats())
+
+
+@app.route("/api/price-cache/stats", methods=["GET"])
+def api_price_cache_stats():
+    """Return hit/miss/coalesced counters of the shared price cache."""
+    return jsonify(price_cache.stats())
+
+
+@app.route("/api/candle-store/stats", methods=["GET"])
+def api_candles_stats():
+    """Return the candle store counters (series, local hits, bars downloaded)."""
+    return jsonify(candle_store.stats())
+
+
+@app.route("/api/price-sources/stats", methods=["GET"])
+def api_price_sources_stats():
+    """Return the IAM source scoreboard (latency, success rate, last good selector)."""
+    return jsonify(iam_scoreboard.snapshot())
+
+
+@app.route("/api/upstream-http/stats", methods=["GET"])
+def api_upstream_http_stats():
+    """Return outbound HTTP counters (bytes, 304s, connection reuse rate)."""
+    return jsonify(http_client.stats())
+
+
+@app.route("/api/price-refresher/stats", methods=["GET"])
+def api_price_refresher_stats():
+    """Return the hot-ticker registry of the background refresher."""
+    return jsonify(price_refresher.stats())
+
+
+@app.route("/api/risk-engine/stats", methods=["GET"])
+def api_risk_engine_stats():
+    """Return the risk engine gauges (open positions, sweep time, breaches written)."""
+    return jsonify(risk_engine.stats())
+
+
+@app.route("/api/auth/stats", methods=["GET"])
+def api_auth_stats():
+    """Return the password hashing pool gauges (in flight, completed, shed with 503)."""
+    return jsonify(hash_pool.stats())
+
+
+@app.route("/api/db-pool/stats", methods=["GET"])
+def api_db_pool_stats():
+    """Return the database connection pool gauges (checked out, overflow, wait time)."""
+    return jsonify(pool_stats())
+
+
+@app.route("/api/response-cache/stats", methods=["GET"])
+def api_response_cache_stats():
+    """Return the API response cache counters (hits, 304s, invalidations)."""
+    return jsonify(response_cache.stats())
+
+
+@app.route("/api/chat-cache/stats", methods=["GET"])
+def api_chat_cache_stats():
+    """Return the chat answer cache counters (exact / similar hits, latency saved)."""
+    return jsonify(chat_cache.stats())
+
+
+@app.route("/api/startup/stats", methods=["GET"])
+def api_startup_stats():
+    """Return this worker's boot timings (imports, warm-up) and first request latency per route."""
+    return jsonify(startup.report.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (this worker's route, DB, upstream and pool metrics)."""
+    body = metrics.render() + metrics.render_gauges("tradesense_db_pool", "DB connection pool gauge.", pool_stats())
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 
+startup.report.app_import = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,314 @@
+"""ASGI entrypoint: async serving mode for the I/O-bound routes.
+
+The slow routes wait on the network, not the CPU, so in this mode they run as
+coroutines on the worker's event loop instead of holding a sync worker:
+
+- GET  /api/price/<ticker>   (refresher snapshot, else async scrape / yfinance in a thread)
+- GET  /api/prices           (batched, IAM scraped concurrently)
+- GET  /api/stream/prices    (SSE, awaits the price broker: an open stream holds no thread)
+- POST /api/chat             (async OpenAI / Groq clients)
+
+Every other route (trades, auth, leaderboard...) is served by the regular
+Flask app through asgiref's WSGI adapter, on a pool of ASGI_WSGI_THREADS
+threads (asgiref's default runs them all on one thread, one at a time).
+
+Run with:
+    uvicorn asgi:application --workers 2
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:application
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+# Support both package and script imports
+try:
+    from .app import app as flask_app, parse_tickers, STREAM_HEARTBEAT_SECONDS
+    from .price_refresher import price_refresher
+    from .price_stream import format_sse, price_broker
+    from .market_data_async import get_price_async, get_prices_async, aclose as close_market_data
+    from . import llm, metrics
+    from .chat_cache import chat_cache
+    from .config import ASGI_WSGI_THREADS
+except ImportError:
+    from app import app as flask_app, parse_tickers, STREAM_HEARTBEAT_SECONDS
+    from price_refresher import price_refresher
+    from price_stream import format_sse, price_broker
+    from market_data_async import get_price_async, get_prices_async, aclose as close_market_data
+    import llm
+    import metrics
+    from chat_cache import chat_cache
+    from config import ASGI_WSGI_THREADS
+
+
+_CORS_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-headers", b"Content-Type, Authorization"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+]
+
+_wsgi_pool = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix="wsgi")
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI call on one shared thread (thread_sensitive=True)
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False, executor=_wsgi_pool
+    )
+
+
+class _PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi serving requests concurrently on `_wsgi_pool`."""
+
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+_wsgi = _PooledWsgiToAsgi(flask_app)
+
+
+async def _send_json(send: Callable[[dict], Awaitable[None]], payload: object, status: int = 200) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + _CORS_HEADERS,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def price(scope, receive, send, ticker: str) -> None:
+    quote = price_refresher.get(ticker)
+    if quote is None:
+        try:
+            quote = price_refresher.publish(ticker, await get_price_async(ticker))
+        except Exception as e:
+            await _send_json(send, {"ticker": ticker, "error": str(e)}, 502)
+            return
+    await _send_json(send, {"ticker": ticker, "price": quote.price, "age": round(quote.age, 3)})
+
+
+async def prices(scope, receive, send) -> None:
+    query = parse_qs(scope.get("query_string", b"").decode())
+    tickers, error = parse_tickers(",".join(query.get("tickers", [])))
+    if error:
+        await _send_json(send, {"error": error}, 400)
+        return
+
+    results: Dict[str, dict] = {}
+    cold = []
+    for t in tickers:
+        quote = price_refresher.get(t)
+        if quote is None:
+            cold.append(t)
+        else:
+            results[t] = {"price": quote.price, "age": round(quote.age, 3)}
+
+    errors: Dict[str, str] = {}
+    if cold:
+        fetched, errors = await get_prices_async(cold)
+        for t, px in fetched.items():
+            quote = price_refresher.publish(t, px)
+            results[t] = {"price": quote.price, "age": round(quote.age, 3)}
+
+    status = 502 if errors and not results else 200
+    await _send_json(send, {"prices": results, "errors": errors}, status)
+
+
+async def chat(scope, receive, send) -> None:
+    try:
+        data = json.loads(await _read_body(receive) or b"{}") or {}
+    except ValueError:
+        data = {}
+    text = str(data.get("message") or "").strip() if isinstance(data, dict) else ""
+    if not text:
+        await _send_json(send, {"error": "message requis"}, 400)
+        return
+
+    accept = dict(scope.get("headers") or []).get(b"accept", b"")
+    wants_stream = bool(data.get("stream")) or accept.startswith(b"text/event-stream")
+    hit = chat_cache.get(text)
+    if not wants_stream:
+        if hit is not None:
+            await _send_json(send, {"reply": hit[0]})
+            return
+        try:
+            started = time.perf_counter()
+            info: dict = {}
+            tokens = llm.stream_reply_async(text, info=info)
+            try:
+                reply = "".join([delta async for delta in tokens]).strip() or llm.FALLBACK_REPLY
+            finally:
+                await tokens.aclose()
+            if info["completed"]:  # not the fallback, not cut short by an error or a stall
+                chat_cache.put(text, reply, time.perf_counter() - started)
+            await _send_json(send, {"reply": reply})
+        except Exception as e:
+            await _send_json(send, {"error": str(e)}, 502)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")] + _CORS_HEADERS,
+    })
+
+    if hit is not None:
+        body = llm.sse_event("token", {"t": hit[0]}) + llm.sse_event("done", {"provider": "cache"})
+        await send({"type": "http.response.body", "body": body.encode()})
+        return
+
+    async def stream() -> None:
+        started = time.perf_counter()
+        info: dict = {}
+        parts = []
+        tokens = llm.stream_reply_async(text, info=info)
+        try:
+            async for delta in tokens:
+                parts.append(delta)
+                await send({"type": "http.response.body", "body": llm.sse_event("token", {"t": delta}).encode(),
+                            "more_body": True})
+        finally:
+            await tokens.aclose()
+        if info["completed"]:
+            chat_cache.put(text, "".join(parts).strip(), time.perf_counter() - started)
+        await send({"type": "http.response.body",
+                    "body": llm.sse_event("done", {"provider": info["provider"]}).encode()})
+
+    await _until_disconnect(receive, stream())  # a disconnect aborts the upstream streams
+
+
+async def stream_prices(scope, receive, send) -> None:
+    """Native twin of the Flask /api/stream/prices route (same events)."""
+    query = parse_qs(scope.get("query_string", b"").decode())
+    tickers, error = parse_tickers(",".join(query.get("tickers", [])))
+    if error:
+        await _send_json(send, {"error": error}, 400)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")] + _CORS_HEADERS,
+    })
+
+    async def events(sub) -> None:
+        first = "retry: 3000\n\n"
+        for t in tickers:
+            quote = price_refresher.get(t, cold_fetch=False)
+            if quote is not None:
+                first += format_sse(quote)
+        await send({"type": "http.response.body", "body": first.encode(), "more_body": True})
+        while True:
+            quotes = await sub.wait_async(STREAM_HEARTBEAT_SECONDS)
+            for t in tickers:  # keep our tickers hot in the refresher
+                price_refresher.touch(t)
+            body = "".join(format_sse(quote) for quote in quotes) if quotes else ": keepalive\n\n"
+            await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+
+    sub = price_broker.subscribe(tickers)
+    try:
+        await _until_disconnect(receive, events(sub))
+    finally:
+        sub.close()
+
+
+async def _until_disconnect(receive, coro) -> None:
+    """Run `coro` until it returns or the client disconnects (then it is cancelled)."""
+    task = asyncio.ensure_future(coro)
+
+    async def watch_disconnect() -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                task.cancel()
+                return
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await task
+    except asyncio.CancelledError:
+        if not task.cancelled():
+            raise
+    finally:
+        watcher.cancel()
+
+
+async def _timed(handler, route: str, scope, receive, send, *args) -> None:
+    """Run a native handler, recording its latency and status like the Flask hooks do."""
+    started = time.perf_counter()
+    status = 500
+
+    async def send_with_status(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_with_status, *args)
+    finally:
+        metrics.http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+        metrics.http_requests.inc(scope["method"], route, str(status))
+
+
+_PRICE_RE = re.compile(r"^/api/price/([^/]+)$")
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_market_data()
+            await llm.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send) -> None:
+    """Dispatch async routes natively and everything else to the Flask app."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] == "http":
+        method, path = scope["method"], scope["path"]
+        if method == "GET":
+            m = _PRICE_RE.match(path)
+            if m:
+                await _timed(price, "/api/price/<ticker>", scope, receive, send, m.group(1))
+                return
+            if path == "/api/prices":
+                await _timed(prices, "/api/prices", scope, receive, send)
+                return
+            if path == "/api/stream/prices":
+                # Not timed: its duration is the client's, not the server's
+                metrics.http_requests.inc(method, "/api/stream/prices", "200")
+                await stream_prices(scope, receive, send)
+                return
+        elif method == "POST" and path == "/api/chat":
+            await _timed(chat, "/api/chat", scope, receive, send)
+            return
+    await _wsgi(scope, receive, send)
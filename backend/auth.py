@@ -0,0 +1,201 @@
+"""Password hashing off the request path, and signed login tokens.
+
+werkzeug's password hashes are deliberately slow key derivations (hundreds
+of milliseconds of CPU). Run inline they stall the whole worker (with gevent,
+every other connection of the worker waits behind it), so a burst of logins
+starves cheap requests. Hashing and checking go through a small process pool
+instead:
+
+- at most AUTH_HASH_WORKERS hashes run at once, plus AUTH_HASH_QUEUE waiting
+- past that, HashPoolBusy is raised at once and the route answers 503 with
+  Retry-After rather than queueing work nobody will wait for
+
+A successful login returns a token (itsdangerous, HMAC-SHA1 over the user id
+and role, with a timestamp) valid AUTH_TOKEN_TTL seconds; token_claims()
+authenticates later requests from the Authorization header by checking the
+signature, without a database round trip. The signing key is SECRET_KEY:
+init_app() refuses to start without it unless the app is in debug mode,
+where a random per-process key is used.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import AUTH_HASH_WORKERS, AUTH_HASH_QUEUE, AUTH_HASH_TIMEOUT, AUTH_TOKEN_TTL, SECRET_KEY
+except ImportError:
+    from config import AUTH_HASH_WORKERS, AUTH_HASH_QUEUE, AUTH_HASH_TIMEOUT, AUTH_TOKEN_TTL, SECRET_KEY
+
+
+class HashPoolBusy(Exception):
+    """Too many password hashes queued (or the pool failed one); the request should be shed."""
+
+
+def _check(pwhash: str, password: str) -> bool:
+    return check_password_hash(pwhash, password)
+
+
+class HashPool:
+    """Bounded process pool for password hashing, with fast rejection when full."""
+
+    def __init__(self, workers: int = AUTH_HASH_WORKERS, queue: int = AUTH_HASH_QUEUE,
+                 timeout: float = AUTH_HASH_TIMEOUT) -> None:
+        self.workers = workers
+        self.limit = workers + queue
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_time = 0.0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # One pool per process: a pool inherited through fork has no live workers
+        if self._pool is None or self._pid != os.getpid():
+            # spawn: the caller may be a threaded or gevent web worker, which must not fork
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pid = os.getpid()
+        return self._pool
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    def _shed(self, broken_pool: Optional[ProcessPoolExecutor] = None) -> HashPoolBusy:
+        with self._lock:
+            # A worker died (OOM kill...): start a fresh pool on the next call
+            if broken_pool is not None and self._pool is broken_pool:
+                self._pool = None
+            self.rejected += 1
+        return HashPoolBusy()
+
+    def _call(self, fn, *args):
+        with self._lock:
+            if self._inflight >= self.limit:
+                self.rejected += 1
+                raise HashPoolBusy()
+            self._inflight += 1
+            pool = self._executor() if self.workers > 0 else None
+        started = time.perf_counter()
+        if pool is None:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+        else:
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._release()
+                raise self._shed(pool) from None
+            # The slot is freed when the job ends (or is cancelled), not when we stop waiting for it,
+            # so timed-out hashes still count against the limit while they run
+            future.add_done_callback(self._release)
+            try:
+                result = future.result(timeout=self.timeout)
+            except FutureTimeout:
+                future.cancel()  # dropped if still queued; a running hash keeps its slot until done
+                raise self._shed() from None
+            except BrokenProcessPool:
+                raise self._shed(pool) from None
+        with self._lock:
+            self.completed += 1
+            self.busy_time += time.perf_counter() - started
+        return result
+
+    def hash(self, password: str) -> str:
+        return self._call(generate_password_hash, password)
+
+    def check(self, pwhash: str, password: str) -> bool:
+        return self._call(_check, pwhash, password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "limit": self.limit,
+                "inflight": self._inflight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.busy_time / self.completed * 1e3, 2) if self.completed else 0.0,
+            }
+
+
+hash_pool = HashPool()
+
+_serializer: Optional[URLSafeTimedSerializer] = None
+
+
+def init_app(app) -> None:
+    """Set up token signing; without SECRET_KEY only a debug app may start (random per-process key)."""
+    global _serializer
+    key = SECRET_KEY
+    if not key:
+        if not app.debug:
+            raise RuntimeError("SECRET_KEY doit être défini: il signe les jetons d'authentification")
+        app.logger.warning("SECRET_KEY absent: clé aléatoire de développement (jetons non partagés)")
+        key = os.urandom(32).hex()
+    _serializer = URLSafeTimedSerializer(key, salt="tradesense-auth")
+
+
+def _signer() -> URLSafeTimedSerializer:
+    if _serializer is None:
+        raise RuntimeError("auth.init_app() n'a pas été appelé")
+    return _serializer
+
+
+def issue_token(user_id: int, role: str) -> str:
+    return _signer().dumps({"uid": user_id, "role": role})
+
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """Claims ({"uid", "role"}) of a valid, unexpired token, else None."""
+    try:
+        return _signer().loads(token, max_age=AUTH_TOKEN_TTL)
+    except (SignatureExpired, BadSignature):
+        return None
+
+
+def token_claims() -> Optional[Dict[str, Any]]:
+    """Claims of the request's "Authorization: Bearer <token>" header, verified once per request."""
+    if "auth_claims" not in g:
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        g.auth_claims = verify_token(token.strip()) if scheme.lower() == "bearer" and token.strip() else None
+    return g.auth_claims
+
+
+def auth_required(role: Optional[str] = None):
+    """Reject the request with 401 (no / bad token) or 403 (wrong role)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            claims = token_claims()
+            if claims is None:
+                return jsonify({"error": "Authentification requise"}), 401
+            if role is not None and claims.get("role") != role:
+                return jsonify({"error": "Accès refusé"}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
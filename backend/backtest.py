@@ -0,0 +1,294 @@
+"""Vectorized backtests of the challenge rules over the stored trades.
+
+Answers "what if" questions ("how many challenges would have failed with a
+4% daily limit?", "and with an 8% profit target?") without replaying trades
+through the ORM:
+
+- the trades table is read once into NumPy arrays sorted by
+  (challenge_id, timestamp, id)
+- running equity per challenge is one cumulative sum minus each challenge's
+  offset; the daily baseline is the equity before the first trade of each
+  UTC day, forward-filled over the day
+- for each distinct threshold of a rule, the first breaching trade of every
+  challenge comes from one np.minimum.reduceat; a grid combination is then
+  the earliest of its three rules' first breaches, so a D x T x P grid costs
+  D + T + P passes over the trades instead of D * T * P replays
+- challenges are split into shards evaluated on several processes
+
+Semantics match services.fold_trades: rules are checked after every trade in
+the order total loss, daily loss, profit target, and the first trigger is
+final. A grid value of None means "each challenge's own limit" (for the
+profit target: services.PROFIT_TARGET).
+
+Usage (from backend/):
+    python backtest.py --daily 0.03,0.04,0.05 --target 0.08,0.1 [--workers 4] [--json]
+The admin API is POST /api/admin/backtest (routes.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# Flexible imports whether run as a package or a script
+try:
+    from .models import Trade, UserChallenge
+    from .services import PROFIT_TARGET
+    from .config import BACKTEST_WORKERS, BACKTEST_MAX_GRID
+except ImportError:
+    from models import Trade, UserChallenge
+    from services import PROFIT_TARGET
+    from config import BACKTEST_WORKERS, BACKTEST_MAX_GRID
+
+# (daily_loss_limit, total_loss_limit, profit_target); None = the challenge's own value
+Params = Tuple[Optional[float], Optional[float], Optional[float]]
+
+# One process evaluates ~5M trades x 100 combinations per second; below this
+# size starting a pool of fresh interpreters costs more than it saves
+_PARALLEL_MIN_TRADES = 2_000_000
+
+
+class BacktestData:
+    """Trades sorted by (challenge, timestamp, id) plus per-challenge figures.
+
+    Per challenge: challenge_ids, start_balance, daily_loss_limit,
+    total_loss_limit, counts (its number of trades, in row order).
+    Per trade: pnl, day (UTC days since epoch), ts (datetime64[s]).
+    """
+
+    __slots__ = ("challenge_ids", "start_balance", "daily_loss_limit", "total_loss_limit", "counts",
+                 "pnl", "day", "ts")
+
+    def __init__(self, challenge_ids, start_balance, daily_loss_limit, total_loss_limit, counts, pnl, ts) -> None:
+        self.challenge_ids = challenge_ids
+        self.start_balance = start_balance
+        self.daily_loss_limit = daily_loss_limit
+        self.total_loss_limit = total_loss_limit
+        self.counts = counts
+        self.pnl = pnl
+        self.ts = ts
+        self.day = ts.astype("datetime64[D]").astype(np.int64)
+
+    def shard(self, lo: int, hi: int) -> "BacktestData":
+        """Challenges lo..hi-1 and their trades."""
+        offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        rows = slice(offsets[lo], offsets[hi])
+        return BacktestData(
+            self.challenge_ids[lo:hi], self.start_balance[lo:hi], self.daily_loss_limit[lo:hi],
+            self.total_loss_limit[lo:hi], self.counts[lo:hi], self.pnl[rows], self.ts[rows],
+        )
+
+
+def load(session: Session, chunk_size: int = 50_000) -> BacktestData:
+    """Read every challenge and closed trade into arrays (trades streamed in chunks)."""
+    challenges = session.execute(
+        select(UserChallenge.id, UserChallenge.start_balance, UserChallenge.daily_loss_limit,
+               UserChallenge.total_loss_limit).order_by(UserChallenge.id)
+    ).all()
+    ids = np.array([c.id for c in challenges], dtype=np.int64)
+
+    stmt = (
+        select(Trade.challenge_id, Trade.timestamp, Trade.profit_loss)
+        .where(Trade.profit_loss.isnot(None))
+        .order_by(Trade.challenge_id, Trade.timestamp, Trade.id)
+    )
+    conn = session.connection()
+    # Raw driver rows (no per-value type processing), streamed with a server-side cursor where supported;
+    # timestamps come back as datetimes (psycopg2) or ISO strings (sqlite3), both parsed by NumPy
+    result = conn.execution_options(stream_results=True).exec_driver_sql(str(stmt.compile(dialect=conn.dialect)))
+    cids, stamps, pnls = [], [], []
+    for part in result.partitions(chunk_size):
+        cid, ts, pnl = zip(*part)
+        cids.append(np.array(cid, dtype=np.int64))
+        stamps.append(np.array(ts, dtype="datetime64[s]"))
+        pnls.append(np.array(pnl, dtype=np.float64))
+    cid = np.concatenate(cids) if cids else np.empty(0, dtype=np.int64)
+
+    trade_ids, trade_counts = np.unique(cid, return_counts=True)
+    counts = np.zeros(len(ids), dtype=np.int64)
+    counts[np.searchsorted(ids, trade_ids)] = trade_counts
+    return BacktestData(
+        ids,
+        np.array([c.start_balance for c in challenges], dtype=np.float64),
+        np.array([c.daily_loss_limit for c in challenges], dtype=np.float64),
+        np.array([c.total_loss_limit for c in challenges], dtype=np.float64),
+        counts,
+        np.concatenate(pnls) if pnls else np.empty(0, dtype=np.float64),
+        np.concatenate(stamps) if stamps else np.empty(0, dtype="datetime64[s]"),
+    )
+
+
+def _first_breach(mask: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Row index of the first True of each group (len(mask) where there is none)."""
+    n = len(mask)
+    return np.minimum.reduceat(np.where(mask, np.arange(n), n), starts)
+
+
+def evaluate(data: BacktestData, grid: Sequence[Params]) -> List[Dict[str, float]]:
+    """Outcome counts of every grid combination over `data` (one shard or everything)."""
+    traded = data.counts > 0
+    counts = data.counts[traded]
+    n = len(data.pnl)
+    totals = [
+        {"passed": 0, "failed": 0, "failed_daily": 0, "failed_total": 0, "active": int((~traded).sum()),
+         "days_to_breach": 0.0}
+        for _ in grid
+    ]
+    if not n:
+        return totals
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    start_balance = np.repeat(data.start_balance[traded], counts)
+
+    cum = np.cumsum(data.pnl)
+    equity = start_balance + cum - np.repeat(cum[starts] - data.pnl[starts], counts)
+    new_day = np.empty(n, dtype=bool)
+    new_day[0] = True
+    new_day[1:] = data.day[1:] != data.day[:-1]
+    new_day[starts] = True
+    baseline = (equity - data.pnl)[np.maximum.accumulate(np.where(new_day, np.arange(n), 0))]
+
+    def per_row(values: np.ndarray, value: Optional[float]) -> Any:
+        return np.repeat(values[traded], counts) if value is None else value
+
+    total_first = {v: _first_breach(equity <= start_balance * (1.0 - per_row(data.total_loss_limit, v)), starts)
+                   for v in {p[1] for p in grid}}
+    daily_first = {v: _first_breach(equity <= baseline * (1.0 - per_row(data.daily_loss_limit, v)), starts)
+                   for v in {p[0] for p in grid}}
+    target_first = {v: _first_breach(equity >= start_balance * (1.0 + (PROFIT_TARGET if v is None else v)), starts)
+                    for v in {p[2] for p in grid}}
+
+    first_ts = data.ts[starts]
+    for out, (daily, total, target) in zip(totals, grid):
+        ft, fd, fp = total_first[total], daily_first[daily], target_first[target]
+        fail = np.minimum(ft, fd)
+        first = np.minimum(fail, fp)
+        breached = first < n
+        failed = breached & (fail <= fp)  # a loss rule is checked before the target on the same trade
+        failed_total = failed & (ft == first)
+        days = (data.ts[first[breached]] - first_ts[breached]).astype(np.float64) / 86400.0
+        out["failed"] = int(failed.sum())
+        out["failed_total"] = int(failed_total.sum())
+        out["failed_daily"] = out["failed"] - out["failed_total"]
+        out["passed"] = int(breached.sum()) - out["failed"]
+        out["active"] += len(counts) - int(breached.sum())
+        out["days_to_breach"] = float(days.sum())
+    return totals
+
+
+def _evaluate_shard(args: Tuple[BacktestData, Sequence[Params]]) -> List[Dict[str, float]]:
+    return evaluate(*args)
+
+
+def _shards(data: BacktestData, parts: int) -> List[BacktestData]:
+    """Split into `parts` contiguous runs of challenges holding about the same number of trades."""
+    bounds = np.searchsorted(np.cumsum(data.counts), np.linspace(0, len(data.pnl), parts + 1)[1:-1])
+    edges = [0, *sorted(set(int(b) + 1 for b in bounds)), len(data.counts)]
+    return [data.shard(lo, hi) for lo, hi in zip(edges, edges[1:]) if hi > lo]
+
+
+def make_grid(daily: Sequence[Optional[float]] = (None,), total: Sequence[Optional[float]] = (None,),
+              target: Sequence[Optional[float]] = (None,)) -> List[Params]:
+    """Cartesian product of the rule values. Raises ValueError on an invalid grid."""
+    for name, values in (("daily_loss_limit", daily), ("total_loss_limit", total), ("profit_target", target)):
+        if not values:
+            raise ValueError(f"{name}: au moins une valeur attendue")
+        for v in values:
+            if v is not None and not 0.0 < v <= 1.0:
+                raise ValueError(f"{name}: valeurs attendues entre 0 et 1 (ex: 0.05 pour 5%)")
+    grid = list(itertools.product(daily, total, target))
+    if len(grid) > BACKTEST_MAX_GRID:
+        raise ValueError(f"grille trop grande ({len(grid)} combinaisons, {BACKTEST_MAX_GRID} maximum)")
+    return grid
+
+
+def run(data: BacktestData, grid: Sequence[Params], workers: int = BACKTEST_WORKERS) -> Dict[str, Any]:
+    """Evaluate `grid` over `data`, in parallel when the data is large enough."""
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if workers > 1 and len(data.pnl) >= _PARALLEL_MIN_TRADES:
+        shards = _shards(data, workers * 2)
+        # spawn: the caller may be a threaded or gevent web worker, which must not fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            partials = list(pool.map(_evaluate_shard, [(shard, grid) for shard in shards]))
+    else:
+        workers = 1
+        partials = [evaluate(data, grid)]
+
+    results = []
+    for i, (daily, total, target) in enumerate(grid):
+        merged = {key: sum(p[i][key] for p in partials) for key in partials[0][i]}
+        breached = merged["passed"] + merged["failed"]
+        days = merged.pop("days_to_breach")
+        results.append({
+            "daily_loss_limit": daily,
+            "total_loss_limit": total,
+            "profit_target": target,
+            **merged,
+            "avg_days_to_breach": round(days / breached, 3) if breached else None,
+        })
+    return {
+        "challenges": len(data.counts),
+        "trades": len(data.pnl),
+        "workers": workers,
+        "eval_ms": round((time.perf_counter() - started) * 1e3, 1),
+        "results": results,
+    }
+
+
+def backtest(session: Session, grid: Sequence[Params], workers: int = BACKTEST_WORKERS) -> Dict[str, Any]:
+    """Load the trades and evaluate `grid` (see make_grid)."""
+    started = time.perf_counter()
+    data = load(session)
+    load_ms = round((time.perf_counter() - started) * 1e3, 1)
+    return {"load_ms": load_ms, **run(data, grid, workers)}
+
+
+def _parse_values(raw: str) -> List[Optional[float]]:
+    """'0.03,0.04,own' -> [0.03, 0.04, None]."""
+    return [None if v.strip().lower() in {"", "own"} else float(v) for v in raw.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--daily", default="own", help="daily loss limits, e.g. 0.03,0.04,0.05 ('own' = per challenge)")
+    parser.add_argument("--total", default="own", help="total loss limits ('own' = per challenge)")
+    parser.add_argument("--target", default="own", help=f"profit targets ('own' = {PROFIT_TARGET})")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS, help="processes (0 = all cores)")
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    try:
+        from .db import SessionLocal
+    except ImportError:
+        from db import SessionLocal
+
+    grid = make_grid(_parse_values(args.daily), _parse_values(args.total), _parse_values(args.target))
+    with SessionLocal() as session:
+        report = backtest(session, grid, args.workers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['challenges']:,} challenges, {report['trades']:,} trades "
+          f"(load {report['load_ms']:.0f} ms, eval {report['eval_ms']:.0f} ms on {report['workers']} process(es))")
+    fmt = "{:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>10}"
+    print(fmt.format("daily", "total", "target", "passed", "failed", "f_daily", "f_total", "active", "avg_days"))
+    for r in report["results"]:
+        print(fmt.format(*("own" if r[k] is None else r[k] for k in ("daily_loss_limit", "total_loss_limit", "profit_target")),
+                         r["passed"], r["failed"], r["failed_daily"], r["failed_total"], r["active"],
+                         "-" if r["avg_days_to_breach"] is None else r["avg_days_to_breach"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark /api/chat in sync (gunicorn sync worker) vs async (uvicorn ASGI) mode.
+
+Both modes run one worker process against a local OpenAI-compatible stub with
+a fixed upstream latency, and are driven by the same number of concurrent
+asyncio clients. Reports requests per second and p50/p99 latency.
+
+Usage (from backend/, needs gunicorn, uvicorn, openai installed):
+    python benchmarks/bench_asgi.py [--concurrency 200] [--duration 15] [--latency 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from stubs import serve_stub  # noqa: E402
+
+BODY = json.dumps({"message": "Qu'est-ce qu'un stop loss ?"}).encode()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def _client(port: int, stop: float, latencies: list, errors: list) -> None:
+    request = (
+        f"POST /api/chat HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(BODY)}\r\nConnection: close\r\n\r\n"
+    ).encode() + BODY
+    while time.time() < stop:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            raw = await asyncio.wait_for(reader.read(), timeout=60)
+            writer.close()
+            if not raw.startswith(b"HTTP/1.1 200") and not raw.startswith(b"HTTP/1.0 200"):
+                errors.append(raw[:40])
+                continue
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def _drive(port: int, concurrency: int, duration: float) -> dict:
+    latencies: list = []
+    errors: list = []
+
+    async def run():
+        stop = time.time() + duration
+        await asyncio.gather(*[_client(port, stop, latencies, errors) for _ in range(concurrency)])
+
+    t0 = time.time()
+    asyncio.run(run())
+    elapsed = time.time() - t0
+    latencies.sort()
+    pct = lambda q: round(latencies[int(q * (len(latencies) - 1))] * 1e3, 1) if latencies else None  # noqa: E731
+    return {"requests": len(latencies), "errors": len(errors), "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": pct(0.5), "p99_ms": pct(0.99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub upstream latency (s)")
+    args = parser.parse_args()
+
+    base_url, _stub = serve_stub(latency=args.latency)
+    env = dict(os.environ, SECRET_KEY="bench-secret", OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"{base_url}/v1")
+    env.pop("GROQ_API_KEY", None)
+
+    modes = {
+        "sync": [sys.executable, "-m", "gunicorn", "-w", "1", "--timeout", "120", "--backlog", "4096",
+                 "--log-level", "warning", "-b", "127.0.0.1:{port}", "app:app"],
+        "async": [sys.executable, "-m", "uvicorn", "asgi:application", "--workers", "1",
+                  "--log-level", "warning", "--backlog", "4096", "--port", "{port}"],
+    }
+    for mode, cmd in modes.items():
+        port = _free_port()
+        proc = subprocess.Popen([c.format(port=port) for c in cmd], cwd=BACKEND, env=env)
+        try:
+            _wait_port(port)
+            result = _drive(port, args.concurrency, args.duration)
+            print(json.dumps({"mode": mode, "concurrency": args.concurrency,
+                              "upstream_latency_ms": args.latency * 1e3, **result}))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
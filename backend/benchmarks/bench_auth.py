@@ -0,0 +1,142 @@
+"""Login storm: inline password hashing vs the bounded hashing pool (auth.py).
+
+Starts `gunicorn -k gevent -w 1 app:app` on a temporary SQLite database,
+once per mode, registers one account, then for --duration seconds:
+
+- --logins clients post /api/login back to back (the storm)
+- one probe calls GET /api/me with a bearer token every 20 ms; it needs no
+  hashing and no database, so its latency is pure worker responsiveness
+
+Modes: inline (AUTH_HASH_WORKERS=0, hashing on the gevent hub, as before)
+and pool (AUTH_HASH_WORKERS=--workers, AUTH_HASH_QUEUE=--queue). Reports
+probe p50 / p95 / p99, and the logins served (200) and shed (503).
+
+Usage (from backend/, needs gunicorn and gevent installed):
+    python benchmarks/bench_auth.py [--logins 16] [--duration 10] [--workers 2] [--queue 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL, PASSWORD = "storm@example.com", "correct horse battery staple"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(port: int, method: str, path: str, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json", **(headers or {})})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def _wait_ready(port: int) -> None:
+    for _ in range(100):
+        try:
+            _request(port, "GET", "/api/auth/stats")
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not start")
+
+
+def _pct(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3 if samples else 0.0
+
+
+def _run_mode(mode: str, args) -> dict:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL="sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_auth.db"),
+        AUTH_HASH_WORKERS="0" if mode == "inline" else str(args.workers),
+        AUTH_HASH_QUEUE=str(args.queue),
+        RISK_ENGINE_ENABLED="0",
+        SECRET_KEY="bench-secret",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", "1", "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "app:app"],
+        cwd=BACKEND,
+        env=env,
+    )
+    try:
+        _wait_ready(port)
+        _request(port, "POST", "/api/register", {"name": "storm", "email": EMAIL, "password": PASSWORD})
+        status, body = _request(port, "POST", "/api/login", {"email": EMAIL, "password": PASSWORD})
+        token = json.loads(body)["token"]
+
+        stop = time.time() + args.duration
+        statuses: dict = {}
+        probe: list = []
+        lock = threading.Lock()
+
+        def storm():
+            while time.time() < stop:
+                status, _ = _request(port, "POST", "/api/login", {"email": EMAIL, "password": PASSWORD})
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                if status == 503:
+                    time.sleep(0.1)  # a client backing off on Retry-After
+
+        def prober():
+            while time.time() < stop:
+                started = time.perf_counter()
+                _request(port, "GET", "/api/me", headers={"Authorization": f"Bearer {token}"})
+                probe.append(time.perf_counter() - started)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=storm) for _ in range(args.logins)] + [threading.Thread(target=prober)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        probe.sort()
+        return {
+            "mode": mode,
+            "probe_p50_ms": round(_pct(probe, 0.50), 2),
+            "probe_p95_ms": round(_pct(probe, 0.95), 2),
+            "probe_p99_ms": round(_pct(probe, 0.99), 2),
+            "probes": len(probe),
+            "logins_ok": statuses.get(200, 0),
+            "logins_shed": statuses.get(503, 0),
+            "other": {k: v for k, v in statuses.items() if k not in (200, 503)},
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=4)
+    args = parser.parse_args()
+    for mode in ("inline", "pool"):
+        print(json.dumps(_run_mode(mode, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Trade export: streamed from a server-side cursor vs loaded through the ORM.
+
+Seeds a SQLite database (benchmarks/seed.py) with --trades trades on
+--challenges challenges, then, for the challenge with the most trades:
+
+- orm: session.query(Trade).filter_by(challenge_id=...).all(), then the CSV
+  built in memory (what an admin export had to do without the endpoint)
+- stream: GET /api/challenges/<id>/trades/export, consumed chunk by chunk
+  through the Flask test client (unbuffered)
+
+Reports rows, time to first byte, total time, rows/s and the Python heap
+peak (tracemalloc) of each, plus the pages of GET /api/challenges/<id>/trades.
+
+Usage (from backend/):
+    python benchmarks/bench_export.py [--trades 1000000] [--challenges 20] [--db sqlite:////tmp/export.db]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def _measure(fn) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows, first = fn(started)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "first_byte_ms": round(first * 1e3, 1),
+        "total_s": round(total, 2),
+        "rows_per_s": round(rows / total) if total else 0,
+        "heap_peak_mb": round(peak / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database URL (default: temporary SQLite, seeded)")
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--challenges", type=int, default=20)
+    parser.add_argument("--page", type=int, default=500)
+    args = parser.parse_args()
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_export.db")
+    if not args.db:
+        from seed import seed
+
+        seed(url, users=10, challenges=args.challenges, trades=args.trades, quiet=True)
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("RISK_ENGINE_ENABLED", "0")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+    from sqlalchemy import func, select
+
+    from app import app
+    from auth import issue_token
+    from db import SessionLocal
+    from models import Trade
+
+    session = SessionLocal()
+    challenge_id = session.execute(
+        select(Trade.challenge_id).group_by(Trade.challenge_id).order_by(func.count().desc()).limit(1)
+    ).scalar_one()
+    session.close()
+    headers = {"Authorization": f"Bearer {issue_token(0, 'admin')}"}
+    client = app.test_client()
+
+    def orm(started):
+        session = SessionLocal()
+        try:
+            trades = session.query(Trade).filter_by(challenge_id=challenge_id).order_by(Trade.timestamp, Trade.id).all()
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            for t in trades:
+                writer.writerow((t.id, t.symbol, t.type.value, t.quantity, t.open_price, t.close_price,
+                                 t.profit_loss, t.timestamp.isoformat()))
+            first = time.perf_counter() - started
+            return len(trades), first
+        finally:
+            session.close()
+
+    def stream(started):
+        resp = client.get(f"/api/challenges/{challenge_id}/trades/export", headers=headers, buffered=False)
+        first, lines = None, -1  # minus the header
+        for chunk in resp.response:
+            if first is None:
+                first = time.perf_counter() - started
+            lines += chunk.count(b"\n") if isinstance(chunk, bytes) else chunk.count("\n")
+        resp.close()
+        return lines, first
+
+    def pages(started):
+        cursor, rows, first = None, 0, None
+        while True:
+            query = f"?limit={args.page}" + (f"&cursor={cursor}" if cursor else "")
+            body = client.get(f"/api/challenges/{challenge_id}/trades{query}", headers=headers).get_json()
+            if first is None:
+                first = time.perf_counter() - started
+            rows += len(body["trades"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return rows, first
+
+    for name, fn in (("orm", orm), ("stream", stream), ("pages", pages)):
+        print(json.dumps({"mode": name, "challenge_id": challenge_id, **_measure(fn)}))
+
+
+if __name__ == "__main__":
+    main()
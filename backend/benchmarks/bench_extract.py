@@ -0,0 +1,99 @@
+"""Benchmark IAM price extraction over saved HTML fixtures.
+
+Compares the legacy approach (full BeautifulSoup tree, every selector, then
+text scans) with html_extract.PriceExtractor, cold (first page seen) and warm
+(the last good strategy, as kept by the scoreboard, tried first). Reports
+time and peak allocated memory per quote.
+
+Usage (from backend/):
+    python benchmarks/bench_extract.py [--runs 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from html_extract import BS_PARSER, PriceExtractor, parse_float  # noqa: E402
+from market_data import IAM_SOURCES  # noqa: E402
+
+
+def legacy_extract(html: str, selectors):
+    """The pre-extractor scraping logic, kept here as the baseline."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for sel in selectors:
+        el = soup.select_one(sel)
+        if el:
+            price = parse_float(el.get_text(strip=True))
+            if price is not None:
+                return price
+    for t in soup.find_all(string=re.compile(r"IAM|Itissalat", re.IGNORECASE)):
+        price = parse_float(t)
+        if price is not None:
+            return price
+    all_text = soup.get_text(" ", strip=True)
+    for m in re.finditer(r"(?i)(cours|dernier|prix).*?(\d+[\.,]\d+)", all_text):
+        price = parse_float(m.group(0))
+        if price is not None:
+            return price
+    return None
+
+
+def measure(fn, runs: int):
+    """Return (median seconds, peak KiB) for one call of `fn`."""
+    fn()  # warm imports and caches
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"parser for fragments: {BS_PARSER}")
+    print(f"{'source':<12} {'mode':<8} {'price':>8} {'strategy':<20} {'ms/quote':>9} {'peak KiB':>9}")
+    for src in IAM_SOURCES:
+        name = str(src["name"])
+        with open(os.path.join(HERE, "fixtures", f"{name}.html"), encoding="utf-8") as f:
+            html = f.read()
+        selectors = list(src["selectors"])
+
+        price = legacy_extract(html, selectors)
+        secs, peak = measure(lambda: legacy_extract(html, selectors), args.runs)
+        print(f"{name:<12} {'legacy':<8} {price:>8.2f} {'-':<20} {secs * 1e3:>9.3f} {peak:>9.1f}")
+
+        def cold():
+            return PriceExtractor().extract(name, html, selectors)
+
+        price, strategy = cold()
+        secs, peak = measure(cold, args.runs)
+        print(f"{name:<12} {'cold':<8} {price:>8.2f} {strategy:<20} {secs * 1e3:>9.3f} {peak:>9.1f}")
+
+        warm_extractor = PriceExtractor()
+        _, last_good = warm_extractor.extract(name, html, selectors)
+        price, strategy = warm_extractor.extract(name, html, selectors, last_good)
+        secs, peak = measure(lambda: warm_extractor.extract(name, html, selectors, last_good), args.runs)
+        print(f"{name:<12} {'warm':<8} {price:>8.2f} {strategy:<20} {secs * 1e3:>9.3f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Risk engine sweep latency on a replayed price feed.
+
+Seeds a temporary SQLite database with --challenges active challenges holding
+--positions open trades (close_price NULL) over --symbols symbols, loads them
+with risk.RiskEngine.sync(), then replays a price feed through on_quote()
+exactly as the price refresher would, with the flush thread running:
+
+- feed: a seeded random walk (--ticks quotes, --vol per-tick volatility),
+        or a recorded CSV of "symbol,price" lines given with --feed
+        (--save-feed writes the generated one so a run can be replayed)
+
+Reports p50 / p95 / p99 / max time per quote (full revaluation of every
+open position), the breaches found and how many UPDATE batches wrote them,
+and checks that the database ends with exactly those challenges failed.
+
+Usage (from backend/):
+    python benchmarks/bench_risk.py [--positions 100000] [--challenges 20000] [--ticks 5000]
+    python benchmarks/bench_risk.py --feed feed.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=100_000)
+    parser.add_argument("--challenges", type=int, default=20_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--vol", type=float, default=0.01, help="per-tick volatility of the random walk")
+    parser.add_argument("--feed", help="CSV of symbol,price lines to replay instead of the random walk")
+    parser.add_argument("--save-feed", help="write the generated feed to this CSV")
+    return parser.parse_args()
+
+
+def _random_walk(symbols, ticks: int, vol: float, rng: random.Random):
+    prices = {s: 100.0 for s in symbols}
+    feed = []
+    for _ in range(ticks):
+        s = rng.choice(symbols)
+        prices[s] = max(0.01, prices[s] * (1.0 + rng.gauss(0.0, vol)))
+        feed.append((s, prices[s]))
+    return feed
+
+
+def _pct(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3
+
+
+def main() -> None:
+    args = _parse_args()
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_risk.db")
+
+    from db import SessionLocal, init_schema
+    from models import ChallengeStatusEnum, Trade, User, UserChallenge
+    from price_refresher import Quote
+    from risk import RiskEngine
+
+    init_schema()
+    rng = random.Random(11)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    if args.feed:
+        with open(args.feed, newline="") as f:
+            feed = [(row[0].upper(), float(row[1])) for row in csv.reader(f) if row and row[0] != "symbol"]
+        symbols = sorted({s for s, _ in feed})
+    else:
+        feed = _random_walk(symbols, args.ticks, args.vol, rng)
+        if args.save_feed:
+            with open(args.save_feed, "w", newline="") as f:
+                csv.writer(f).writerows([("symbol", "price"), *feed])
+    first_price = {}
+    for s, px in feed:
+        first_price.setdefault(s, px)
+
+    with SessionLocal() as s:
+        s.execute(User.__table__.insert(), [
+            {"username": f"trader{i}", "email": f"trader{i}@example.com", "password_hash": "x"}
+            for i in range(args.challenges)
+        ])
+        s.execute(UserChallenge.__table__.insert(), [
+            {"user_id": i + 1, "start_balance": 10_000.0, "current_equity": 10_000.0,
+             "status": ChallengeStatusEnum.active.name, "daily_loss_limit": 0.05, "total_loss_limit": 0.10}
+            for i in range(args.challenges)
+        ])
+        rows = []
+        for _ in range(args.positions):
+            sym = rng.choice(symbols)
+            rows.append({"challenge_id": rng.randint(1, args.challenges), "symbol": sym,
+                         "type": rng.choice(("buy", "sell")), "quantity": rng.randint(1, 40),
+                         "open_price": first_price.get(sym, 100.0), "close_price": None, "profit_loss": None})
+        s.execute(Trade.__table__.insert(), rows)
+        s.commit()
+
+    engine = RiskEngine(session_factory=SessionLocal, sync_interval=3600, flush_interval=0.05)
+    t0 = time.perf_counter()
+    engine.sync()
+    stats = engine.stats()
+    print(f"sync: {(time.perf_counter() - t0) * 1e3:.0f} ms ({stats['positions']:,} positions, "
+          f"{stats['challenges']:,} challenges, {stats['symbols']} symbols)")
+
+    engine.ensure_started()
+    samples = []
+    started = time.perf_counter()
+    for sym, px in feed:
+        t = time.perf_counter()
+        engine.on_quote(Quote(sym, px, time.time()))
+        samples.append(time.perf_counter() - t)
+    replay_s = time.perf_counter() - started
+    engine.stop()
+
+    samples.sort()
+    stats = engine.stats()
+    print(f"replay: {len(feed):,} quotes in {replay_s:.2f} s ({len(feed) / replay_s:,.0f} quotes/s)")
+    print(f"per quote: p50 {_pct(samples, 0.50):.3f} ms  p95 {_pct(samples, 0.95):.3f} ms  "
+          f"p99 {_pct(samples, 0.99):.3f} ms  max {samples[-1] * 1e3:.3f} ms")
+    print(f"breaches: {stats['breaches']:,} challenges failed in {stats['flushes']} flush(es), "
+          f"{stats['failed_written']:,} rows written")
+
+    with SessionLocal() as s:
+        failed = s.query(UserChallenge).filter(UserChallenge.status == ChallengeStatusEnum.failed).count()
+    ok = failed == stats["breaches"] == stats["failed_written"]
+    print(f"{'ok  ' if ok else 'FAIL'} database has {failed:,} failed challenges")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
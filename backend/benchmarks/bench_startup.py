@@ -0,0 +1,160 @@
+"""Worker startup: plain workers vs `--preload` with warm-up (startup.py).
+
+For each mode, starts `gunicorn -k gevent -w --workers load_app:app` on a
+small seeded SQLite database, with the upstreams on the local stubs
+(benchmarks/stubs.py), and measures:
+
+- ready_s: from the gunicorn launch to the first answered request
+- first_ms: client latency of the first price, leaderboard and chat requests
+  (--rounds rounds of the three, so each worker tends to see one of each)
+- per worker /api/startup/stats (app import, module imports, first request
+  per route as timed inside the worker)
+- memory: Rss / Pss / Shared of the master and the workers (smaps_rollup, Linux)
+
+Modes: plain (every worker imports the app, first requests pay the lazy
+imports) and preload (--preload, WARMUP_TICKERS=--tickers: one import and one
+warm-up in the master, workers forked from it). Also prints the cold
+`import app` time of a fresh interpreter.
+
+Usage (from backend/, needs gunicorn and gevent installed):
+    python benchmarks/bench_startup.py [--workers 2] [--rounds 2] [--tickers AAPL,MSFT,BTC-USD]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, BACKEND)
+
+from stubs import serve_stub  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _cold_import(env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    return round(float(out.stdout.strip().splitlines()[-1]) * 1e3, 1)
+
+
+def _children(pid: int) -> list:
+    found = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            found += [int(p) for p in f.read().split()]
+    return found
+
+
+def _memory(pid: int) -> dict:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.read().splitlines()[1:]  # first line: the address range
+    except OSError:
+        return {}
+    kb = {k: int(v.split()[0]) for k, _, v in (line.partition(":") for line in lines) if v.strip().endswith("kB")}
+    return {
+        "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+        "shared_mb": round((kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024, 1),
+    }
+
+
+def _run_mode(mode: str, args, env: dict) -> dict:
+    port = _free_port()
+    env = dict(env, WARMUP_TICKERS=args.tickers if mode == "preload" else "")
+    cmd = [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", str(args.workers),
+           "-b", f"127.0.0.1:{port}", "--pythonpath", f"{HERE},{BACKEND}", "--log-level", "warning"]
+    if mode == "preload":
+        cmd.append("--preload")
+    launched = time.perf_counter()
+    proc = subprocess.Popen(cmd + ["load_app:app"], cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=base, timeout=30.0, headers={"Connection": "close"}) as client:
+            for _ in range(600):
+                try:
+                    client.get("/api/db-pool/stats")
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.05)
+            ready = time.perf_counter() - launched
+
+            first: dict = {"price": [], "leaderboard": [], "chat": []}
+            tickers = [t for t in args.tickers.split(",") if t] or ["AAPL"]
+            for i in range(args.rounds):
+                for route, call in (
+                    ("price", lambda: client.get(f"/api/price/{tickers[i % len(tickers)]}")),
+                    ("leaderboard", lambda: client.get("/api/leaderboard")),
+                    ("chat", lambda: client.post("/api/chat", json={"message": f"C'est quoi un stop loss ? ({i})"})),
+                ):
+                    started = time.perf_counter()
+                    call()
+                    first[route].append(round((time.perf_counter() - started) * 1e3, 1))
+
+            workers = {}
+            for _ in range(20 * args.workers):
+                stats = client.get("/api/startup/stats").json()
+                workers.setdefault(stats["pid"], stats)
+                if len(workers) >= args.workers:
+                    break
+        memory = {"master": _memory(proc.pid)}
+        for pid in _children(proc.pid):
+            memory[f"worker {pid}"] = _memory(pid)
+        return {
+            "mode": mode,
+            "ready_s": round(ready, 2),
+            "first_ms": first,
+            "workers": list(workers.values()),
+            "memory": memory,
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--tickers", default="AAPL,MSFT,BTC-USD")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency in seconds")
+    args = parser.parse_args()
+
+    db = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_startup.db")
+    from seed import seed
+
+    seed(db, users=200, challenges=1000, trades=20_000, quiet=True)
+    url, _stub = serve_stub(latency=args.latency)
+    env = dict(
+        os.environ,
+        DATABASE_URL=db, RISK_ENGINE_ENABLED="0", SECRET_KEY="bench-secret",
+        STUB_YAHOO_URL=url, STUB_IAM_URL=url,
+        OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"{url}/v1",
+        GROQ_API_KEY="stub", GROQ_BASE_URL=url,
+    )
+    print(json.dumps({"cold_import_app_ms": _cold_import(env)}))
+    for mode in ("plain", "preload"):
+        print(json.dumps(_run_mode(mode, args, env)))
+
+
+if __name__ == "__main__":
+    main()
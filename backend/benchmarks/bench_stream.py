@@ -0,0 +1,138 @@
+"""Load test: SSE price streaming vs 5-second polling on one gunicorn worker.
+
+Starts `gunicorn -k gevent -w 1` on benchmarks/stream_app.py (synthetic price
+feed, no upstream traffic) and drives it with asyncio clients:
+
+- stream: N viewers hold /api/stream/prices open and receive pushed updates
+- poll:   N viewers call /api/prices every 5 seconds, like the old Dashboard
+
+For each mode it reports the worker's CPU usage, delivery/response latency
+and the projected number of viewers one worker can serve at 100% CPU.
+
+Usage (from backend/, needs gunicorn and gevent installed):
+    python benchmarks/bench_stream.py [--viewers 500] [--duration 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+TICKERS = "BTC-USD,IAM"
+POLL_INTERVAL = 5.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _worker_pid(master: int) -> int:
+    for _ in range(100):
+        out = subprocess.run(["pgrep", "-P", str(master)], capture_output=True, text=True).stdout.split()
+        if out:
+            return int(out[0])
+        time.sleep(0.1)
+    raise RuntimeError("gunicorn worker did not start")
+
+
+async def _stream_viewer(port: int, lags: list, stop: float) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/stream/prices?tickers={TICKERS} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        while time.time() < stop:
+            line = await asyncio.wait_for(reader.readline(), timeout=max(0.1, stop - time.time()))
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                lags.append(time.time() - json.loads(line[6:])["ts"])
+    except (asyncio.TimeoutError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _poll_viewer(port: int, latencies: list, stop: float, offset: float) -> None:
+    await asyncio.sleep(offset)
+    while time.time() < stop:
+        started = time.time()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /api/prices?tickers={TICKERS} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        latencies.append(time.time() - started)
+        await asyncio.sleep(max(0.0, POLL_INTERVAL - (time.time() - started)))
+
+
+def _run_mode(mode: str, port: int, worker: int, viewers: int, duration: float) -> dict:
+    samples: list = []
+
+    async def drive():
+        stop = time.time() + duration
+        if mode == "stream":
+            tasks = [_stream_viewer(port, samples, stop) for _ in range(viewers)]
+        else:
+            tasks = [_poll_viewer(port, samples, stop, POLL_INTERVAL * i / viewers) for i in range(viewers)]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    cpu0, t0 = _cpu_seconds(worker), time.time()
+    asyncio.run(drive())
+    cpu = (_cpu_seconds(worker) - cpu0) / (time.time() - t0)
+    samples.sort()
+    return {
+        "mode": mode,
+        "viewers": viewers,
+        "messages": len(samples),
+        "worker_cpu": round(cpu, 4),
+        "p50_ms": round(statistics.median(samples) * 1e3, 2) if samples else None,
+        "p99_ms": round(samples[int(0.99 * (len(samples) - 1))] * 1e3, 2) if samples else None,
+        "viewers_per_worker": int(viewers / cpu) if cpu > 0 else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viewers", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    port = _free_port()
+    env = dict(os.environ, SECRET_KEY="bench-secret", PRICE_REFRESH_INTERVAL="1", PRICE_REFRESH_INTERVAL_IAM="1")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", "1", "--worker-connections", "5000",
+         "-b", f"127.0.0.1:{port}", "--pythonpath", f"{HERE},{BACKEND}", "--log-level", "warning",
+         "stream_app:app"],
+        cwd=BACKEND,
+        env=env,
+    )
+    try:
+        worker = _worker_pid(proc.pid)
+        time.sleep(1.5)
+        for mode in ("stream", "poll"):
+            print(json.dumps(_run_mode(mode, port, worker, args.viewers, args.duration)))
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
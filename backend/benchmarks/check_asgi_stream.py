@@ -0,0 +1,127 @@
+"""Check that open price streams do not hold up the Flask routes in ASGI mode.
+
+Serves asgi:application with uvicorn in-process (one worker, a temporary
+SQLite database, prices from the local stub, benchmarks/stubs.py), with one
+extra Flask route that sleeps --slow seconds, and checks:
+
+- stream:   --streams clients on /api/stream/prices get the "retry" preamble
+- flask:    with those streams open, a Flask route (/api/leaderboard) answers
+- parallel: --parallel concurrent calls to the slow Flask route finish in
+            well under --parallel x --slow (the WSGI fallback runs on a pool)
+- price:    the open streams receive a price event from the refresher
+- closed:   once the clients hang up, their broker subscriptions are gone
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/, needs uvicorn installed):
+    python benchmarks/check_asgi_stream.py [--streams 20] [--parallel 8] [--slow 0.5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from stubs import serve_stub  # noqa: E402
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<8} {detail}")
+    if not ok:
+        os._exit(1)  # the server and stream threads would keep the interpreter alive
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _run(base: str, args) -> None:
+    async with httpx.AsyncClient(base_url=base, timeout=10.0) as client:
+        prices = [0] * args.streams
+        opened = set()
+
+        async def stream(i: int) -> None:
+            async with client.stream("GET", "/api/stream/prices?tickers=AAPL") as resp:
+                async for chunk in resp.aiter_text():
+                    if "retry:" in chunk:
+                        opened.add(i)
+                    prices[i] += chunk.count("event: price")
+
+        streams = [asyncio.ensure_future(stream(i)) for i in range(args.streams)]
+        deadline = time.monotonic() + 5
+        while len(opened) < args.streams and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        _check("stream", len(opened) == args.streams, f"{len(opened)}/{args.streams} streams open")
+
+        started = time.perf_counter()
+        resp = await client.get("/api/leaderboard")
+        _check("flask", resp.status_code == 200, f"/api/leaderboard {resp.status_code} in "
+               f"{(time.perf_counter() - started) * 1e3:.0f} ms with {args.streams} streams open")
+
+        started = time.perf_counter()
+        done = await asyncio.gather(*(client.get("/api/check/slow") for _ in range(args.parallel)))
+        elapsed = time.perf_counter() - started
+        _check("parallel", all(r.status_code == 200 for r in done) and elapsed < args.parallel * args.slow / 2,
+               f"{args.parallel} x {args.slow} s in {elapsed:.2f} s")
+
+        deadline = time.monotonic() + 10
+        while not all(prices) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        _check("price", all(prices), f"{sum(1 for p in prices if p)}/{args.streams} streams got a price event")
+        for task in streams:
+            task.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+        deadline = time.monotonic() + 5
+        while (left := (await client.get("/api/stream/stats")).json()["subscriptions"]) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        _check("closed", left == 0, f"{left} subscriptions left after the clients hung up")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--parallel", type=int, default=8)
+    parser.add_argument("--slow", type=float, default=0.5)
+    args = parser.parse_args()
+
+    url, _stub = serve_stub(latency=0.01)
+    os.environ.update(
+        DATABASE_URL="sqlite:///" + os.path.join(tempfile.mkdtemp(), "check_asgi_stream.db"),
+        RISK_ENGINE_ENABLED="0", SECRET_KEY="bench-secret", STUB_YAHOO_URL=url, PRICE_REFRESH_INTERVAL="0.5",
+    )
+    import uvicorn
+
+    import load_app  # noqa: F401  (points yfinance at the stub)
+    from app import app
+    from asgi import application
+
+    @app.route("/api/check/slow")
+    def check_slow():
+        time.sleep(args.slow)
+        return {"slept": args.slow}
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    asyncio.run(_run(f"http://127.0.0.1:{port}", args))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Check backtest.py against the per-trade rule logic and time it.
+
+Seeds a temporary SQLite database with --challenges challenges and --trades
+random trades spread over several weeks, ingested through
+services.ingest_trades (so statuses are those production would compute),
+then checks that:
+
+- own limits:  the backtest with each challenge's own limits reproduces the
+               stored passed / failed / active counts
+- grid:        every (daily, total) combination matches services.fold_trades
+               replayed per challenge with those limits
+
+and prints load and evaluation times. Exits non-zero on a mismatch.
+
+Usage (from backend/):
+    python benchmarks/check_backtest.py [--trades 200000] [--challenges 2000] [--workers 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import groupby
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<10} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--challenges", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "check_backtest.db")
+
+    import backtest
+    from db import SessionLocal, init_schema
+    from models import ChallengeStatusEnum, Trade, User, UserChallenge
+    from services import fold_trades, ingest_trades
+
+    init_schema()
+    rng = random.Random(7)
+    with SessionLocal() as s:
+        s.execute(User.__table__.insert(), [
+            {"username": f"trader{i}", "email": f"trader{i}@example.com", "password_hash": "x"}
+            for i in range(args.challenges)
+        ])
+        s.execute(UserChallenge.__table__.insert(), [
+            {"user_id": uid, "start_balance": rng.choice((5000.0, 10000.0, 25000.0)), "current_equity": 0.0,
+             "status": ChallengeStatusEnum.active.name, "daily_loss_limit": rng.choice((0.04, 0.05)),
+             "total_loss_limit": 0.10}
+            for uid in s.execute(User.__table__.select().with_only_columns(User.id)).scalars()
+        ])
+        s.execute(UserChallenge.__table__.update().values(current_equity=UserChallenge.start_balance))
+        s.commit()
+        challenge_ids = list(s.execute(UserChallenge.__table__.select().with_only_columns(UserChallenge.id)).scalars())
+
+    # Ingested in chronological batches, so stored statuses follow timestamp order
+    start = dt.datetime(2026, 1, 1)
+    offsets = sorted(rng.randrange(40 * 86400) for _ in range(args.trades))
+    for done in range(0, args.trades, 50_000):
+        records = [
+            {"challenge_id": rng.choice(challenge_ids), "symbol": "BTC-USD", "type": rng.choice(("buy", "sell")),
+             "quantity": rng.randint(1, 20), "open_price": 100.0, "close_price": max(0.0, 100.0 + rng.gauss(0, 4)),
+             "timestamp": (start + dt.timedelta(seconds=offset)).isoformat()}
+            for offset in offsets[done:done + 50_000]
+        ]
+        with SessionLocal() as s:
+            ingest_trades(s, records)
+
+    with SessionLocal() as s:
+        t0 = time.perf_counter()
+        data = backtest.load(s)
+        load_ms = (time.perf_counter() - t0) * 1e3
+        stored = {st: 0 for st in ChallengeStatusEnum}
+        for status in s.execute(UserChallenge.__table__.select().with_only_columns(UserChallenge.status)).scalars():
+            stored[status] += 1
+        challenges = {c.id: c for c in s.query(UserChallenge)}
+        trades = s.execute(
+            Trade.__table__.select().with_only_columns(Trade.challenge_id, Trade.timestamp, Trade.profit_loss)
+            .order_by(Trade.challenge_id, Trade.timestamp, Trade.id)
+        ).all()
+    print(f"{len(data.counts):,} challenges, {len(data.pnl):,} trades loaded in {load_ms:.0f} ms")
+
+    own = backtest.run(data, backtest.make_grid(), args.workers)["results"][0]
+    expected = (stored[ChallengeStatusEnum.passed], stored[ChallengeStatusEnum.failed], stored[ChallengeStatusEnum.active])
+    got = (own["passed"], own["failed"], own["active"])
+    _check("own limits", got == expected, f"passed/failed/active {got}, stored {expected}")
+
+    daily, total = (None, 0.02, 0.03, 0.05), (None, 0.06, 0.12)
+    report = backtest.run(data, backtest.make_grid(daily, total), args.workers)
+    t0 = time.perf_counter()
+    for r in report["results"]:
+        counts = {st: 0 for st in ChallengeStatusEnum}
+        for cid, rows in groupby(trades, key=lambda row: row.challenge_id):
+            c = challenges[cid]
+            state = fold_trades({
+                "start_balance": c.start_balance, "current_equity": c.start_balance, "total_pnl": 0.0,
+                "day_start_equity": None, "day_start_date": None, "status": ChallengeStatusEnum.active,
+                "status_changed_at": None,
+                "daily_loss_limit": c.daily_loss_limit if r["daily_loss_limit"] is None else r["daily_loss_limit"],
+                "total_loss_limit": c.total_loss_limit if r["total_loss_limit"] is None else r["total_loss_limit"],
+            }, [{"timestamp": row.timestamp, "profit_loss": row.profit_loss} for row in rows])
+            counts[state["status"]] += 1
+        counts[ChallengeStatusEnum.active] += len(challenges) - sum(counts.values())
+        ref = (counts[ChallengeStatusEnum.passed], counts[ChallengeStatusEnum.failed], counts[ChallengeStatusEnum.active])
+        got = (r["passed"], r["failed"], r["active"])
+        if got != ref:
+            _check("grid", False, f"daily={r['daily_loss_limit']} total={r['total_loss_limit']}: {got} != replay {ref}")
+    replay_ms = (time.perf_counter() - t0) * 1e3
+    _check("grid", True, f"{len(report['results'])} combinations match the per-trade replay "
+                         f"({report['eval_ms']:.0f} ms vectorized on {report['workers']} process(es) "
+                         f"vs {replay_ms:.0f} ms replayed)")
+
+
+if __name__ == "__main__":
+    main()
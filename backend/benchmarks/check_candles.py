@@ -0,0 +1,123 @@
+"""Check what the candle store counts as fetched (candles.py coverage).
+
+Runs a CandleStore on a temporary directory with a scripted fetcher (no
+network) and checks:
+
+- closed:  a past range with no bars (market closed) is covered, not asked again
+- error:   a failed download (CandleFetchError) covers nothing and is asked again
+- partial: bars fetched before a failed chunk are kept and not asked again
+- delayed: a feed lagging behind now is covered only up to its last bar plus
+           one step; the rest is asked again once CANDLE_TAIL_TTL has passed,
+           not before
+- traverse: an all-dot ticker is refused
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/):
+    python benchmarks/check_candles.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from candles import COLUMNS, DAY, CandleFetchError, CandleStore  # noqa: E402
+
+
+class Upstream:
+    """Minute bars every 60 s up to `now - lag`, none inside `closed`, failing inside `down`."""
+
+    def __init__(self) -> None:
+        self.lag = 0.0
+        self.closed = (0.0, 0.0)
+        self.down = (0.0, 0.0)
+        self.calls = []
+
+    def __call__(self, ticker: str, interval: str, start: float, end: float) -> np.ndarray:
+        self.calls.append((start, end))
+        if start < self.down[1] and end > self.down[0]:
+            raise CandleFetchError("upstream down")
+        last = min(end, time.time() - self.lag)
+        t = np.arange(start - start % 60, last, 60.0)
+        t = t[(t >= start) & ~((t >= self.closed[0]) & (t < self.closed[1]))]
+        return np.vstack([t] + [np.full(t.shape, 1.0)] * (len(COLUMNS) - 1))
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<9} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    now = time.time()
+    day = now - now % DAY - 3 * DAY  # a whole day, three days ago
+
+    up = Upstream()
+    store = CandleStore(root=tempfile.mkdtemp(), fetcher=up, tail_ttl=0.5)
+    up.closed = (day, day + DAY)
+    store.candles("AAPL", "1m", day, day + DAY)
+    store.candles("AAPL", "1m", day, day + DAY)
+    _check("closed", len(up.calls) == 1, f"{len(up.calls)} download(s) for two requests on an empty day")
+
+    up = Upstream()
+    store = CandleStore(root=tempfile.mkdtemp(), fetcher=up, tail_ttl=0.5)
+    up.down = (day, day + DAY)
+    failed = 0
+    for _ in range(2):
+        try:
+            store.candles("AAPL", "1m", day, day + DAY)
+        except CandleFetchError:
+            failed += 1
+    up.down = (0.0, 0.0)
+    bars = store.candles("AAPL", "1m", day, day + DAY).shape[1]
+    _check("error", failed == 2 and len(up.calls) == 3 and bars == 1440,
+           f"{failed} failures, {len(up.calls)} downloads, then {bars} bars")
+
+    # 1m downloads span at most 7 days: the second chunk fails, the first is kept
+    up = Upstream()
+    store = CandleStore(root=tempfile.mkdtemp(), fetcher=up, tail_ttl=0.5)
+    first = now - now % DAY - 20 * DAY
+    up.down = (first + 7 * DAY, first + 14 * DAY)
+    try:
+        store.candles("AAPL", "1m", first, first + 14 * DAY)
+    except CandleFetchError:
+        pass
+    up.down, up.calls = (0.0, 0.0), []
+    store.candles("AAPL", "1m", first, first + 14 * DAY)
+    _check("partial", up.calls == [(first + 7 * DAY, first + 14 * DAY)], f"asked again: {up.calls}")
+
+    up = Upstream()
+    store = CandleStore(root=tempfile.mkdtemp(), fetcher=up, tail_ttl=0.5)
+    up.lag = 300.0
+    start = now - 3600
+    store.candles("AAPL", "1m", start, now)
+    covered = store._series[("AAPL", "1m")].coverage[-1][1]
+    last = store.candles("AAPL", "1m", start, now)[0, -1]
+    _check("delayed", abs(covered - (last + 60)) < 1e-6, f"covered to last bar + 60 s ({covered - now:.0f} s from now)")
+    up.lag, calls = 0.0, len(up.calls)
+    store.candles("AAPL", "1m", start, time.time())
+    throttled = len(up.calls) == calls
+    time.sleep(0.6)
+    bars = store.candles("AAPL", "1m", start, time.time())
+    _check("delayed", throttled and len(up.calls) == calls + 1 and bars[0, -1] > last,
+           f"tail asked again after the TTL only, last bar now {bars[0, -1] - now:.0f} s from now")
+
+    refused = []
+    for ticker in ("..", ".", "..."):
+        try:
+            store.candles(ticker, "1d", day, day + DAY)
+        except ValueError:
+            refused.append(ticker)
+    _check("traverse", len(refused) == 3, f"refused {refused}")
+
+
+if __name__ == "__main__":
+    main()
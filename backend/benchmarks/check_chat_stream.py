@@ -0,0 +1,148 @@
+"""Check the streaming chat path (llm.ChatStream / stream_reply_async) against fake providers.
+
+Starts two stub upstreams (benchmarks/stubs.py), one standing in for OpenAI
+and one for Groq, points the provider SDKs at them and checks:
+
+- stream:     tokens arrive incrementally and rebuild the full reply
+- failover:   a provider that misses the first-token deadline is raced by the
+              next one, the fast one wins and the slow stream is aborted
+- disconnect: closing the stream mid-reply aborts the upstream generation
+- truncated:  a stream stalled past LLM_TIMEOUT ends early, is not flagged
+              complete and is not cached by the route
+- route:      POST /api/chat with "stream": true answers token/done SSE events
+- async:      the same failover through stream_reply_async (ASGI mode)
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/, needs openai and groq installed):
+    python benchmarks/check_chat_stream.py [--deadline 0.5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from stubs import REPLY, serve_stub  # noqa: E402
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<11} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deadline", type=float, default=0.5, help="first-token deadline (s)")
+    args = parser.parse_args()
+
+    openai_url, openai_stub = serve_stub(latency=0.05)
+    groq_url, groq_stub = serve_stub(latency=0.05)
+    os.environ.update(
+        OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"{openai_url}/v1",
+        GROQ_API_KEY="stub", GROQ_BASE_URL=groq_url,
+        LLM_FIRST_TOKEN_TIMEOUT=str(args.deadline),
+    )
+    import llm
+
+    # stream (after a warm-up call that imports the SDK and opens the pooled connection)
+    "".join(llm.ChatStream(REPLY))
+    t0 = time.perf_counter()
+    stream = llm.ChatStream(REPLY)
+    tokens, first = [], None
+    for delta in stream:
+        first = first if first is not None else time.perf_counter() - t0
+        tokens.append(delta)
+    total = time.perf_counter() - t0
+    _check("stream", "".join(tokens) == REPLY and stream.provider == "openai" and stream.completed
+           and first < total / 2,
+           f"{len(tokens)} tokens from {stream.provider}, first after {first * 1e3:.0f} ms, all after {total * 1e3:.0f} ms")
+
+    # failover
+    openai_stub.latency = 5.0
+    aborted_before = openai_stub.streams_aborted
+    t0 = time.perf_counter()
+    stream = llm.ChatStream(REPLY, first_token_timeout=args.deadline)
+    reply = "".join(stream)
+    first_ms = (time.perf_counter() - t0) * 1e3
+    aborted = _wait_for(lambda: openai_stub.streams_aborted > aborted_before, timeout=6.0)
+    _check("failover", reply == REPLY and stream.provider == "groq" and aborted,
+           f"won by {stream.provider} in {first_ms:.0f} ms, slow openai stream aborted: {aborted}")
+
+    # disconnect
+    openai_stub.latency = 0.05
+    openai_stub.token_interval = 0.2
+    aborted_before = openai_stub.streams_aborted
+    stream = llm.ChatStream(REPLY)
+    tokens = iter(stream)
+    got = [next(tokens), next(tokens)]
+    tokens.close()
+    aborted = _wait_for(lambda: openai_stub.streams_aborted > aborted_before)
+    _check("disconnect", aborted, f"closed after {len(got)} tokens, upstream aborted: {aborted}")
+    openai_stub.token_interval = 0.01
+
+    # truncated
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    from app import app
+    from chat_cache import chat_cache
+
+    question = "Qu'est-ce qu'un drawdown ?"
+    openai_stub.token_interval = 1.0
+    llm.LLM_TIMEOUT, timeout = 0.3, llm.LLM_TIMEOUT
+    try:
+        stream = llm.ChatStream(question)
+        reply = "".join(stream)
+        resp = app.test_client().post("/api/chat", json={"message": question})
+    finally:
+        llm.LLM_TIMEOUT = timeout
+        openai_stub.token_interval = 0.01
+    _check("truncated", reply != REPLY and not stream.completed and chat_cache.get(question) is None,
+           f"stalled after {len(reply)} chars, completed: {stream.completed}, "
+           f"cached: {chat_cache.get(question) is not None} (route answered {resp.status_code})")
+
+    # route
+
+    resp = app.test_client().post("/api/chat", json={"message": REPLY, "stream": True})
+    body = resp.get_data(as_text=True)
+    _check("route", resp.mimetype == "text/event-stream" and body.count("event: token") > 1
+           and body.rstrip().endswith('{"provider": "openai"}'),
+           f"{body.count('event: token')} token events, then {body.rstrip().splitlines()[-1]}")
+
+    # async
+    async def run_async():
+        openai_stub.latency = 5.0
+        info: dict = {}
+        gen = llm.stream_reply_async(REPLY, first_token_timeout=args.deadline, info=info)
+        try:
+            reply = "".join([d async for d in gen])
+        finally:
+            await gen.aclose()
+        await llm.aclose()
+        return reply, info["provider"]
+
+    aborted_before = openai_stub.streams_aborted
+    reply, provider = asyncio.run(run_async())
+    aborted = _wait_for(lambda: openai_stub.streams_aborted > aborted_before, timeout=6.0)
+    _check("async", reply == REPLY and provider == "groq" and aborted,
+           f"won by {provider}, slow openai stream aborted: {aborted}")
+
+
+if __name__ == "__main__":
+    main()
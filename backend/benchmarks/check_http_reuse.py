@@ -0,0 +1,103 @@
+"""Check connection reuse and conditional GETs of http_client against a local stub.
+
+Starts a keep-alive HTTP/1.1 stub server that counts accepted connections,
+serves gzip bodies with an ETag and answers If-None-Match with 304, then
+issues sequential and concurrent GETs through http_client.HttpClient.
+Exits non-zero if connections are not reused or 304s are not honoured.
+
+Usage (from backend/):
+    python benchmarks/check_http_reuse.py [--requests 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import HttpClient  # noqa: E402
+
+BODY = ("<html><div class='price'>95,80 MAD</div>" + "x" * 50_000 + "</html>").encode()
+ETAG = '"iam-v1"'
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _Stub.lock:
+            _Stub.connections += 1
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = BODY
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", ETAG)
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/iam"
+
+    client = HttpClient(pool_maxsize=4, max_per_host=4)
+    first = client.get(url)
+    assert first.status == 200 and first.content == BODY, "first GET must return the full body"
+    for _ in range(args.requests - 1):
+        res = client.get(url)
+        assert res.not_modified and res.content == BODY, "unchanged page must come back as a 304"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: client.get(url), range(args.requests)))
+
+    stats = client.stats()
+    server.shutdown()
+    total = 2 * args.requests
+    print(f"requests={stats['requests']} connections_accepted={_Stub.connections}")
+    print(f"not_modified={stats['not_modified']} bytes_wire={stats['bytes_wire']} "
+          f"bytes_decoded={stats['bytes_decoded']} reuse_rate={stats['connection_reuse_rate']:.2%}")
+
+    ok = True
+    if _Stub.connections > 4:  # one per pool slot at most (max_per_host=4)
+        print(f"FAIL: {_Stub.connections} connections for {total} requests")
+        ok = False
+    if stats["not_modified"] != total - 1:
+        print(f"FAIL: expected {total - 1} 304s, got {stats['not_modified']}")
+        ok = False
+    if stats["bytes_wire"] >= len(BODY):
+        print("FAIL: body was not transferred compressed")
+        ok = False
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
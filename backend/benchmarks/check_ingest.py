@@ -0,0 +1,82 @@
+"""Check that bulk ingestion cannot rewrite a challenge's daily loss baseline.
+
+Runs POST /api/trades/bulk against a temporary SQLite database, on a
+challenge at 9600 whose day started at 10000 (5% daily limit), and checks:
+
+- backdated: a trade stamped before the challenge's current day is refused (400)
+- future:    a trade stamped beyond TRADE_MAX_CLOCK_SKEW is refused (400)
+- skew:      a trade a few seconds ahead of the server clock is accepted
+- baseline:  after those, a live -300 trade still fails the challenge
+             (9300 <= 10000 * 0.95), the day's earlier loss was not erased
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/):
+    python benchmarks/check_ingest.py
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<10} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "check_ingest.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("RISK_ENGINE_ENABLED", "0")
+
+    from app import app
+    from config import TRADE_MAX_CLOCK_SKEW
+    from db import SessionLocal
+    from models import ChallengeStatusEnum, User, UserChallenge
+
+    now = dt.datetime.utcnow()
+    with SessionLocal() as s:
+        user = User(username="ingest", email="ingest@example.com", password_hash="x")
+        s.add(user)
+        s.flush()
+        challenge = UserChallenge(
+            user_id=user.id, start_balance=10000.0, current_equity=9600.0, total_pnl=-400.0,
+            status=ChallengeStatusEnum.active, daily_loss_limit=0.05, total_loss_limit=0.10,
+            day_start_equity=10000.0, day_start_date=now.date(),
+        )
+        s.add(challenge)
+        s.commit()
+        cid = challenge.id
+    client = app.test_client()
+
+    def bulk(offset: dt.timedelta, pnl: float = 0.0):
+        trade = {"challenge_id": cid, "symbol": "AAPL", "type": "buy", "quantity": 1, "open_price": 100.0,
+                 "close_price": 100.0 + pnl, "timestamp": (dt.datetime.utcnow() + offset).isoformat()}
+        resp = client.post("/api/trades/bulk", json=[trade])
+        return resp.status_code, resp.get_json()
+
+    status, body = bulk(-dt.timedelta(days=1))
+    _check("backdated", status == 400, f"{status} {body.get('errors')}")
+    status, body = bulk(dt.timedelta(days=1))
+    _check("future", status == 400, f"{status} {body.get('errors')}")
+    status, body = bulk(dt.timedelta(seconds=min(5.0, TRADE_MAX_CLOCK_SKEW / 2)))
+    _check("skew", status == 200, f"{status} inserted {body.get('inserted')}")
+
+    resp = client.post("/api/trade", json={"challenge_id": cid, "symbol": "AAPL", "type": "buy", "quantity": 3,
+                                           "open_price": 100.0, "close_price": 0.0})
+    with SessionLocal() as s:
+        c = s.get(UserChallenge, cid)
+        equity, baseline, status = c.current_equity, c.day_start_equity, c.status
+    _check("baseline", status == ChallengeStatusEnum.failed and baseline == 10000.0,
+           f"equity {equity:.0f}, day start {baseline:.0f}, status {status.value} (trade answered {resp.status_code})")
+
+
+if __name__ == "__main__":
+    main()
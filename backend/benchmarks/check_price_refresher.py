@@ -0,0 +1,77 @@
+"""Check the price refresher registry (price_refresher.py).
+
+Runs a PriceRefresher with a scripted fetch_many (no network) and checks:
+
+- cold:    a ticker registered by a route that fetches it itself (get(), then
+           publish()) is not fetched again by the scheduler before one interval
+- stream:  a ticker registered with cold_fetch=False is fetched on the next tick
+- cap:     past max_tickers new tickers are not registered and keep no quote
+- failing: a ticker failing max_failures times in a row is evicted
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/):
+    python benchmarks/check_price_refresher.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_refresher import PriceRefresher  # noqa: E402
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.extend(keys)
+        prices = {k: 100.0 for k in keys if not k.startswith("BOGUS")}
+        return prices, {k: "inconnu" for k in keys if k not in prices}
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<8} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    up = Upstream()
+    refresher = PriceRefresher(fetch_many=up, default_interval=1.0, max_tickers=3, max_failures=2,
+                               max_backoff=0.2, tick=0.02)
+    try:
+        if refresher.get("AAPL") is None:
+            refresher.publish("AAPL", 99.0)  # what /api/price does on a miss
+        time.sleep(0.5)
+        _check("cold", up.calls.count("AAPL") == 0, f"{up.calls.count('AAPL')} scheduled fetch within half an interval")
+        time.sleep(0.7)
+        _check("cold", up.calls.count("AAPL") == 1, f"{up.calls.count('AAPL')} scheduled fetch after one interval")
+
+        refresher.get("MSFT", cold_fetch=False)
+        time.sleep(0.1)
+        _check("stream", up.calls.count("MSFT") == 1, f"{up.calls.count('MSFT')} fetch on the next tick")
+
+        refresher.touch("BOGUS", cold_fetch=False)
+        for t in ("TSLA", "NVDA"):
+            refresher.get(t)
+            refresher.publish(t, 1.0)
+        stats = refresher.stats()
+        _check("cap", set(stats["tickers"]) == {"AAPL", "MSFT", "BOGUS"} and stats["rejected"] == 2
+               and refresher.get("TSLA") is None, f"registered {sorted(stats['tickers'])}, rejected {stats['rejected']}")
+
+        time.sleep(0.6)
+        stats = refresher.stats()
+        _check("failing", "BOGUS" not in stats["tickers"] and stats["evicted_failing"] == 1,
+               f"{up.calls.count('BOGUS')} failed fetches, evicted {stats['evicted_failing']}")
+    finally:
+        refresher.stop()
+
+
+if __name__ == "__main__":
+    main()
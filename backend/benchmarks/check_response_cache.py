@@ -0,0 +1,68 @@
+"""Check that an invalidation racing with a cached view is not undone.
+
+For each backend (memory, sqlite), serves a `@cached` view from a small Flask
+app whose first run calls `invalidate()` after reading the data (a write
+committed while the view was building its body), then checks:
+
+- stale:  that body is answered but not stored (stats "stale" counts it)
+- fresh:  the next request runs the view again and gets the new data
+- cached: the request after that is a hit
+
+Exits non-zero on the first failed check.
+
+Usage (from backend/):
+    python benchmarks/check_response_cache.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from response_cache import MemoryBackend, ResponseCache, SQLiteBackend  # noqa: E402
+
+
+def _check(label: str, ok: bool, detail: str) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {label:<16} {detail}")
+    if not ok:
+        sys.exit(1)
+
+
+def run(backend) -> None:
+    cache = ResponseCache(backend)
+    app = Flask(__name__)
+    state = {"value": 1, "runs": 0}
+
+    @app.route("/value")
+    @cache.cached("value", ttl=60)
+    def value():
+        state["runs"] += 1
+        body = jsonify({"value": state["value"]})  # read before the write below
+        if state["runs"] == 1:
+            state["value"] = 2
+            cache.invalidate("value")
+        return body
+
+    client = app.test_client()
+    first = client.get("/value").get_json()["value"]
+    _check(f"{backend.name} stale", first == 1 and cache.stats()["stale"] == 1 and backend.size() == 0,
+           f"answered {first}, stored {backend.size()}, stale {cache.stats()['stale']}")
+    second = client.get("/value").get_json()["value"]
+    _check(f"{backend.name} fresh", second == 2 and state["runs"] == 2, f"answered {second} after {state['runs']} runs")
+    third = client.get("/value").get_json()["value"]
+    _check(f"{backend.name} cached", third == 2 and state["runs"] == 2 and cache.hits == 1,
+           f"answered {third}, {cache.hits} hit")
+
+
+def main() -> None:
+    run(MemoryBackend())
+    run(SQLiteBackend(os.path.join(tempfile.mkdtemp(), "check_response_cache.db")))
+
+
+if __name__ == "__main__":
+    main()
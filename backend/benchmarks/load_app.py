@@ -0,0 +1,54 @@
+"""The Flask app with every upstream pointed at the local stubs (benchmarks/stubs.py).
+
+For offline load tests (benchmarks/loadtest.py):
+
+- STUB_YAHOO_URL: yfinance calls become one GET to the stub's Yahoo shaped
+  chart (single ticker) or quote (batch) endpoint, through the shared
+  http_client, the "yfinance" concurrency limit and upstream metrics
+- STUB_IAM_URL: the three Moroccan sources fetch <url>/iam/<source>
+- OPENAI_BASE_URL / GROQ_BASE_URL (read by llm.py) cover the chat providers
+
+Run it like the real app:
+
+    gunicorn -k gevent -w 1 --pythonpath benchmarks,. load_app:app
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Dict, Iterable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data  # noqa: E402
+from app import app  # noqa: E402,F401
+from http_client import http_client  # noqa: E402
+from metrics import time_upstream  # noqa: E402
+
+_YAHOO = os.getenv("STUB_YAHOO_URL", "").rstrip("/")
+_IAM = os.getenv("STUB_IAM_URL", "").rstrip("/")
+
+
+def _stub_price(ticker: str) -> float:
+    with http_client.limit("yfinance"), time_upstream("yfinance"):
+        page = http_client.get(f"{_YAHOO}/yf/v8/finance/chart/{ticker.upper()}", timeout=10)
+    return float(json.loads(page.content)["chart"]["result"][0]["meta"]["regularMarketPrice"])
+
+
+def _stub_prices(tickers: Iterable[str]) -> Dict[str, float]:
+    symbols = list(dict.fromkeys(t.upper() for t in tickers if t))
+    if not symbols:
+        return {}
+    with http_client.limit("yfinance"), time_upstream("yfinance"):
+        page = http_client.get(f"{_YAHOO}/yf/v7/finance/quote?symbols={','.join(symbols)}", timeout=10)
+    return {q["symbol"]: float(q["regularMarketPrice"]) for q in json.loads(page.content)["quoteResponse"]["result"]}
+
+
+if _YAHOO:
+    market_data.get_international_price = _stub_price
+    market_data.get_international_prices = _stub_prices
+if _IAM:
+    for _src in market_data.IAM_SOURCES:
+        _src["url"] = f"{_IAM}/iam/{_src['name']}"
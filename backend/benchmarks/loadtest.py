@@ -0,0 +1,320 @@
+"""End-to-end load test of the API against offline upstream stubs.
+
+1. database: --db (reused when it already has users), otherwise a temporary
+   SQLite file seeded by benchmarks/seed.py (--users / --challenges / --trades)
+2. upstreams: four stubs (benchmarks/stubs.py) standing in for yfinance, the
+   Moroccan quote sites, OpenAI and Groq, each with its own latency and
+   failure rate (--latency / --failures, e.g. "iam=0.4,openai=0.8")
+3. server: `gunicorn -k gevent -w --workers` on benchmarks/load_app.py, the
+   real app with every upstream pointed at the stubs
+4. traffic: --concurrency closed-loop clients pick a route for every request
+   from a weighted mix (--mix: a preset below or "price=5,trade=1,...") for
+   --duration seconds, after --warmup seconds that are not recorded
+
+   browse:  price 45, leaderboard 20, users 20, trade 10, chat 5
+   trading: trade 50, price 40, leaderboard 10
+   chat:    chat 60, price 20, leaderboard 20
+
+Results (throughput and p50 / p95 / p99 / max latency per route, errors,
+the run's parameters and the git revision) are written as JSON to --out.
+With --baseline, each route is compared with a previous result file and the
+run exits non-zero when a p95 grows, or a throughput drops, by more than
+--tolerance.
+
+Usage (from backend/, needs gunicorn, gevent and httpx installed):
+    python benchmarks/seed.py --url sqlite:////tmp/load.db
+    python benchmarks/loadtest.py --db sqlite:////tmp/load.db --mix browse --duration 60
+    python benchmarks/loadtest.py --db sqlite:////tmp/load.db --baseline benchmarks/results/before.json
+    python benchmarks/loadtest.py --users 2000 --challenges 10000 --trades 400000   # quick, self-seeded
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, BACKEND)
+
+from seed import SYMBOLS, seed  # noqa: E402
+from stubs import serve_stub  # noqa: E402
+
+ROUTES = ("price", "trade", "leaderboard", "users", "chat")
+MIXES: Dict[str, Dict[str, float]] = {
+    "browse": {"price": 45, "leaderboard": 20, "users": 20, "trade": 10, "chat": 5},
+    "trading": {"trade": 50, "price": 40, "leaderboard": 10},
+    "chat": {"chat": 60, "price": 20, "leaderboard": 20},
+}
+UPSTREAMS = ("yahoo", "iam", "openai", "groq")
+DEFAULT_LATENCY = {"yahoo": 0.15, "iam": 0.4, "openai": 0.3, "groq": 0.2}
+QUESTIONS = (
+    "Qu'est-ce qu'un stop loss ?",
+    "Comment fonctionne la limite de perte journalière ?",
+    "Quelle est la différence entre achat et vente à découvert ?",
+    "Comment calculer mon profit en pourcentage ?",
+    "Que se passe-t-il si je dépasse la perte maximale ?",
+    "Quel est l'objectif de profit pour réussir le challenge ?",
+    "Comment est calculé le classement ?",
+    "Puis-je trader le Bitcoin pendant le week-end ?",
+)
+
+
+def _parse_pairs(raw: str, keys, what: str) -> Dict[str, float]:
+    pairs = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        key, _, value = part.partition("=")
+        if key not in keys:
+            raise SystemExit(f"{what}: unknown key {key!r} (expected one of {', '.join(keys)})")
+        pairs[key] = float(value)
+    return pairs
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database URL (default: temporary SQLite, seeded)")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--challenges", type=int, default=500_000)
+    parser.add_argument("--trades", type=int, default=10_000_000)
+    parser.add_argument("--mix", default="browse", help="preset (browse, trading, chat) or route=weight,...")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--latency", default="", help="stub latency in seconds, e.g. yahoo=0.15,iam=0.4")
+    parser.add_argument("--failures", default="", help="stub failure rate, e.g. iam=0.2,openai=0.5")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--baseline", help="previous result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    args.weights = dict(MIXES[args.mix]) if args.mix in MIXES else _parse_pairs(args.mix, ROUTES, "--mix")
+    args.latencies = {**DEFAULT_LATENCY, **_parse_pairs(args.latency, UPSTREAMS, "--latency")}
+    args.failure_rates = _parse_pairs(args.failures, UPSTREAMS, "--failures")
+    return args
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _prepare_db(args) -> Dict[str, object]:
+    """Seed the database if needed; return its counts and samples used to build requests."""
+    from sqlalchemy import create_engine, text
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            seeded = conn.execute(text("SELECT COUNT(*) FROM users")).scalar() > 0
+    except Exception:
+        seeded = False
+    if not seeded:
+        print(f"seeding {url} ...", file=sys.stderr)
+        print(json.dumps(seed(url, args.users, args.challenges, args.trades)), file=sys.stderr)
+    with engine.connect() as conn:
+        counts = {
+            table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in ("users", "user_challenges", "trades")
+        }
+        active = [row[0] for row in conn.execute(
+            text("SELECT id FROM user_challenges WHERE status = 'active' ORDER BY id LIMIT 5000")
+        )]
+        names = [row[0] for row in conn.execute(text("SELECT username FROM users ORDER BY id LIMIT 5000"))]
+    engine.dispose()
+    return {"url": url, "counts": counts, "active": active, "names": names}
+
+
+def _request(route: str, db: Dict[str, object], rng: random.Random):
+    """(method, path, json body) of one request on `route`."""
+    if route == "price":
+        return "GET", f"/api/price/{rng.choice(SYMBOLS)}", None
+    if route == "trade":
+        price = round(rng.uniform(50.0, 500.0), 2)
+        return "POST", "/api/trade", {
+            "challenge_id": rng.choice(db["active"]), "symbol": rng.choice(SYMBOLS),
+            "type": rng.choice(("buy", "sell")), "quantity": rng.randint(1, 5),
+            "open_price": price, "close_price": round(price * (1.0 + rng.gauss(0.0, 0.002)), 2),
+        }
+    if route == "leaderboard":
+        return "GET", "/api/leaderboard" + rng.choice(("", "", "?status=active", "?plan=pro")), None
+    if route == "users":
+        if rng.random() < 0.3:
+            return "GET", f"/api/users?q={rng.choice(db['names'])[:7]}&limit=20", None
+        return "GET", f"/api/users?limit=50&cursor={rng.randint(0, max(1, db['counts']['users'] - 50))}", None
+    # chat: mostly recurring questions (cache hits), some never seen (provider round trip)
+    question = rng.choice(QUESTIONS)
+    if rng.random() < 0.3:
+        question += f" (cas {rng.randint(1, 10**9)})"
+    return "POST", "/api/chat", {"message": question}
+
+
+async def _drive(base: str, args, db, stop_warmup: float, stop: float, samples: Dict[str, List]) -> None:
+    routes = list(args.weights)
+    weights = [args.weights[r] for r in routes]
+    # Idle connections are dropped before gunicorn's 2 s keep-alive closes them under us
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency,
+                          keepalive_expiry=1.0)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60.0) as client:
+        async def worker(seed_value: int) -> None:
+            rng = random.Random(seed_value)
+            while True:
+                now = time.perf_counter()
+                if now >= stop:
+                    return
+                route = rng.choices(routes, weights)[0]
+                method, path, body = _request(route, db, rng)
+                try:
+                    resp = await client.request(method, path, json=body)
+                    await resp.aread()
+                    status = resp.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                if now >= stop_warmup:
+                    samples[route].append((time.perf_counter() - now, status))
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+
+
+def _pct(values: List[float], q: float) -> float:
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1e3, 2) if values else 0.0
+
+
+def _summarize(samples: Dict[str, List], duration: float) -> Dict[str, Dict[str, object]]:
+    summary = {}
+    for route, rows in samples.items():
+        latencies = sorted(lat for lat, _ in rows)
+        statuses: Dict[str, int] = {}
+        for _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(n for s, n in statuses.items() if not s.isdigit() or int(s) >= 500)
+        summary[route] = {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / duration, 2),
+            "p50_ms": _pct(latencies, 0.50),
+            "p95_ms": _pct(latencies, 0.95),
+            "p99_ms": _pct(latencies, 0.99),
+            "max_ms": round(latencies[-1] * 1e3, 2) if latencies else 0.0,
+            "errors": errors,
+            "statuses": statuses,
+        }
+    return summary
+
+
+def _compare(result: Dict[str, object], baseline_path: str, tolerance: float) -> bool:
+    """Print per-route deltas against a previous result; False when something regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    for route, now in result["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or not before["requests"] or not now["requests"]:
+            continue
+        p95 = now["p95_ms"] / before["p95_ms"] - 1.0 if before["p95_ms"] else 0.0
+        rps = now["throughput_rps"] / before["throughput_rps"] - 1.0 if before["throughput_rps"] else 0.0
+        regressed = p95 > tolerance or rps < -tolerance
+        ok = ok and not regressed
+        print(f"{'FAIL' if regressed else 'ok  '} {route:<12} p95 {before['p95_ms']:>8.2f} -> {now['p95_ms']:>8.2f} ms "
+              f"({p95:+.0%})  throughput {before['throughput_rps']:>8.2f} -> {now['throughput_rps']:>8.2f} /s ({rps:+.0%})")
+    return ok
+
+
+def _git_revision() -> str:
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True)
+    return out.stdout.strip() or "unknown"
+
+
+def main() -> None:
+    args = _parse_args()
+    db = _prepare_db(args)
+    if not db["active"]:
+        raise SystemExit("no active challenge in the database: nothing to trade on")
+
+    stubs = {}
+    for name in UPSTREAMS:
+        url, stub = serve_stub(latency=args.latencies[name], failure_rate=args.failure_rates.get(name, 0.0))
+        stubs[name] = (url, stub)
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=db["url"],
+        SECRET_KEY="bench-secret",
+        STUB_YAHOO_URL=stubs["yahoo"][0],
+        STUB_IAM_URL=stubs["iam"][0],
+        OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"{stubs['openai'][0]}/v1",
+        GROQ_API_KEY="stub", GROQ_BASE_URL=stubs["groq"][0],
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", str(args.workers), "--worker-connections", "2000",
+         "-b", f"127.0.0.1:{port}", "--pythonpath", f"{HERE},{BACKEND}", "--log-level", "warning", "load_app:app"],
+        cwd=BACKEND,
+        env=env,
+    )
+    samples: Dict[str, List] = {route: [] for route in args.weights}
+    try:
+        base = f"http://127.0.0.1:{port}"
+        for _ in range(300):
+            try:
+                httpx.get(f"{base}/api/db-pool/stats", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        started = time.perf_counter()
+        asyncio.run(_drive(base, args, db, started + args.warmup, started + args.warmup + args.duration, samples))
+        server = {name: httpx.get(f"{base}/api/{name}/stats", timeout=5.0).json()
+                  for name in ("price-cache", "chat-cache", "response-cache", "db-pool")}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    routes = _summarize(samples, args.duration)
+    total = sum(r["requests"] for r in routes.values())
+    result = {
+        "timestamp": dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git": _git_revision(),
+        "params": {
+            "mix": args.weights, "concurrency": args.concurrency, "duration": args.duration,
+            "warmup": args.warmup, "workers": args.workers, "cpus": os.cpu_count(),
+            "stub_latency": args.latencies, "stub_failures": args.failure_rates,
+        },
+        "database": {"url": db["url"].split("@")[-1], **db["counts"]},
+        "total": {"requests": total, "throughput_rps": round(total / args.duration, 2),
+                  "errors": sum(r["errors"] for r in routes.values())},
+        "routes": routes,
+        "upstream_requests": {name: stub.requests for name, (_, stub) in stubs.items()},
+        "server": server,
+    }
+
+    out = args.out or os.path.join(HERE, "results", f"loadtest-{dt.datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+
+    print(f"{'route':<12} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, r in sorted(routes.items()):
+        print(f"{route:<12} {r['throughput_rps']:>8.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['errors']:>7}")
+    print(f"{'total':<12} {result['total']['throughput_rps']:>8.2f}  -> {out}")
+    if args.baseline and not _compare(result, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
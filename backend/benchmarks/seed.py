@@ -0,0 +1,172 @@
+"""Synthetic database generator for benchmarks and load tests.
+
+Fills a database (created / migrated first) with:
+
+- --users users (trader<i> / trader<i>@example.com, all with the password
+  PASSWORD, hashed once)
+- --challenges challenges spread over the users, on the four plans, started
+  over the last 180 days
+- --trades trades, skewed so a few challenges trade a lot (power law), on a
+  handful of symbols; --open-fraction of them are still open (no close)
+
+Challenge figures (current_equity, total_pnl, profit_pct, status) are derived
+from the generated trades with the same rules as services.evaluate_rules on
+the total loss and the profit target, so the leaderboard, users list and risk
+engine see consistent data. Trades are generated twice from the same seeds
+(once to total the P&L per challenge, once to insert them after their
+challenges), so memory stays bounded by --chunk.
+
+Usage (from backend/):
+    python benchmarks/seed.py --url sqlite:////tmp/load.db [--users 100000] [--challenges 500000] [--trades 10000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "bench-password"
+SYMBOLS = ("BTC-USD", "ETH-USD", "AAPL", "MSFT", "TSLA", "EURUSD=X", "IAM")
+PLANS = (5000.0, 10000.0, 25000.0, 50000.0)
+_BASE_PRICE = np.array([60000.0, 3000.0, 190.0, 420.0, 250.0, 1.08, 95.0])
+
+
+def _trade_chunk(seed: int, index: int, size: int, challenges: int, open_fraction: float):
+    """Chunk `index` of the trades: (challenge slot, symbol, buy, qty, open, close, pnl, is open, seconds after the start)."""
+    rng = np.random.default_rng([seed, index])
+    # Power law: low challenge slots trade far more often than high ones
+    slot = np.minimum((rng.power(0.35, size) * challenges).astype(np.int64), challenges - 1)
+    symbol = rng.integers(0, len(SYMBOLS), size)
+    buy = rng.random(size) < 0.5
+    # 500 to 5000 of notional per trade (one unit at least for the expensive symbols)
+    qty = np.maximum(1, (rng.uniform(500.0, 5000.0, size) / _BASE_PRICE[symbol]).astype(np.int64))
+    open_price = np.round(_BASE_PRICE[symbol] * (1.0 + rng.normal(0.0, 0.02, size)), 4)
+    close_price = np.round(open_price * (1.0 + rng.normal(0.0, 0.004, size)), 4)
+    pnl = np.round(np.where(buy, close_price - open_price, open_price - close_price) * qty, 2)
+    is_open = rng.random(size) < open_fraction
+    pnl[is_open] = 0.0  # no realized P&L until closed
+    offset = rng.integers(0, 30 * 86400, size)
+    return slot, symbol, buy, qty, open_price, close_price, pnl, is_open, offset
+
+
+def _chunks(total: int, chunk: int):
+    for index, lo in enumerate(range(0, total, chunk)):
+        yield index, min(chunk, total - lo)
+
+
+def seed(url: str, users: int, challenges: int, trades: int, open_fraction: float = 0.01,
+         chunk: int = 200_000, seed_value: int = 7, quiet: bool = False) -> dict:
+    """Create and fill the database at `url`. Returns counts and timings."""
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy import create_engine
+    from werkzeug.security import generate_password_hash
+
+    from migrations import upgrade
+    from models import ChallengeStatusEnum, Trade, User, UserChallenge
+    from services import PROFIT_TARGET
+
+    def progress(msg: str) -> None:
+        if not quiet:
+            print(f"\r{msg}", end="", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    engine = create_engine(url)
+    upgrade(engine)
+    rng = np.random.default_rng(seed_value)
+    now = dt.datetime.utcnow().replace(microsecond=0)
+
+    pwhash = generate_password_hash(PASSWORD)
+    with engine.begin() as conn:
+        for lo in range(0, users, chunk):
+            conn.execute(User.__table__.insert(), [
+                {"id": i + 1, "username": f"trader{i}", "email": f"trader{i}@example.com",
+                 "password_hash": pwhash, "role": "user"}
+                for i in range(lo, min(users, lo + chunk))
+            ])
+            progress(f"users {min(users, lo + chunk):,}/{users:,}")
+
+    # Challenge figures from the trades, first pass
+    total_pnl = np.zeros(challenges)
+    for index, size in _chunks(trades, chunk):
+        slot, *_rest, pnl, _open, _offset = _trade_chunk(seed_value, index, size, challenges, open_fraction)
+        total_pnl += np.bincount(slot, weights=pnl, minlength=challenges)
+
+    owner = rng.integers(1, users + 1, challenges)
+    balance = np.array(PLANS)[rng.integers(0, len(PLANS), challenges)]
+    total_limit = np.where(rng.random(challenges) < 0.5, 0.10, 0.08)
+    start_offset = rng.integers(0, 180 * 86400, challenges)
+    equity = np.maximum(balance + total_pnl, 0.0)
+    status = np.full(challenges, ChallengeStatusEnum.active.name, dtype=object)
+    status[equity >= balance * (1.0 + PROFIT_TARGET)] = ChallengeStatusEnum.passed.name
+    status[equity <= balance * (1.0 - total_limit)] = ChallengeStatusEnum.failed.name
+    with engine.begin() as conn:
+        for lo in range(0, challenges, chunk):
+            hi = min(challenges, lo + chunk)
+            conn.execute(UserChallenge.__table__.insert(), [
+                {"id": i + 1, "user_id": int(owner[i]), "start_balance": float(balance[i]),
+                 "current_equity": float(equity[i]), "status": status[i], "daily_loss_limit": 0.05,
+                 "total_loss_limit": float(total_limit[i]),
+                 "start_date": now - dt.timedelta(seconds=int(start_offset[i])),
+                 "status_changed_at": None if status[i] == "active" else now,
+                 "total_pnl": round(float(total_pnl[i]), 2),
+                 "profit_pct": round(float(total_pnl[i]) / float(balance[i]) * 100.0, 4)}
+                for i in range(lo, hi)
+            ])
+            progress(f"challenges {hi:,}/{challenges:,}      ")
+
+    # Second pass: the same trades, inserted
+    inserted = 0
+    with engine.begin() as conn:
+        for index, size in _chunks(trades, chunk):
+            slot, symbol, buy, qty, open_price, close_price, pnl, is_open, offset = _trade_chunk(
+                seed_value, index, size, challenges, open_fraction)
+            # Within the first 30 days of the challenge, never in the future
+            age = np.maximum(start_offset[slot] - offset, 0)
+            rows = []
+            for s, sym, b, q, op, cp, p, a, o in zip(
+                slot.tolist(), symbol.tolist(), buy.tolist(), qty.tolist(), open_price.tolist(),
+                close_price.tolist(), pnl.tolist(), age.tolist(), is_open.tolist(),
+            ):
+                rows.append({
+                    "challenge_id": s + 1, "symbol": SYMBOLS[sym], "type": "buy" if b else "sell",
+                    "quantity": q, "open_price": op, "close_price": None if o else cp,
+                    "profit_loss": None if o else p,
+                    "timestamp": now - dt.timedelta(seconds=a),
+                })
+            conn.execute(Trade.__table__.insert(), rows)
+            inserted += size
+            progress(f"trades {inserted:,}/{trades:,}      ")
+    if not quiet:
+        print(file=sys.stderr)
+    engine.dispose()
+    return {
+        "users": users,
+        "challenges": challenges,
+        "trades": trades,
+        "active": int((status == "active").sum()),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="database URL, e.g. sqlite:////tmp/load.db")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--challenges", type=int, default=500_000)
+    parser.add_argument("--trades", type=int, default=10_000_000)
+    parser.add_argument("--open-fraction", type=float, default=0.01)
+    parser.add_argument("--chunk", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(seed(args.url, args.users, args.challenges, args.trades, args.open_fraction, args.chunk, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""The Flask app wired to a synthetic price feed, for offline streaming benchmarks.
+
+Every refresher tick moves each requested price by a small random step
+(with probability FAKE_FEED_CHANGE_PROB) instead of calling yfinance or the
+Moroccan sites. Run it like the real app:
+
+    gunicorn -k gevent -w 1 --pythonpath benchmarks,. stream_app:app
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402,F401
+from price_refresher import price_refresher  # noqa: E402
+
+_CHANGE_PROB = float(os.getenv("FAKE_FEED_CHANGE_PROB", "0.5"))
+_prices = {}
+
+
+def _fake_fetch_many(tickers):
+    prices = {}
+    for t in tickers:
+        px = _prices.get(t, 100.0)
+        if random.random() < _CHANGE_PROB:
+            px = round(px * (1 + random.uniform(-0.001, 0.001)), 4)
+        _prices[t] = prices[t] = px
+    return prices, {}
+
+
+price_refresher.fetch_many = _fake_fetch_many
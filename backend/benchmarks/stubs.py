@@ -0,0 +1,213 @@
+"""Local stand-ins for the upstream services, for offline benchmarks.
+
+`serve_stub(latency, failure_rate)` starts an asyncio HTTP/1.1 server in a
+background thread and returns its base URL. It answers:
+
+- POST /v1/chat/completions, /openai/v1/chat/completions : OpenAI/Groq-compatible
+  chat completion (JSON, or SSE chunks when the request has "stream": true)
+- GET  /iam/<source> : one of the saved IAM fixture pages (ETag aware)
+- GET  /yf/v8/finance/chart/<SYMBOL>, /yf/v7/finance/quote?symbols=A,B : Yahoo
+  Finance shaped quotes (the price of each symbol follows a random walk)
+
+Latency is added before the response (time to first token for streams,
+then `token_interval` between chunks); `failure_rate` of requests get a 503.
+Streams count as aborted when the client hangs up before [DONE].
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPLY = "Un stop loss est un ordre qui clôture automatiquement une position pour limiter la perte."
+
+
+def _fixture(name: str) -> Tuple[bytes, str]:
+    with open(os.path.join(HERE, "fixtures", f"{name}.html"), "rb") as f:
+        body = f.read()
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+class StubUpstream:
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, token_interval: float = 0.01) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.token_interval = token_interval
+        self.requests = 0
+        self.connections = 0
+        self.streams_started = 0
+        self.streams_completed = 0
+        self.streams_aborted = 0
+        self._fixtures: Dict[str, Tuple[bytes, str]] = {}
+        self._quotes: Dict[str, float] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    k, v = line.decode().split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                self.requests += 1
+                await self.respond(method, path, headers, body, writer, reader)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            return
+        finally:
+            writer.close()
+
+    async def respond(self, method, path, headers, body, writer, reader=None) -> None:
+        if random.random() < self.failure_rate:
+            await asyncio.sleep(self.latency)
+            self._write(writer, 503, b'{"error": "stub failure"}', "application/json")
+            return
+
+        if method == "POST" and path.endswith("/chat/completions"):
+            req = json.loads(body or b"{}")
+            if req.get("stream"):
+                await self._stream_chat(req, writer, reader)
+                return
+            await asyncio.sleep(self.latency)
+            payload = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": req.get("model", "stub"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+            }
+            self._write(writer, 200, json.dumps(payload).encode(), "application/json")
+            return
+
+        if method == "GET" and path.startswith("/iam/"):
+            name = path.rsplit("/", 1)[1]
+            if name not in self._fixtures:
+                self._fixtures[name] = _fixture(name)
+            page, etag = self._fixtures[name]
+            await asyncio.sleep(self.latency)
+            if headers.get("if-none-match") == etag:
+                self._write(writer, 304, b"", "text/html", {"ETag": etag})
+            else:
+                self._write(writer, 200, page, "text/html; charset=utf-8", {"ETag": etag})
+            return
+
+        if method == "GET" and path.startswith("/yf/"):
+            url = urlsplit(path)
+            if url.path.startswith("/yf/v8/finance/chart/"):
+                symbol = url.path.rsplit("/", 1)[1].upper()
+                payload = {"chart": {"result": [self._chart(symbol)], "error": None}}
+            elif url.path == "/yf/v7/finance/quote":
+                symbols = [s.strip().upper() for s in parse_qs(url.query).get("symbols", [""])[0].split(",") if s.strip()]
+                payload = {"quoteResponse": {"result": [
+                    {"symbol": s, "regularMarketPrice": self._quote(s)} for s in symbols
+                ], "error": None}}
+            else:
+                payload = None
+            if payload is not None:
+                await asyncio.sleep(self.latency)
+                self._write(writer, 200, json.dumps(payload).encode(), "application/json")
+                return
+
+        self._write(writer, 404, b'{"error": "not found"}', "application/json")
+
+    def _quote(self, symbol: str) -> float:
+        price = self._quotes.get(symbol)
+        if price is None:
+            price = 50.0 + (int(hashlib.sha1(symbol.encode()).hexdigest()[:6], 16) % 20000) / 10.0
+        price = round(price * (1.0 + random.gauss(0.0, 0.0005)), 4)
+        self._quotes[symbol] = price
+        return price
+
+    def _chart(self, symbol: str) -> Dict[str, object]:
+        price = self._quote(symbol)
+        now = int(time.time()) // 60 * 60
+        return {
+            "meta": {"symbol": symbol, "currency": "USD", "regularMarketPrice": price, "dataGranularity": "1m"},
+            "timestamp": [now],
+            "indicators": {"quote": [{"open": [price], "high": [price], "low": [price], "close": [price], "volume": [0]}]},
+        }
+
+    async def _stream_chat(self, req, writer, reader=None) -> None:
+        self.streams_started += 1
+        try:
+            await self._stream_words(req, writer, reader)
+        except ConnectionError:
+            self.streams_aborted += 1
+            raise
+        self.streams_completed += 1
+
+    async def _stream_words(self, req, writer, reader=None) -> None:
+        words = REPLY.split(" ")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        await writer.drain()
+        await asyncio.sleep(self.latency)  # time to first token
+        for i, word in enumerate(words):
+            if writer.is_closing() or (reader is not None and reader.at_eof()):
+                raise ConnectionResetError("client went away")
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": req.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                             "finish_reason": None}],
+            }
+            self._chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(self.token_interval)
+        self._chunk(writer, b"data: [DONE]\n\n")
+        self._chunk(writer, b"")
+        await writer.drain()
+
+    @staticmethod
+    def _chunk(writer, data: bytes) -> None:
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    @staticmethod
+    def _write(writer, status: int, body: bytes, content_type: str, extra: Dict[str, str] = None) -> None:
+        reason = {200: "OK", 304: "Not Modified", 404: "Not Found", 503: "Service Unavailable"}[status]
+        head = [f"HTTP/1.1 {status} {reason}", f"Content-Type: {content_type}", f"Content-Length: {len(body)}"]
+        head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+
+def serve_stub(
+    latency: float = 0.2, failure_rate: float = 0.0, token_interval: float = 0.01
+) -> Tuple[str, StubUpstream]:
+    """Start a stub upstream in a daemon thread. Returns (base_url, stub)."""
+    stub = StubUpstream(latency, failure_rate, token_interval)
+    started = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(stub.handle, "127.0.0.1", 0, backlog=4096))
+        holder["port"] = server.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="stub-upstream", daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{holder['port']}", stub
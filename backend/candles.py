@@ -0,0 +1,387 @@
+"""Local OHLCV candle store for charts and backtests.
+
+Bars fetched from yfinance are kept per ticker and interval under
+CANDLE_STORE_DIR, one columnar file per series:
+
+- <TICKER>/<interval>.npy   float64 array of shape (6, n): rows are the columns
+                            t (epoch seconds, bar start), open, high, low,
+                            close, volume, sorted by t
+- <TICKER>/<interval>.json  time ranges already fetched ("coverage") and when
+                            the tail was last asked upstream ("tail_checked")
+
+A download that succeeds covers its range, bars or not (a closed market has
+none), but only up to CANDLE_FEED_DELAY before now: upstream may still add
+bars after that (delayed feeds), so near the tail the coverage stops at the
+last bar returned. A download that fails (CandleFetchError) covers nothing
+and is retried on the next request.
+
+Reads memory-map the .npy file and return a view of the requested window
+(two binary searches on the t row, no copy). Only the parts of a request not
+covered yet are downloaded; new bars are merged and the file is replaced
+atomically, so readers holding the previous map keep a consistent snapshot.
+The tail (past the last covered time) is asked at most once per CANDLE_TAIL_TTL.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:  # cross-process lock around a series update (not available on Windows)
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Flexible imports whether run as a package or a script
+try:
+    from .http_client import http_client
+    from .metrics import time_upstream
+    from .config import CANDLE_FEED_DELAY, CANDLE_STORE_DIR, CANDLE_TAIL_TTL, CANDLES_MAX_BARS
+except ImportError:
+    from http_client import http_client
+    from metrics import time_upstream
+    from config import CANDLE_FEED_DELAY, CANDLE_STORE_DIR, CANDLE_TAIL_TTL, CANDLES_MAX_BARS
+
+COLUMNS = ("t", "open", "high", "low", "close", "volume")
+DAY = 86400
+
+# Bar length (seconds) of each supported yfinance interval
+INTERVALS: Dict[str, int] = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": DAY}
+
+# yfinance limits per interval: (max span of one download, max lookback), None = unlimited
+_LIMITS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "1m": (7 * DAY, 29 * DAY),
+    "5m": (59 * DAY, 59 * DAY),
+    "15m": (59 * DAY, 59 * DAY),
+    "30m": (59 * DAY, 59 * DAY),
+    "1h": (729 * DAY, 729 * DAY),
+    "1d": (None, None),
+}
+
+# Bars returned when the request has no start
+DEFAULT_BARS = 500
+
+# Scraped tickers have no bar history upstream
+UNSUPPORTED = {"IAM"}
+
+# The ticker names a directory under the store: "." and ".." (any all-dot name) are refused
+_TICKER = re.compile(r"^(?!\.+$)[A-Z0-9.^=\-]{1,20}$")
+
+# (ticker, interval, start, end) -> bars in [start, end); raises CandleFetchError on an upstream error
+Fetcher = Callable[[str, str, float, float], np.ndarray]
+
+
+class CandleFetchError(Exception):
+    """The upstream could not answer (as opposed to having no bars in the range)."""
+
+
+def _empty() -> np.ndarray:
+    return np.empty((len(COLUMNS), 0), dtype=np.float64)
+
+
+def download_candles(ticker: str, interval: str, start: float, end: float) -> np.ndarray:
+    """Download bars in [start, end) from yfinance as a (6, n) array sorted by t.
+
+    Returns an empty array when the range has no bars; raises
+    CandleFetchError when yfinance fails (yf.download would log the error
+    and return an empty frame, indistinguishable from a closed market).
+    """
+    import pandas as pd
+    import yfinance as yf
+    from yfinance.exceptions import YFPricesMissingError
+
+    try:
+        with http_client.limit("yfinance"), time_upstream("yfinance"):
+            df = yf.Ticker(ticker).history(
+                start=dt.datetime.fromtimestamp(start, dt.timezone.utc),
+                end=dt.datetime.fromtimestamp(end, dt.timezone.utc),
+                interval=interval,
+                auto_adjust=False,
+                actions=False,
+                raise_errors=True,
+            )
+    except YFPricesMissingError:
+        return _empty()
+    except Exception as e:
+        raise CandleFetchError(f"yfinance: {ticker} {interval}: {e}") from e
+    if df is None or df.empty:
+        return _empty()
+    df = df.dropna(subset=["Close"])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    t = (index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    return np.vstack([
+        np.asarray(t, dtype=np.float64),
+        *(df[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low", "Close", "Volume")),
+    ])
+
+
+def merge_bars(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Union of two bar arrays sorted by t; on equal t the bar from `new` wins."""
+    if not old.shape[1]:
+        return np.ascontiguousarray(new)
+    if not new.shape[1]:
+        return old
+    both = np.concatenate([old, new], axis=1)
+    both = both[:, np.argsort(both[0], kind="stable")]
+    t = both[0]
+    keep = np.append(t[1:] != t[:-1], True)  # last of each run of equal t
+    return np.ascontiguousarray(both[:, keep])
+
+
+def missing_ranges(coverage: List[List[float]], start: float, end: float) -> List[Tuple[float, float]]:
+    """Parts of [start, end) not in `coverage` (sorted, non-overlapping ranges)."""
+    gaps: List[Tuple[float, float]] = []
+    cursor = start
+    for lo, hi in coverage:
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def add_coverage(coverage: List[List[float]], start: float, end: float) -> List[List[float]]:
+    """Insert [start, end) into `coverage`, merging touching ranges."""
+    merged: List[List[float]] = []
+    for lo, hi in sorted(coverage + [[start, end]]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def parse_time(value: str) -> float:
+    """Epoch seconds or ISO-8601 (naive = UTC) to epoch seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    ts = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return ts.timestamp()
+
+
+def parse_range(interval: str, start: Optional[str], end: Optional[str], now: Optional[float] = None) -> Tuple[float, float]:
+    """Validate the ?interval=&start=&end= query of the candles route.
+
+    Raises ValueError with a user-facing message.
+    """
+    step = INTERVALS.get(interval)
+    if step is None:
+        raise ValueError(f"interval invalide (valeurs: {', '.join(INTERVALS)})")
+    now = time.time() if now is None else now
+    try:
+        end_ts = parse_time(end) if end else now
+        start_ts = parse_time(start) if start else end_ts - DEFAULT_BARS * step
+    except ValueError:
+        raise ValueError("start / end: timestamp epoch ou date ISO-8601 attendu") from None
+    if start_ts >= end_ts:
+        raise ValueError("start doit précéder end")
+    if (end_ts - start_ts) / step > CANDLES_MAX_BARS:
+        raise ValueError(f"plage trop large ({CANDLES_MAX_BARS} bougies maximum)")
+    return start_ts, end_ts
+
+
+class _Series:
+    __slots__ = ("path", "coverage_path", "lock_path", "lock", "version", "data", "coverage", "tail_checked")
+
+    def __init__(self, base: str) -> None:
+        self.path = base + ".npy"
+        self.coverage_path = base + ".json"
+        self.lock_path = base + ".lock"
+        self.lock = threading.Lock()
+        self.version: Optional[Tuple[int, int]] = None
+        self.data = _empty()
+        self.coverage: List[List[float]] = []
+        self.tail_checked = 0.0
+
+
+class CandleStore:
+    """Per ticker / interval OHLCV series, memory-mapped and filled incrementally."""
+
+    def __init__(self, root: str = CANDLE_STORE_DIR, fetcher: Optional[Fetcher] = None,
+                 tail_ttl: float = CANDLE_TAIL_TTL) -> None:
+        self.root = root
+        self.fetcher = fetcher or download_candles
+        self.tail_ttl = tail_ttl
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.local_hits = 0
+        self.downloads = 0
+        self.bars_downloaded = 0
+
+    def _get_series(self, ticker: str, interval: str) -> _Series:
+        key = (ticker, interval)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    root = os.path.realpath(self.root)
+                    directory = os.path.realpath(os.path.join(root, ticker))
+                    if os.path.dirname(directory) != root:
+                        raise ValueError(f"Historique indisponible pour {ticker}")
+                    os.makedirs(directory, exist_ok=True)
+                    series = self._series[key] = _Series(os.path.join(directory, interval))
+        return series
+
+    @staticmethod
+    def _refresh(series: _Series) -> None:
+        """Re-map the files if another thread or worker replaced them."""
+        try:
+            version = (os.stat(series.path).st_mtime_ns, os.stat(series.coverage_path).st_mtime_ns)
+        except FileNotFoundError:
+            return
+        if version == series.version:
+            return
+        with open(series.coverage_path) as f:
+            state = json.load(f)
+        series.data = np.load(series.path, mmap_mode="r")
+        series.coverage = state["coverage"]
+        series.tail_checked = state.get("tail_checked", 0.0)
+        series.version = version
+
+    @contextmanager
+    def _file_lock(self, series: _Series) -> Iterator[None]:
+        with series.lock:
+            if fcntl is None:
+                yield
+                return
+            with open(series.lock_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _gaps(self, series: _Series, interval: str, start: float, end: float, now: float) -> List[Tuple[float, float]]:
+        gaps = missing_ranges(series.coverage, start, min(end, now))
+        # The gap past the end of the coverage was asked upstream recently enough
+        coverage = series.coverage
+        if gaps and coverage and gaps[-1][0] == coverage[-1][1] and series.tail_checked > now - self.tail_ttl:
+            gaps.pop()
+        return gaps
+
+    def _fill(self, ticker: str, interval: str, series: _Series, gaps: List[Tuple[float, float]], now: float) -> None:
+        step = INTERVALS[interval]
+        span, lookback = _LIMITS[interval]
+        earliest = now - lookback if lookback else None
+        # Upstream bars before this are final; after it a delayed feed may still add some
+        settled = now - max(step, CANDLE_FEED_DELAY)
+        chunks = []
+        coverage = series.coverage
+        tail_checked = series.tail_checked
+        try:
+            for lo, hi in gaps:
+                # Align down so a bar already stored partially (the last one) is fetched again whole
+                fetch_lo = lo - lo % step
+                if earliest is not None and fetch_lo < earliest:
+                    # Beyond the upstream lookback nothing can be fetched, so it counts as covered
+                    coverage = add_coverage(coverage, lo, min(earliest, hi))
+                    fetch_lo = earliest
+                while fetch_lo < hi:
+                    fetch_hi = min(hi, fetch_lo + span) if span else hi
+                    chunk = self.fetcher(ticker, interval, fetch_lo, fetch_hi)  # CandleFetchError: not covered
+                    self._count("downloads")
+                    covered = min(fetch_hi, settled)
+                    if chunk.shape[1]:
+                        chunks.append(chunk)
+                        covered = max(covered, min(fetch_hi, chunk[0, -1] + step))
+                    if covered > max(fetch_lo, lo):
+                        coverage = add_coverage(coverage, max(fetch_lo, lo), covered)
+                    if fetch_hi > settled:
+                        tail_checked = now
+                    fetch_lo = fetch_hi
+        finally:
+            # Keep what was fetched before an upstream error
+            self._save(series, chunks, coverage, tail_checked)
+
+    def _save(self, series: _Series, chunks: List[np.ndarray], coverage: List[List[float]],
+              tail_checked: float) -> None:
+        if not chunks and coverage == series.coverage and tail_checked == series.tail_checked:
+            return
+        data = series.data
+        for chunk in chunks:
+            data = merge_bars(data, chunk)
+        self._count("bars_downloaded", n=sum(chunk.shape[1] for chunk in chunks))
+
+        tmp = f"{series.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, series.path)
+        tmp = f"{series.coverage_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"coverage": coverage, "tail_checked": tail_checked}, f)
+        os.replace(tmp, series.coverage_path)
+        series.version = None
+        self._refresh(series)
+
+    def candles(self, ticker: str, interval: str, start: float, end: float) -> np.ndarray:
+        """Bars with start <= t < end as a (6, n) read-only view (rows: COLUMNS).
+
+        Downloads the parts of the range that were never fetched first.
+        Raises ValueError for an unknown interval or an unsupported ticker,
+        CandleFetchError when a download fails.
+        """
+        ticker = ticker.upper()
+        if interval not in INTERVALS:
+            raise ValueError(f"interval invalide (valeurs: {', '.join(INTERVALS)})")
+        if ticker in UNSUPPORTED or not _TICKER.match(ticker):
+            raise ValueError(f"Historique indisponible pour {ticker}")
+
+        series = self._get_series(ticker, interval)
+        now = time.time()
+        self._refresh(series)
+        if self._gaps(series, interval, start, end, now):
+            self._count("requests")
+            with self._file_lock(series):
+                self._refresh(series)  # another worker may have filled it meanwhile
+                gaps = self._gaps(series, interval, start, end, now)
+                if gaps:
+                    self._fill(ticker, interval, series, gaps, now)
+        else:
+            self._count("requests", "local_hits")
+
+        data = series.data
+        lo, hi = np.searchsorted(data[0], (start - start % INTERVALS[interval], end), side="left")
+        return data[:, lo:hi]
+
+    def _count(self, *fields: str, n: int = 1) -> None:
+        with self._lock:
+            for field in fields:
+                setattr(self, field, getattr(self, field) + n)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "series": len(self._series),
+            "requests": self.requests,
+            "local_hits": self.local_hits,
+            "hit_ratio": self.local_hits / self.requests if self.requests else 0.0,
+            "downloads": self.downloads,
+            "bars_downloaded": self.bars_downloaded,
+            "bars_stored": sum(s.data.shape[1] for s in list(self._series.values())),
+        }
+
+
+candle_store = CandleStore()
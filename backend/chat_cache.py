@@ -0,0 +1,240 @@
+"""Answer cache for the chat assistant (exact + near-duplicate questions).
+
+Lookups go through two tiers, both in process and offline:
+
+1. exact: SHA-1 of the normalized prompt (lowercase, no accents, no
+   punctuation, collapsed spaces), so "Qu'est-ce qu'un stop loss ?" and
+   "qu est ce qu un stop-loss" share an entry
+2. similar: cosine similarity of character-trigram count vectors against the
+   cached prompts; an inverted index (trigram -> entries) picks the few
+   entries sharing the prompt's rarest trigrams, and only those are scored.
+   Trigrams cannot tell "BTC" from "ETH" or a question from its negation,
+   so a similar entry is only returned when both prompts have the same
+   numbers, negation words and capitalized entities (tickers), and every
+   other word of one has a near spelling twin in the other (typos, accents,
+   plurals); function words ("le", "du", "the") may differ
+
+Entries are bounded (LRU) and expire after CHAT_CACHE_TTL. Each entry keeps
+how long the provider took to answer, which is counted as latency saved on
+every hit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_TTL, CHAT_CACHE_SIMILARITY
+except ImportError:
+    from config import CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_TTL, CHAT_CACHE_SIMILARITY
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# Tickers and names as typed: "BTC", "IAM", "AAPL", "EURUSD"
+_ENTITY = re.compile(r"\b[A-Z][A-Z0-9]+\b")
+
+# Words that flip the meaning of a prompt: must match exactly for a similar hit
+NEGATIONS = frozenset((
+    "ne", "n", "pas", "non", "jamais", "aucun", "aucune", "rien", "sans", "ni",
+    "no", "not", "never", "nor", "cannot", "dont", "don", "doesn", "didn", "isn", "aren", "wasn", "won",
+    "shouldn", "wouldn", "couldn",
+))
+# Function words allowed to differ between two similar prompts
+STOPWORDS = frozenset((
+    "le", "la", "les", "l", "un", "une", "des", "du", "de", "d", "au", "aux", "a", "et", "ou", "en", "je",
+    "j", "tu", "il", "on", "nous", "vous", "me", "m", "te", "t", "se", "s", "ce", "c", "qu", "que", "qui",
+    "quoi", "est", "sont", "y", "mon", "ma", "mes", "son", "sa", "ses", "pour", "par", "sur", "dans",
+    "the", "an", "of", "to", "in", "for", "is", "are", "what", "my", "i", "do", "does",
+))
+# Trigram overlap (Dice) for two words to count as spellings of the same word
+_TWIN_MIN = 0.5
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    ascii_only = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", ascii_only).strip()
+
+
+def trigrams(normalized: str) -> Counter:
+    """Character trigram counts of each word, padded so word edges count."""
+    grams: Counter = Counter()
+    for word in normalized.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams[padded[i:i + 3]] += 1
+    return grams
+
+
+def key_terms(text: str, normalized: str) -> frozenset:
+    """Terms a similar prompt must share exactly: numbers, negation words and capitalized entities."""
+    words = normalized.split()
+    terms = {w for w in words if w in NEGATIONS or any(ch.isdigit() for ch in w)}
+    terms.update(normalize(e) for e in _ENTITY.findall(text))
+    return frozenset(terms)
+
+
+def _has_twin(word: str, others: Set[str]) -> bool:
+    grams = set(trigrams(word))
+    for other in others:
+        other_grams = set(trigrams(other))
+        if 2 * len(grams & other_grams) >= _TWIN_MIN * (len(grams) + len(other_grams)):
+            return True
+    return False
+
+
+def same_question(words: Set[str], terms: frozenset, other_words: Set[str], other_terms: frozenset) -> bool:
+    """Whether two prompts with close trigram vectors can share an answer (see the module docstring)."""
+    if terms != other_terms:
+        return False
+    mine = {w for w in words - other_words if w not in STOPWORDS}
+    theirs = {w for w in other_words - words if w not in STOPWORDS}
+    return all(_has_twin(w, theirs) for w in mine) and all(_has_twin(w, mine) for w in theirs)
+
+
+class _Entry:
+    __slots__ = ("reply", "grams", "norm", "words", "terms", "expires", "latency")
+
+    def __init__(self, reply: str, grams: Counter, words: Set[str], terms: frozenset,
+                 expires: float, latency: float) -> None:
+        self.reply = reply
+        self.grams = grams
+        self.norm = math.sqrt(sum(c * c for c in grams.values())) or 1.0
+        self.words = words
+        self.terms = terms
+        self.expires = expires
+        self.latency = latency
+
+
+class ChatCache:
+    """Bounded LRU + TTL cache of chat replies with a trigram similarity tier."""
+
+    # Entries scored exactly per similarity lookup (those sharing the most rare trigrams)
+    MAX_CANDIDATES = 32
+
+    def __init__(
+        self,
+        max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+        ttl: float = CHAT_CACHE_TTL,
+        threshold: float = CHAT_CACHE_SIMILARITY,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._index: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+        self.lookup_time = 0.0
+
+    @staticmethod
+    def _key(normalized: str) -> str:
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[Tuple[str, str]]:
+        """Return (reply, tier) with tier 'exact' or 'similar', or None on a miss."""
+        started = time.perf_counter()
+        normalized = normalize(text)
+        key = self._key(normalized)
+        now = time.time()
+        with self._lock:
+            try:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires > now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    self.latency_saved += entry.latency
+                    return entry.reply, "exact"
+
+                match = self._most_similar(
+                    trigrams(normalized), set(normalized.split()), key_terms(text, normalized), now
+                )
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    entry = self._entries[match]
+                    self.similar_hits += 1
+                    self.latency_saved += entry.latency
+                    return entry.reply, "similar"
+                self.misses += 1
+                return None
+            finally:
+                self.lookup_time += time.perf_counter() - started
+
+    def _most_similar(self, grams: Counter, words: Set[str], terms: frozenset, now: float) -> Optional[str]:
+        if not grams:
+            return None
+        # Candidates come from the rarest half of the prompt's trigrams: a prompt
+        # above the threshold shares most of them, and common trigrams ("qu ",
+        # " le") would otherwise pull in the whole index.
+        postings = sorted((self._index.get(g, ()) for g in grams), key=len)
+        overlap: Counter = Counter()
+        for keys in postings[: (len(postings) + 1) // 2]:
+            overlap.update(keys)
+        norm = math.sqrt(sum(c * c for c in grams.values()))
+        best_key, best = None, self.threshold
+        for key, _shared in overlap.most_common(self.MAX_CANDIDATES):
+            entry = self._entries[key]
+            if entry.expires <= now:
+                continue
+            dot = sum(count * entry.grams.get(gram, 0) for gram, count in grams.items())
+            score = dot / (norm * entry.norm)
+            if score >= best and same_question(words, terms, entry.words, entry.terms):
+                best_key, best = key, score
+        return best_key
+
+    def put(self, text: str, reply: str, latency: float = 0.0) -> None:
+        """Cache `reply` for `text`; `latency` is what the provider took to produce it."""
+        normalized = normalize(text)
+        if not normalized or not reply:
+            return
+        key = self._key(normalized)
+        entry = _Entry(reply, trigrams(normalized), set(normalized.split()), key_terms(text, normalized),
+                       time.time() + self.ttl, latency)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for gram in entry.grams:
+                self._index.setdefault(gram, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for gram in entry.grams:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "latency_saved_s": round(self.latency_saved, 3),
+                "avg_lookup_ms": round(self.lookup_time / lookups * 1e3, 4) if lookups else 0.0,
+            }
+
+
+chat_cache = ChatCache()
@@ -1,5 +1,106 @@
 import os
+import tempfile
 
 # Cette ligne vérifie si DATABASE_URL existe (sur Railway). 
 # Si elle n'existe pas (sur ton PC), elle utilise ton fichier SQLite.
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///tradesense_dev.db")
\ No newline at end of file
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///tradesense_dev.db")
+
+# Cache des prix (secondes). IAM est scrapé, on le rafraîchit moins souvent.
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "5"))
+PRICE_CACHE_TTL_IAM = float(os.getenv("PRICE_CACHE_TTL_IAM", "30"))
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "512"))
+
+# Rafraîchissement des prix en arrière-plan (secondes)
+PRICE_REFRESH_INTERVAL = float(os.getenv("PRICE_REFRESH_INTERVAL", "5"))
+PRICE_REFRESH_INTERVAL_IAM = float(os.getenv("PRICE_REFRESH_INTERVAL_IAM", "30"))
+PRICE_REFRESH_IDLE_TIMEOUT = float(os.getenv("PRICE_REFRESH_IDLE_TIMEOUT", "120"))
+PRICE_REFRESH_MAX_BACKOFF = float(os.getenv("PRICE_REFRESH_MAX_BACKOFF", "300"))
+PRICE_REFRESH_WORKERS = int(os.getenv("PRICE_REFRESH_WORKERS", "4"))
+# Nombre maximal de tickers suivis; au-delà, un nouveau ticker est servi sans rafraîchissement de fond
+PRICE_REFRESH_MAX_TICKERS = int(os.getenv("PRICE_REFRESH_MAX_TICKERS", "500"))
+# Un ticker est retiré après ce nombre d'échecs consécutifs
+PRICE_REFRESH_MAX_FAILURES = int(os.getenv("PRICE_REFRESH_MAX_FAILURES", "5"))
+
+# Scraping IAM: course entre sources ("p95" = relance après le p95 de la source
+# en tête, "all" = toutes en parallèle, "off" = séquentiel)
+IAM_HEDGE_MODE = os.getenv("IAM_HEDGE_MODE", "p95").lower()
+IAM_HEDGE_MIN_DELAY = float(os.getenv("IAM_HEDGE_MIN_DELAY", "0.5"))
+IAM_HEDGE_MAX_DELAY = float(os.getenv("IAM_HEDGE_MAX_DELAY", "3"))
+
+# Couche HTTP sortante (pool keep-alive, concurrence max par hôte)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "4"))
+HTTP_BODY_CACHE_ENTRIES = int(os.getenv("HTTP_BODY_CACHE_ENTRIES", "64"))
+
+# Délai max (secondes) d'un appel aux fournisseurs LLM (OpenAI / Groq)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+# Import en masse de trades (POST /api/trades/bulk)
+BULK_TRADES_MAX = int(os.getenv("BULK_TRADES_MAX", "100000"))
+# Avance tolérée (secondes) de l'horloge du client sur un timestamp de trade importé; au-delà, refusé
+TRADE_MAX_CLOCK_SKEW = float(os.getenv("TRADE_MAX_CLOCK_SKEW", "60"))
+
+# Pool de connexions SQLAlchemy (un seul moteur par processus, voir db.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Création / migration du schéma au démarrage de l'app (sinon: python migrations.py)
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
+
+# Cache des réponses GET de l'API (ETag / 304). "memory" = par worker, "sqlite" = partagé entre workers
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "tradesense_response_cache.db")
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# Délai max (secondes) avant le premier token d'un fournisseur LLM; au-delà, le suivant est lancé en parallèle
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "4"))
+
+# Cache des réponses du chat IA (questions identiques ou quasi identiques)
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "86400"))
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.85"))
+
+# Historique OHLCV (bougies) stocké localement en tableaux NumPy mappés en mémoire
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", os.path.join(tempfile.gettempdir(), "tradesense_candles"))
+# La bougie en cours n'est re-téléchargée qu'au plus une fois par CANDLE_TAIL_TTL secondes
+CANDLE_TAIL_TTL = float(os.getenv("CANDLE_TAIL_TTL", "60"))
+# Retard (secondes) des flux différés: les plages plus récentes ne sont tenues pour complètes que jusqu'à la dernière bougie reçue
+CANDLE_FEED_DELAY = float(os.getenv("CANDLE_FEED_DELAY", "1200"))
+CANDLES_MAX_BARS = int(os.getenv("CANDLES_MAX_BARS", "5000"))
+
+# Backtests des règles de challenge (backtest.py, POST /api/admin/backtest); 0 = tous les cœurs
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0"))
+BACKTEST_MAX_GRID = int(os.getenv("BACKTEST_MAX_GRID", "500"))
+
+# Moteur de risque (réévaluation des positions ouvertes à chaque prix publié)
+RISK_ENGINE_ENABLED = os.getenv("RISK_ENGINE_ENABLED", "1") == "1"
+# Rechargement des positions / equity depuis la base, et écriture groupée des challenges en échec (secondes)
+RISK_SYNC_INTERVAL = float(os.getenv("RISK_SYNC_INTERVAL", "10"))
+RISK_FLUSH_INTERVAL = float(os.getenv("RISK_FLUSH_INTERVAL", "0.5"))
+
+# Hachage des mots de passe dans un pool de processus (login / register); au-delà de
+# AUTH_HASH_WORKERS + AUTH_HASH_QUEUE hachages en cours, réponse 503 immédiate. 0 = en ligne
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+AUTH_HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", "8"))
+AUTH_HASH_TIMEOUT = float(os.getenv("AUTH_HASH_TIMEOUT", "5"))
+# Jetons signés renvoyés par /api/login: clé obligatoire hors mode debug, commune à tous les workers
+# (sans elle, l'app refuse de démarrer; en debug, une clé aléatoire par processus)
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "86400"))
+
+# Démarrage: import des modules lourds (pandas, yfinance, openai...) au chargement de l'app
+# plutôt qu'à la première requête; avec gunicorn --preload, une seule fois dans le master
+STARTUP_PRELOAD_MODULES = os.getenv("STARTUP_PRELOAD_MODULES", "1") == "1"
+# Tickers préchargés dans le master avant le fork des workers (ex: "BTC-USD,ETH-USD,IAM"); vide = aucun
+WARMUP_TICKERS = os.getenv("WARMUP_TICKERS", "")
+
+# Export des trades d'un challenge (GET /api/challenges/<id>/trades/export): lignes lues par lot du curseur serveur
+TRADES_EXPORT_CHUNK = int(os.getenv("TRADES_EXPORT_CHUNK", "1000"))
+
+# Mode ASGI (asgi.py): threads qui servent les routes Flask, pour qu'une requête lente n'en bloque pas d'autres
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "16"))
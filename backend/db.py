@@ -0,0 +1,168 @@
+"""Database engine and session factory (one pool per process).
+
+Every module gets its sessions from `SessionLocal` here, so a worker holds a
+single connection pool. Pool size, overflow, timeout, recycle and pre-ping
+come from config (DB_* environment variables). SQLite connections are
+switched to WAL with tuned pragmas so readers don't block the trade writer.
+
+After a fork the child starts with an empty pool of its own (see
+`_after_fork`), so the engine can be created before gunicorn forks workers.
+
+Schema creation is not a side effect of importing this module: call
+`init_schema()` at startup (app.py does when DB_AUTO_MIGRATE=1) or run
+`python migrations.py` as a deploy step.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import (
+        SQLALCHEMY_DATABASE_URL,
+        DB_POOL_SIZE,
+        DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT,
+        DB_POOL_RECYCLE,
+        DB_POOL_PRE_PING,
+    )
+    from .metrics import instrument_engine
+except ImportError:
+    from config import (
+        SQLALCHEMY_DATABASE_URL,
+        DB_POOL_SIZE,
+        DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT,
+        DB_POOL_RECYCLE,
+        DB_POOL_PRE_PING,
+    )
+    from metrics import instrument_engine
+
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # durable at checkpoints; safe with WAL
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-16000",  # 16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    """Create an engine with the configured pool (and SQLite pragmas when relevant)."""
+    kwargs: Dict[str, object] = {"future": True, "pool_pre_ping": DB_POOL_PRE_PING}
+    in_memory = _is_sqlite(url) and (":memory:" in url or url.rstrip("/") in {"sqlite:", "sqlite:/"})
+    if _is_sqlite(url):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not in_memory:
+        kwargs.update(
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    eng = create_engine(url, **kwargs)
+
+    if _is_sqlite(url):
+        @event.listens_for(eng, "connect")
+        def _sqlite_pragmas(dbapi_conn, _record) -> None:
+            cur = dbapi_conn.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                if in_memory and "journal_mode" in pragma:
+                    continue
+                cur.execute(pragma)
+            cur.close()
+
+    instrument_engine(eng)
+    return eng
+
+
+engine = make_engine()
+SessionLocal = scoped_session(sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True))
+
+
+def _after_fork() -> None:
+    # Connections opened before the fork (init_schema under gunicorn --preload) belong to the
+    # parent: forget them without closing, and let this process open its own
+    SessionLocal.registry.clear()
+    engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def init_schema() -> List[str]:
+    """Create missing tables and apply pending migrations. Returns the migration ids applied."""
+    try:
+        from .migrations import upgrade
+    except ImportError:
+        from migrations import upgrade
+    return upgrade(engine)
+
+
+def pool_stats() -> Dict[str, object]:
+    """Connection pool gauges and checkout wait times for this process."""
+    pool = engine.pool
+    stats: Dict[str, object] = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT,
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._wait_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                wait_avg_ms=round(pool.wait_total / pool.checkouts * 1e3, 3) if pool.checkouts else 0.0,
+                wait_max_ms=round(pool.wait_max * 1e3, 3),
+                timeouts=pool.timeouts,
+            )
+    return stats
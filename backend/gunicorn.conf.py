@@ -0,0 +1,42 @@
+"""Gunicorn settings (read automatically from the working directory).
+
+With `--preload` the app is imported once in the master and the workers are
+forked from it, sharing the imported modules copy-on-write (see startup.py).
+The gevent worker only monkey-patches after the fork, so when it is selected
+the patch is applied here first: otherwise the locks, sockets and threads
+created while importing the app would be the unpatched ones.
+"""
+
+import os
+import sys
+
+
+def _gevent_worker() -> bool:
+    args = sys.argv[1:] + os.getenv("GUNICORN_CMD_ARGS", "").split()
+    for i, arg in enumerate(args):
+        value = None
+        if arg in ("-k", "--worker-class") and i + 1 < len(args):
+            value = args[i + 1]
+        elif arg.startswith("--worker-class="):
+            value = arg.split("=", 1)[1]
+        elif arg.startswith("-k") and len(arg) > 2:
+            value = arg[2:]
+        if value and "gevent" in value:
+            return True
+    return False
+
+
+if _gevent_worker():
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def when_ready(server):
+    # Preloaded app: fetch the hot quotes once in the master, before the fork
+    if server.cfg.preload_app:
+        import startup
+
+        result = startup.warm_up()
+        if result:
+            server.log.info("Warm-up: %s tickers in %s ms", len(result["tickers"]), result["ms"])
@@ -0,0 +1,184 @@
+"""Price extraction from scraped HTML pages.
+
+Used by the Moroccan scraper in market_data. Instead of building a full
+BeautifulSoup tree of every downloaded page and trying every selector, the
+extractor:
+
+- tries first the strategy (CSS selector or text scan) that last produced a
+  price for the source, as given by the caller (market_data keeps it in the
+  source scoreboard); the extractor itself keeps no per-source state;
+- answers simple selectors (`.cls`, `#id`, `[attr='v']`) with a precompiled
+  regex over the raw HTML, and only parses a small window of markup around
+  the match (lxml when installed) when the element has nested markup;
+- runs the text fallbacks as regex scans over text nodes, without a tree.
+
+All patterns are compiled once at import time (or once per selector).
+"""
+
+from __future__ import annotations
+
+import html as htmllib
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:  # lxml is optional; html.parser is always available
+    import lxml  # noqa: F401
+
+    BS_PARSER = "lxml"
+except ImportError:
+    BS_PARSER = "html.parser"
+
+
+# Number patterns like 12,345.67 or 12.345,67 or 123.45
+_NUMBER_RE = re.compile(r"(\d{1,3}(?:[\.,]\d{3})*(?:[\.,]\d+)|\d+(?:[\.,]\d+)?)")
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"\s+")
+# Text node (between two tags) mentioning the ticker or the company name
+_IAM_TEXT_RE = re.compile(r">([^<]*(?:IAM|Itissalat)[^<]*)<", re.IGNORECASE)
+_KEYWORD_RE = re.compile(r"(?i)(cours|dernier|prix).*?(\d+[\.,]\d+)")
+
+# Simple selectors we can answer without a tree
+_CLASS_SEL_RE = re.compile(r"^\.([\w-]+)$")
+_ID_SEL_RE = re.compile(r"^#([\w-]+)$")
+_ATTR_SEL_RE = re.compile(r"""^\[([\w-]+)\s*=\s*['"]?([^'"\]]+)['"]?\]$""")
+
+# Bytes of markup parsed after a raw match when the value sits in nested tags
+FRAGMENT_WINDOW = 2048
+
+STRATEGY_IAM_TEXT = "text:iam"
+STRATEGY_KEYWORD = "text:keyword"
+
+
+def parse_float(text: str) -> Optional[float]:
+    """Extract the first float-looking number from text, normalizing separators."""
+    if not text:
+        return None
+    m = _NUMBER_RE.search(text)
+    if not m:
+        return None
+    num = m.group(1)
+    # Normalize: remove thousands separators and use dot as decimal
+    # Heuristic: if both comma and dot present, assume comma thousands, dot decimal
+    if "," in num and "." in num:
+        num = num.replace(",", "")
+    else:
+        # If only comma present, treat as decimal comma
+        num = num.replace(",", ".")
+    try:
+        return float(num)
+    except ValueError:
+        return None
+
+
+class CompiledSelector:
+    """A CSS selector prepared for raw-HTML matching and fragment parsing."""
+
+    __slots__ = ("css", "raw_re", "strainer_attrs")
+
+    def __init__(self, css: str) -> None:
+        self.css = css
+        self.raw_re: Optional[re.Pattern] = None
+        self.strainer_attrs: Optional[Dict[str, object]] = None
+
+        attr: Optional[str] = None
+        value_re = ""
+        m = _CLASS_SEL_RE.match(css)
+        if m:
+            attr, value_re = "class", r"(?:[^\"']*\s)?" + re.escape(m.group(1)) + r"(?:\s[^\"']*)?"
+            self.strainer_attrs = {"class": m.group(1)}
+        elif _ID_SEL_RE.match(css):
+            m = _ID_SEL_RE.match(css)
+            attr, value_re = "id", re.escape(m.group(1))  # type: ignore[union-attr]
+            self.strainer_attrs = {"id": m.group(1)}  # type: ignore[union-attr]
+        elif _ATTR_SEL_RE.match(css):
+            m = _ATTR_SEL_RE.match(css)
+            attr, value_re = m.group(1), re.escape(m.group(2))  # type: ignore[union-attr]
+            self.strainer_attrs = {m.group(1): m.group(2)}  # type: ignore[union-attr]
+
+        if attr is not None:
+            # Opening tag carrying the attribute, then its direct text up to the next tag
+            self.raw_re = re.compile(
+                r"<[a-zA-Z][^>]*?\s" + re.escape(attr) + r"\s*=\s*([\"'])" + value_re + r"\1[^>]*>([^<]*)",
+                re.IGNORECASE,
+            )
+
+
+class PriceExtractor:
+    """Extract a price from a page with compiled selectors and text scans."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._compiled: Dict[str, CompiledSelector] = {}
+
+    def _selector(self, css: str) -> CompiledSelector:
+        compiled = self._compiled.get(css)
+        if compiled is None:
+            compiled = CompiledSelector(css)
+            with self._lock:
+                self._compiled[css] = compiled
+        return compiled
+
+    @staticmethod
+    def strategies(selectors: List[str], first: Optional[str] = None) -> List[str]:
+        """Strategies in the order they will be tried, `first` (if known) ahead."""
+        order = list(selectors) + [STRATEGY_IAM_TEXT, STRATEGY_KEYWORD]
+        if first in order:
+            order.remove(first)
+            order.insert(0, first)
+        return order
+
+    def extract(self, source: str, html: str, selectors: List[str], first: Optional[str] = None) -> Tuple[float, str]:
+        """Return (price, strategy) or raise ValueError when nothing matches.
+
+        `first` is the strategy that last worked on `source`, tried before the others.
+        """
+        for strategy in self.strategies(selectors, first):
+            price = self.run(strategy, html)
+            if price is not None:
+                return price, strategy
+        raise ValueError(f"aucun prix trouvé sur {source}")
+
+    def run(self, strategy: str, html: str) -> Optional[float]:
+        if strategy == STRATEGY_IAM_TEXT:
+            for m in _IAM_TEXT_RE.finditer(html):
+                price = parse_float(htmllib.unescape(m.group(1)))
+                if price is not None:
+                    return price
+            return None
+        if strategy == STRATEGY_KEYWORD:
+            text = _SPACE_RE.sub(" ", _TAG_RE.sub(" ", _SCRIPT_STYLE_RE.sub(" ", html)))
+            for m in _KEYWORD_RE.finditer(htmllib.unescape(text)):
+                price = parse_float(m.group(0))
+                if price is not None:
+                    return price
+            return None
+        return self._run_selector(self._selector(strategy), html)
+
+    def _run_selector(self, sel: CompiledSelector, html: str) -> Optional[float]:
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        if sel.raw_re is not None:
+            m = sel.raw_re.search(html)
+            if m is None:
+                return None  # the attribute is not on the page at all
+            price = parse_float(htmllib.unescape(m.group(2).strip()))
+            if price is not None:
+                return price
+            # Value sits in nested markup: parse a small window starting at the element
+            window = html[m.start():m.start() + FRAGMENT_WINDOW]
+            el = BeautifulSoup(window, BS_PARSER).find(attrs=sel.strainer_attrs)
+            if el is not None:
+                price = parse_float(el.get_text(strip=True))
+                if price is not None:
+                    return price
+
+        if sel.strainer_attrs is not None:
+            fragment = BeautifulSoup(html, BS_PARSER, parse_only=SoupStrainer(attrs=sel.strainer_attrs))
+            el = fragment.find()
+        else:
+            el = BeautifulSoup(html, BS_PARSER).select_one(sel.css)
+        if el is None:
+            return None
+        return parse_float(el.get_text(strip=True))
@@ -0,0 +1,225 @@
+"""Shared outbound HTTP layer for market data.
+
+One `requests.Session` per process with keep-alive pools per host, bounded
+concurrency per upstream, conditional GETs (ETag / Last-Modified) so an
+unchanged page costs a 304 instead of a full body, and gzip/deflate (plus
+brotli when the `brotli` package is installed) content encoding.
+
+Also counts wire bytes, 304s and connection reuse so the effect is visible.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import HTTP_POOL_MAXSIZE, HTTP_MAX_PER_HOST, HTTP_BODY_CACHE_ENTRIES
+except ImportError:
+    from config import HTTP_POOL_MAXSIZE, HTTP_MAX_PER_HOST, HTTP_BODY_CACHE_ENTRIES
+
+try:  # urllib3 decodes "br" only when a brotli module is importable
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class RequestCancelled(Exception):
+    """The caller's cancel event was set while the body was being read."""
+
+
+class HttpResult:
+    """Body and metadata of a GET, possibly served from the validator cache."""
+
+    __slots__ = ("url", "status", "content", "encoding", "not_modified")
+
+    def __init__(self, url: str, status: int, content: bytes, encoding: Optional[str], not_modified: bool) -> None:
+        self.url = url
+        self.status = status
+        self.content = content
+        self.encoding = encoding
+        self.not_modified = not_modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HttpClient:
+    """Pooled, conditional, concurrency-bounded HTTP GET client."""
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        max_per_host: int = 4,
+        body_cache_entries: int = 64,
+    ) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.max_per_host = max(1, int(max_per_host))
+        self.body_cache_entries = max(0, int(body_cache_entries))
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+        # url -> (etag, last_modified, content, encoding)
+        self._validators: "OrderedDict[str, tuple]" = OrderedDict()
+        self._validators_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_wire = 0
+        self.bytes_decoded = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self._seen_sockets: "weakref.WeakSet" = weakref.WeakSet()
+
+    def reset_after_fork(self) -> None:
+        """Drop the parent's session and locks: its pooled sockets must not be shared."""
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._limits = {}
+        self._limits_lock = threading.Lock()
+        self._validators_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._seen_sockets = weakref.WeakSet()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.pool_maxsize, max_retries=0)
+                    s.mount("https://", adapter)
+                    s.mount("http://", adapter)
+                    s.headers["Accept-Encoding"] = ACCEPT_ENCODING
+                    self._session = s
+        return self._session
+
+    @contextmanager
+    def limit(self, upstream: str) -> Iterator[None]:
+        """Bound concurrent calls to `upstream` (a host name or a logical name like 'yfinance')."""
+        sem = self._limits.get(upstream)
+        if sem is None:
+            with self._limits_lock:
+                sem = self._limits.setdefault(upstream, threading.BoundedSemaphore(self.max_per_host))
+        with sem:
+            yield
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        cancel: Optional[threading.Event] = None,
+        chunk_size: int = 16384,
+    ) -> HttpResult:
+        """GET `url`, revalidating a previously seen body with If-None-Match / If-Modified-Since.
+
+        Raises RequestCancelled if `cancel` is set while reading the body, and
+        requests' HTTPError on 4xx/5xx responses.
+        """
+        req_headers = dict(headers or {})
+        cached = self._validators.get(url)
+        if cached is not None:
+            etag, last_modified = cached[0], cached[1]
+            if etag:
+                req_headers["If-None-Match"] = etag
+            if last_modified:
+                req_headers["If-Modified-Since"] = last_modified
+
+        with self.limit(urlsplit(url).netloc):
+            resp = self.session.get(url, headers=req_headers, timeout=timeout, stream=True)
+            self._track_connection(resp)
+            try:
+                if resp.status_code == 304 and cached is not None:
+                    resp.content  # drain so the connection goes back to the pool
+                    self._count(resp, 0)
+                    with self._stats_lock:
+                        self.not_modified += 1
+                    with self._validators_lock:
+                        if url in self._validators:
+                            self._validators.move_to_end(url)
+                    return HttpResult(url, 304, cached[2], cached[3], True)
+
+                resp.raise_for_status()
+                chunks = []
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled(url)
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+                self._count(resp, len(content))
+            finally:
+                resp.close()
+
+        encoding = resp.encoding
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if (etag or last_modified) and self.body_cache_entries:
+            with self._validators_lock:
+                self._validators[url] = (etag, last_modified, content, encoding)
+                self._validators.move_to_end(url)
+                while len(self._validators) > self.body_cache_entries:
+                    self._validators.popitem(last=False)
+        return HttpResult(url, resp.status_code, content, encoding, False)
+
+    def _track_connection(self, resp) -> None:
+        """Classify the socket that served `resp` as new or reused."""
+        sock = getattr(getattr(resp.raw, "connection", None), "sock", None)
+        if sock is None:
+            return
+        with self._stats_lock:
+            try:
+                if sock in self._seen_sockets:
+                    self.reused_connections += 1
+                else:
+                    self._seen_sockets.add(sock)
+                    self.new_connections += 1
+            except TypeError:  # socket type without weakref support
+                pass
+
+    def _count(self, resp, decoded: int) -> None:
+        try:
+            wire = int(resp.raw.tell())  # bytes read off the socket, before decoding
+        except Exception:
+            wire = decoded
+        with self._stats_lock:
+            self.requests += 1
+            self.bytes_wire += wire
+            self.bytes_decoded += decoded
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            tracked = self.new_connections + self.reused_connections
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "bytes_wire": self.bytes_wire,
+                "bytes_decoded": self.bytes_decoded,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+                "connection_reuse_rate": self.reused_connections / tracked if tracked else 0.0,
+                "accept_encoding": ACCEPT_ENCODING,
+            }
+
+
+http_client = HttpClient(
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    max_per_host=HTTP_MAX_PER_HOST,
+    body_cache_entries=HTTP_BODY_CACHE_ENTRIES,
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=http_client.reset_after_fork)
@@ -0,0 +1,358 @@
+"""LLM providers for the TradeSense AI chat assistant.
+
+OpenAI is tried first, then Groq; without any key configured (or when both
+fail) the assistant answers with a canned reply. Keys are read from the
+environment (OPENAI_API_KEY / GROQ_API_KEY).
+
+Replies are streamed token by token. If the current provider has not
+produced its first token within LLM_FIRST_TOKEN_TIMEOUT, the next provider
+is started alongside it and whichever streams first wins; the other stream
+is closed, which aborts its upstream generation. Closing a stream early
+(client disconnect) aborts every upstream request the same way.
+
+Clients (sync for the Flask routes, async for the ASGI mode) are created
+once per process and reused, so their HTTP connection pools stay warm
+across requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import LLM_TIMEOUT, LLM_FIRST_TOKEN_TIMEOUT
+    from .metrics import upstream_duration
+except ImportError:
+    from config import LLM_TIMEOUT, LLM_FIRST_TOKEN_TIMEOUT
+    from metrics import upstream_duration
+
+
+SYSTEM_PROMPT = "Tu es TradeSense AI, un expert en trading. Réponds de manière claire, professionnelle et utile."
+FALLBACK_REPLY = "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."
+OPENAI_MODEL = "gpt-4o-mini"
+GROQ_MODEL = "llama-3.1-8b-instant"
+TEMPERATURE = 0.3
+
+
+def openai_key() -> Optional[str]:
+    return os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY")
+
+
+def groq_key() -> Optional[str]:
+    return os.environ.get("GROQ_API_KEY") or os.environ.get("GROQ_APIKEY")
+
+
+def build_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": text},
+    ]
+
+
+def providers() -> List[Tuple[str, str]]:
+    """Configured (provider, model) pairs in order of preference."""
+    available = []
+    if openai_key():
+        available.append(("openai", OPENAI_MODEL))
+    if groq_key():
+        available.append(("groq", GROQ_MODEL))
+    return available
+
+
+def sse_event(event: str, data: Dict[str, object]) -> str:
+    """Format one Server-Sent Event of the chat stream."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _delta(chunk) -> Optional[str]:
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return None
+    return getattr(choices[0].delta, "content", None)
+
+
+_sync_clients: Dict[str, object] = {}
+_async_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+
+def _after_fork() -> None:
+    # Clients keep pooled connections: each process builds its own
+    global _clients_lock
+    _sync_clients.clear()
+    _async_clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _make_client(provider: str, asynchronous: bool):
+    if provider == "openai":
+        from openai import AsyncOpenAI, OpenAI
+
+        cls = AsyncOpenAI if asynchronous else OpenAI
+        return cls(api_key=openai_key(), timeout=LLM_TIMEOUT, max_retries=0)
+    from groq import AsyncGroq, Groq
+
+    cls = AsyncGroq if asynchronous else Groq
+    return cls(api_key=groq_key(), timeout=LLM_TIMEOUT, max_retries=0)
+
+
+def _client(provider: str, asynchronous: bool = False):
+    """Return the process-wide client for `provider` ('openai' or 'groq')."""
+    clients = _async_clients if asynchronous else _sync_clients
+    client = clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = clients.get(provider)
+            if client is None:
+                client = clients[provider] = _make_client(provider, asynchronous)
+    return client
+
+
+class ChatStream:
+    """Iterator over the reply tokens of one chat message (sync, thread per provider).
+
+    `provider` names the provider that won the race once the first token is
+    out ('fallback' when the canned reply was used). `completed` turns True
+    only when the winner's stream ends normally, not on an upstream error or
+    an LLM_TIMEOUT stall, so a truncated reply can be told from a full one.
+    `close()` aborts every upstream request still running; it also runs when
+    iteration ends or the iterator is closed.
+    """
+
+    def __init__(self, text: str, first_token_timeout: float = LLM_FIRST_TOKEN_TIMEOUT) -> None:
+        self.text = text
+        self.first_token_timeout = first_token_timeout
+        self.provider: Optional[str] = None
+        self.completed = False
+        self._queue: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        self._pending = providers()
+        self._running: Dict[str, threading.Event] = {}
+        self._streams: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _start_next(self) -> None:
+        provider, model = self._pending.pop(0)
+        stop = threading.Event()
+        self._running[provider] = stop
+        threading.Thread(
+            target=self._pump, args=(provider, model, stop), name=f"llm-{provider}", daemon=True
+        ).start()
+
+    def _pump(self, provider: str, model: str, stop: threading.Event) -> None:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            stream = _client(provider).chat.completions.create(
+                model=model, messages=build_messages(self.text), temperature=TEMPERATURE, stream=True
+            )
+            with self._lock:
+                self._streams[provider] = stream
+            if stop.is_set():
+                outcome = "cancelled"
+                return
+            for chunk in stream:
+                if stop.is_set():
+                    outcome = "cancelled"
+                    return
+                delta = _delta(chunk)
+                if delta:
+                    self._queue.put((provider, delta))
+            outcome = "ok"
+            self._queue.put((provider, None))
+        except Exception as e:
+            outcome = "cancelled" if stop.is_set() else "error"
+            self._queue.put((provider, e))
+        finally:
+            self._abort(provider)
+            upstream_duration.observe(time.perf_counter() - started, provider, outcome)
+
+    def _abort(self, provider: str) -> None:
+        stop = self._running.get(provider)
+        if stop is not None:
+            stop.set()
+        with self._lock:
+            stream = self._streams.pop(provider, None)
+        if stream is not None:
+            try:
+                stream.close()  # closes the HTTP response: the provider stops generating
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        for provider in list(self._running):
+            self._abort(provider)
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            if not self._pending:
+                self.provider = "fallback"
+                yield FALLBACK_REPLY
+                return
+            self._start_next()
+            deadline = time.monotonic() + self.first_token_timeout
+            alive = 1
+            while self.provider is None:
+                wait = deadline - time.monotonic() if self._pending else LLM_TIMEOUT
+                try:
+                    provider, item = self._queue.get(timeout=max(wait, 0.0))
+                except queue.Empty:
+                    if not self._pending:
+                        break
+                    self._start_next()  # first token is late: race the next provider
+                    alive += 1
+                    deadline = time.monotonic() + self.first_token_timeout
+                    continue
+                if isinstance(item, str):
+                    self.provider = provider
+                    for other in self._running:
+                        if other != provider:
+                            self._abort(other)
+                    yield item
+                    break
+                alive -= 1  # this provider finished or failed without a token
+                if self._pending:
+                    self._start_next()
+                    alive += 1
+                    deadline = time.monotonic() + self.first_token_timeout
+                elif alive <= 0:
+                    break
+
+            if self.provider is None:
+                self.provider = "fallback"
+                yield FALLBACK_REPLY
+                return
+
+            while True:
+                try:
+                    provider, item = self._queue.get(timeout=LLM_TIMEOUT)
+                except queue.Empty:
+                    return
+                if provider != self.provider:
+                    continue
+                if not isinstance(item, str):
+                    self.completed = item is None  # None: end of stream, else the provider's exception
+                    return
+                yield item
+        finally:
+            self.close()
+
+
+async def stream_reply_async(
+    text: str, first_token_timeout: float = LLM_FIRST_TOKEN_TIMEOUT, info: Optional[Dict[str, str]] = None
+) -> AsyncIterator[str]:
+    """Async twin of ChatStream: yields reply tokens, racing providers on a first-token deadline.
+
+    The winning provider is stored in `info["provider"]` when `info` is given,
+    and `info["completed"]` is True only if its stream ended normally (see
+    ChatStream.completed).
+    Closing the generator (or cancelling the task iterating it) cancels the
+    provider tasks, which closes their HTTP streams.
+    """
+    info = info if info is not None else {}
+    info["provider"] = "fallback"
+    info["completed"] = False
+    pending = providers()
+    if not pending:
+        yield FALLBACK_REPLY
+        return
+
+    out: "asyncio.Queue[Tuple[str, object]]" = asyncio.Queue()
+    tasks: Dict[str, "asyncio.Task"] = {}
+
+    async def pump(provider: str, model: str) -> None:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            stream = await _client(provider, asynchronous=True).chat.completions.create(
+                model=model, messages=build_messages(text), temperature=TEMPERATURE, stream=True
+            )
+            try:
+                async for chunk in stream:
+                    delta = _delta(chunk)
+                    if delta:
+                        out.put_nowait((provider, delta))
+            finally:
+                await stream.close()
+            outcome = "ok"
+            out.put_nowait((provider, None))
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            out.put_nowait((provider, e))
+        finally:
+            upstream_duration.observe(time.perf_counter() - started, provider, outcome)
+
+    def start_next() -> None:
+        provider, model = pending.pop(0)
+        tasks[provider] = asyncio.ensure_future(pump(provider, model))
+
+    winner: Optional[str] = None
+    try:
+        start_next()
+        alive = 1
+        while winner is None:
+            timeout = first_token_timeout if pending else LLM_TIMEOUT
+            try:
+                provider, item = await asyncio.wait_for(out.get(), timeout)
+            except asyncio.TimeoutError:
+                if not pending:
+                    break
+                start_next()
+                alive += 1
+                continue
+            if isinstance(item, str):
+                winner = info["provider"] = provider
+                for other, task in tasks.items():
+                    if other != provider:
+                        task.cancel()
+                yield item
+                break
+            alive -= 1
+            if pending:
+                start_next()
+                alive += 1
+            elif alive <= 0:
+                break
+
+        if winner is None:
+            yield FALLBACK_REPLY
+            return
+
+        while True:
+            try:
+                provider, item = await asyncio.wait_for(out.get(), LLM_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+            if provider != winner:
+                continue
+            if not isinstance(item, str):
+                info["completed"] = item is None
+                return
+            yield item
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+async def aclose() -> None:
+    """Close the async clients (ASGI shutdown)."""
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        try:
+            await client.close()  # type: ignore[attr-defined]
+        except Exception:
+            pass
@@ -2,41 +2,56 @@
 
 Functions:
 - get_international_price(ticker): fetch price via yfinance (e.g., AAPL, BTC-USD)
-- get_morocco_price_iam(): scrape current price for Maroc Telecom (IAM)
+- get_international_prices(tickers): fetch many prices with one batched yfinance download
+- get_morocco_price_iam(): scrape current price for Maroc Telecom (IAM), racing sources
+- get_price(ticker): cached entry point used by the API (TTL + LRU + coalescing)
+- get_prices(tickers): cached batch entry point (one download + concurrent IAM scrape)
+
+Bar history (OHLCV) lives in candles.py.
 """
 
 from __future__ import annotations
 
-import re
-from typing import Optional
-
-
-def _parse_float(text: str) -> Optional[float]:
-    """Extract the first float-looking number from text, normalizing separators."""
-    if not text:
-        return None
-    # Find number patterns like 12,345.67 or 12.345,67 or 123.45
-    m = re.search(r"(\d{1,3}(?:[\.,]\d{3})*(?:[\.,]\d+)|\d+(?:[\.,]\d+)?)", text)
-    if not m:
-        return None
-    num = m.group(1)
-    # Normalize: remove thousands separators and use dot as decimal
-    # Heuristic: if both comma and dot present, assume comma thousands, dot decimal
-    if "," in num and "." in num:
-        num = num.replace(",", "")
-    else:
-        # If only comma present, treat as decimal comma
-        num = num.replace(",", ".")
-    try:
-        return float(num)
-    except ValueError:
-        return None
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Flexible imports whether run as a package or a script
+try:
+    from .candles import candle_store
+    from .html_extract import PriceExtractor
+    from .http_client import RequestCancelled, http_client
+    from .metrics import time_upstream, upstream_duration
+    from .config import (
+        PRICE_CACHE_TTL,
+        PRICE_CACHE_TTL_IAM,
+        PRICE_CACHE_MAX_ENTRIES,
+        IAM_HEDGE_MODE,
+        IAM_HEDGE_MIN_DELAY,
+        IAM_HEDGE_MAX_DELAY,
+    )
+except ImportError:
+    from candles import candle_store
+    from html_extract import PriceExtractor
+    from http_client import RequestCancelled, http_client
+    from metrics import time_upstream, upstream_duration
+    from config import (
+        PRICE_CACHE_TTL,
+        PRICE_CACHE_TTL_IAM,
+        PRICE_CACHE_MAX_ENTRIES,
+        IAM_HEDGE_MODE,
+        IAM_HEDGE_MIN_DELAY,
+        IAM_HEDGE_MAX_DELAY,
+    )
 
 
 def get_international_price(ticker: str) -> float:
     """Return latest price for an international ticker via yfinance.
 
-    Attempts fast_info then falls back to recent intraday close.
+    Attempts fast_info then falls back to the latest 1-minute close.
     """
     import yfinance as yf
 
@@ -44,96 +59,474 @@ def get_international_price(ticker: str) -> float:
     price: Optional[float] = None
 
     # Prefer fast_info when available
-    fast_info = getattr(tk, "fast_info", None)
-    if fast_info:
-        price = fast_info.get("last_price") or fast_info.get("last_trade_price")
-        if price is not None:
-            price = float(price)
+    with http_client.limit("yfinance"), time_upstream("yfinance"):
+        fast_info = getattr(tk, "fast_info", None)
+        if fast_info:
+            price = fast_info.get("last_price") or fast_info.get("last_trade_price")
+            if price is not None:
+                price = float(price)
 
-    # Fallback: download recent data
+    # Fallback: last close of the recent 1-minute bars, kept in the candle store so
+    # later fallbacks only download the minutes not seen yet
     if price is None:
-        df = yf.download(tickers=ticker, period="1d", interval="1m")
-        if hasattr(df, "empty") and not df.empty:
-            closes = df["Close"].dropna()
-            if not closes.empty:
-                price = float(closes.iloc[-1])
+        now = time.time()
+        closes = candle_store.candles(ticker, "1m", now - 86400, now)[4]
+        if closes.size:
+            price = float(closes[-1])
 
     if price is None:
         raise RuntimeError(f"Impossible de récupérer le prix pour {ticker}")
     return price
 
 
-def get_morocco_price_iam(timeout: int = 10) -> float:
+def get_international_prices(tickers: Iterable[str]) -> Dict[str, float]:
+    """Return latest prices for many international tickers with one yfinance download.
+
+    Tickers without any close in the last session are omitted from the result.
+    """
+    import yfinance as yf
+
+    symbols = list(dict.fromkeys(t.upper() for t in tickers if t))
+    if not symbols:
+        return {}
+
+    with http_client.limit("yfinance"), time_upstream("yfinance"):
+        df = yf.download(
+            tickers=symbols,
+            period="1d",
+            interval="1m",
+            group_by="column",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+    if df is None or getattr(df, "empty", True):
+        return {}
+
+    closes = df["Close"]
+    if getattr(closes, "ndim", 1) == 1:  # single ticker without a ticker column level
+        closes = closes.to_frame(name=symbols[0])
+    # Last non-null close per column, vectorized over all tickers at once
+    last = closes.ffill().iloc[-1].dropna()
+    return {str(sym).upper(): float(px) for sym, px in last.items()}
+
+
+# Candidate IAM sources (default order of preference; the scoreboard reorders them)
+IAM_SOURCES: List[Dict[str, object]] = [
+    # Richbourse value page for Itissalat Al-Maghrib (IAM)
+    {
+        "name": "richbourse",
+        "url": "https://www.richbourse.com/valeurs/itissalat-al-maghrib-iam",
+        "selectors": [
+            ".price", ".instrument-price", ".last", ".current", "[data-field='price']",
+        ],
+    },
+    # Boursenews value page (structure may vary)
+    {
+        "name": "boursenews",
+        "url": "https://boursenews.ma/marches/valeurs/IAM",
+        "selectors": [
+            ".price", ".valeur__price", ".cours", "#price",
+        ],
+    },
+    # LeMatin market area (search might be indirect; fallback by regex scanning)
+    {
+        "name": "lematin",
+        "url": "https://lematin.ma/bourse",
+        "selectors": [
+            ".price", ".cours", "#price",
+        ],
+    },
+]
+
+_SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+    " AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+
+class SourceScoreboard:
+    """Per-source health: latency samples, success rate and last selector that worked.
+
+    Sources are ordered by success rate first, then by median latency, so a
+    site that keeps timing out or changed its markup drifts to the back.
+    """
+
+    def __init__(self, window: int = 50) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, object]] = {}
+
+    def _get(self, name: str) -> Dict[str, object]:
+        st = self._stats.get(name)
+        if st is None:
+            st = self._stats[name] = {
+                "latencies": deque(maxlen=self.window),
+                "outcomes": deque(maxlen=self.window),
+                "last_good": None,
+                "last_error": None,
+            }
+        return st
+
+    def record(self, name: str, ok: bool, latency: float, strategy: Optional[str] = None,
+               error: Optional[str] = None) -> None:
+        with self._lock:
+            st = self._get(name)
+            st["outcomes"].append(1 if ok else 0)  # type: ignore[union-attr]
+            if ok:
+                st["latencies"].append(latency)  # type: ignore[union-attr]
+                st["last_good"] = strategy
+            else:
+                st["last_error"] = error
+
+    def last_good(self, name: str) -> Optional[str]:
+        st = self._stats.get(name)
+        return st["last_good"] if st else None  # type: ignore[return-value]
+
+    def _quantile(self, name: str, q: float) -> Optional[float]:
+        st = self._stats.get(name)
+        if not st or not st["latencies"]:
+            return None
+        samples = sorted(st["latencies"])  # type: ignore[arg-type]
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def p95(self, name: str) -> Optional[float]:
+        with self._lock:
+            return self._quantile(name, 0.95)
+
+    def success_rate(self, name: str) -> float:
+        st = self._stats.get(name)
+        if not st or not st["outcomes"]:
+            return 1.0  # optimistic until proven otherwise
+        outcomes = st["outcomes"]
+        return sum(outcomes) / len(outcomes)  # type: ignore[arg-type]
+
+    def ordered(self, sources: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        with self._lock:
+            def score(indexed):
+                i, src = indexed
+                name = str(src["name"])
+                p50 = self._quantile(name, 0.5)
+                return (-self.success_rate(name), p50 if p50 is not None else float("inf"), i)
+
+            return [src for _, src in sorted(enumerate(sources), key=score)]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {
+                name: {
+                    "samples": len(st["outcomes"]),  # type: ignore[arg-type]
+                    "success_rate": round(self.success_rate(name), 3),
+                    "p50": self._quantile(name, 0.5),
+                    "p95": self._quantile(name, 0.95),
+                    "last_good": st["last_good"],
+                    "last_error": st["last_error"],
+                }
+                for name, st in self._stats.items()
+            }
+
+
+iam_scoreboard = SourceScoreboard()
+iam_extractor = PriceExtractor()
+
+# Shared pool for IAM scrapes; losers of a race finish (or abort) here without
+# blocking the caller.
+_scrape_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="iam-source")
+
+
+def _after_fork() -> None:
+    # The pool's threads (started by a warm-up scrape in the gunicorn master) don't survive a fork
+    global _scrape_pool
+    _scrape_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="iam-source")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _scrape_iam_source(src: Dict[str, object], timeout: float, cancel: threading.Event) -> Tuple[float, str]:
+    """Download and parse one source. Returns (price, strategy that matched)."""
+    if cancel.is_set():
+        raise RequestCancelled(str(src["url"]))
+    page = http_client.get(str(src["url"]), headers=_SCRAPE_HEADERS, timeout=timeout, cancel=cancel)
+    name = str(src["name"])
+    return iam_extractor.extract(
+        name, page.text, list(src["selectors"]), iam_scoreboard.last_good(name)  # type: ignore[arg-type]
+    )
+
+
+def _timed_scrape(src: Dict[str, object], timeout: float, cancel: threading.Event) -> Tuple[float, str]:
+    name = str(src["name"])
+    started = time.monotonic()
+    try:
+        price, strategy = _scrape_iam_source(src, timeout, cancel)
+    except RequestCancelled:
+        upstream_duration.observe(time.monotonic() - started, f"iam:{name}", "cancelled")
+        raise
+    except Exception as e:
+        elapsed = time.monotonic() - started
+        if not cancel.is_set():  # don't blame a source for losing the race
+            iam_scoreboard.record(name, False, elapsed, error=str(e))
+        upstream_duration.observe(elapsed, f"iam:{name}", "cancelled" if cancel.is_set() else "error")
+        raise
+    elapsed = time.monotonic() - started
+    iam_scoreboard.record(name, True, elapsed, strategy=strategy)
+    upstream_duration.observe(elapsed, f"iam:{name}", "ok")
+    return price, strategy
+
+
+def _hedge_delay(src: Dict[str, object], mode: str, timeout: float) -> float:
+    """How long to wait on the running sources before starting the next one."""
+    if mode == "all":
+        return 0.0
+    if mode == "off":
+        return timeout
+    p95 = iam_scoreboard.p95(str(src["name"]))
+    if p95 is None:
+        p95 = IAM_HEDGE_MAX_DELAY
+    return min(max(p95, IAM_HEDGE_MIN_DELAY), IAM_HEDGE_MAX_DELAY)
+
+
+def get_morocco_price_iam(timeout: int = 10, hedge: Optional[str] = None) -> float:
     """Scrape the current price for Maroc Telecom (IAM) from public sites.
 
-    Tries multiple sources and selectors; returns a float on success.
+    Sources are raced in scoreboard order: the best source starts first and the
+    next one is launched when the running ones fail or exceed a hedge delay
+    derived from their p95 latency (`hedge`: "p95", "all" or "off", defaults to
+    IAM_HEDGE_MODE). The first valid parse wins and the losers are cancelled.
     """
-    import requests
-    from bs4 import BeautifulSoup
-
-    # Candidate sources (order of preference)
-    sources = [
-        # Richbourse value page for Itissalat Al-Maghrib (IAM)
-        {
-            "url": "https://www.richbourse.com/valeurs/itissalat-al-maghrib-iam",
-            "selectors": [
-                ".price", ".instrument-price", ".last", ".current", "[data-field='price']",
-            ],
-        },
-        # Boursenews value page (structure may vary)
-        {
-            "url": "https://boursenews.ma/marches/valeurs/IAM",
-            "selectors": [
-                ".price", ".valeur__price", ".cours", "#price",
-            ],
-        },
-        # LeMatin market area (search might be indirect; fallback by regex scanning)
-        {
-            "url": "https://lematin.ma/bourse",
-            "selectors": [
-                ".price", ".cours", "#price",
-            ],
-        },
-    ]
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        " AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    }
-
-    last_error = None
-    for src in sources:
-        try:
-            resp = requests.get(src["url"], headers=headers, timeout=timeout)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            # Try explicit selectors first
-            for sel in src["selectors"]:
-                el = soup.select_one(sel)
-                if el:
-                    price = _parse_float(el.get_text(strip=True))
-                    if price is not None:
-                        return price
-
-            # Fallback: look for text blocks mentioning IAM and containing a number
-            texts = soup.find_all(string=re.compile(r"IAM|Itissalat", re.IGNORECASE))
-            for t in texts:
-                price = _parse_float(t)
-                if price is not None:
-                    return price
+    mode = (hedge or IAM_HEDGE_MODE).lower()
+    pending_sources = iam_scoreboard.ordered(IAM_SOURCES)
+    cancel = threading.Event()
+    running: Dict[Future, Dict[str, object]] = {}
+    last_error: Optional[BaseException] = None
+
+    try:
+        while pending_sources or running:
+            if pending_sources:
+                src = pending_sources.pop(0)
+                running[_scrape_pool.submit(_timed_scrape, src, timeout, cancel)] = src
+                delay: Optional[float] = _hedge_delay(src, mode, timeout)
+                if delay == 0.0 and pending_sources:
+                    continue
+            else:
+                delay = None  # nothing left to launch: wait for the running ones
 
-            # General numeric scan with nearby keywords
-            all_text = soup.get_text(" ", strip=True)
-            for m in re.finditer(r"(?i)(cours|dernier|prix).*?(\d+[\.,]\d+)", all_text):
-                price = _parse_float(m.group(0))
-                if price is not None:
+            done, _ = wait(list(running), timeout=delay, return_when=FIRST_COMPLETED)
+            for fut in done:
+                running.pop(fut)
+                try:
+                    price, _strategy = fut.result()
                     return price
-        except Exception as e:  # capture and continue with next source
-            last_error = e
-            continue
+                except Exception as e:
+                    last_error = e
+    finally:
+        cancel.set()
+        for fut in running:
+            fut.cancel()
 
     raise RuntimeError(
         f"Impossible de scraper le prix IAM depuis les sources publiques. Dernière erreur: {last_error}"
-    )
\ No newline at end of file
+    )
+
+
+
+class _Flight:
+    """An upstream fetch in progress that concurrent callers can wait on."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+
+class PriceCache:
+    """Thread-safe price cache with per-key TTL, LRU eviction and request coalescing.
+
+    Concurrent misses for the same key share a single upstream fetch: the first
+    caller fetches, the others block on its result. Errors are propagated to
+    every waiter and are never cached.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 5.0,
+        max_entries: int = 512,
+        ttl_overrides: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.default_ttl = float(default_ttl)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_overrides = {k.upper(): float(v) for k, v in (ttl_overrides or {}).items()}
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._inflight: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttl_overrides.get(key.upper(), self.default_ttl)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], float], ttl: Optional[float] = None) -> float:
+        """Return the cached value for `key`, calling `fetch` at most once per TTL window."""
+        key = key.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value  # type: ignore[return-value]
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+                self._inflight.pop(key, None)
+            flight.event.set()
+            raise
+
+        flight.value = value
+        self.put(key, value, ttl)
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.event.set()
+        return value
+
+    def peek(self, key: str) -> Optional[float]:
+        """Return the cached value if still fresh (counted as a hit, else a miss)."""
+        key = key.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: float, ttl: Optional[float] = None) -> None:
+        """Store a value fetched outside `get_or_fetch` (e.g. by a batch download)."""
+        key = key.upper()
+        expires_at = time.monotonic() + (self.ttl_for(key) if ttl is None else float(ttl))
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key (or everything when `key` is None)."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key.upper(), None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+price_cache = PriceCache(
+    default_ttl=PRICE_CACHE_TTL,
+    max_entries=PRICE_CACHE_MAX_ENTRIES,
+    ttl_overrides={"IAM": PRICE_CACHE_TTL_IAM},
+)
+
+
+def fetch_price(ticker: str) -> float:
+    """Fetch the price for `ticker` from its upstream source, bypassing the cache.
+
+    'IAM' (case-insensitive) is scraped, everything else goes through yfinance.
+    """
+    if ticker.upper() == "IAM":
+        return get_morocco_price_iam()
+    return get_international_price(ticker)
+
+
+def get_price(ticker: str) -> float:
+    """Return the price for `ticker` through the shared cache."""
+    return price_cache.get_or_fetch(ticker, lambda: fetch_price(ticker))
+
+
+def fetch_prices(tickers: Iterable[str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Fetch many prices upstream, bypassing the cache.
+
+    International tickers share one batched yfinance download while the IAM
+    scrape runs concurrently in a helper thread. Returns (prices, errors).
+    """
+    symbols: List[str] = list(dict.fromkeys(t.upper() for t in tickers if t))
+    international = [t for t in symbols if t != "IAM"]
+    prices: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="iam-scrape") as pool:
+        iam_future = pool.submit(get_morocco_price_iam) if "IAM" in symbols else None
+        if international:
+            try:
+                prices.update(get_international_prices(international))
+            except Exception as e:
+                for t in international:
+                    errors[t] = str(e)
+        if iam_future is not None:
+            try:
+                prices["IAM"] = iam_future.result()
+            except Exception as e:
+                errors["IAM"] = str(e)
+
+    for t in international:
+        if t not in prices and t not in errors:
+            errors[t] = f"Impossible de récupérer le prix pour {t}"
+    return prices, errors
+
+
+def get_prices(tickers: Iterable[str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Return many prices, serving fresh ones from the cache and batch-fetching the rest."""
+    prices: Dict[str, float] = {}
+    misses: List[str] = []
+    for t in dict.fromkeys(t.upper() for t in tickers if t):
+        cached = price_cache.peek(t)
+        if cached is None:
+            misses.append(t)
+        else:
+            prices[t] = cached
+    if not misses:
+        return prices, {}
+
+    fetched, errors = fetch_prices(misses)
+    for t, px in fetched.items():
+        price_cache.put(t, px)
+    prices.update(fetched)
+    return prices, errors
@@ -0,0 +1,203 @@
+"""Async market data for the ASGI serving mode.
+
+Mirrors the sync entry points of market_data with coroutines, so an ASGI
+worker can keep hundreds of upstream calls in flight on one event loop:
+
+- IAM sources are raced with asyncio tasks over a shared httpx.AsyncClient;
+  losing tasks are cancelled, which aborts their HTTP read immediately.
+- yfinance has no async API, so its calls run in the default thread pool.
+
+Scoreboard, extractor and TTL cache are shared with the sync code path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Flexible imports whether run as a package or a script
+try:
+    from .market_data import (
+        IAM_SOURCES,
+        IAM_HEDGE_MODE,
+        _SCRAPE_HEADERS,
+        _hedge_delay,
+        get_international_price,
+        get_international_prices,
+        iam_extractor,
+        iam_scoreboard,
+        price_cache,
+    )
+    from .config import HTTP_POOL_MAXSIZE
+    from .metrics import upstream_duration
+except ImportError:
+    from market_data import (
+        IAM_SOURCES,
+        IAM_HEDGE_MODE,
+        _SCRAPE_HEADERS,
+        _hedge_delay,
+        get_international_price,
+        get_international_prices,
+        iam_extractor,
+        iam_scoreboard,
+        price_cache,
+    )
+    from config import HTTP_POOL_MAXSIZE
+    from metrics import upstream_duration
+
+
+_client = None
+_inflight: Dict[str, "asyncio.Future[float]"] = {}
+
+
+def _http():
+    """Process-wide httpx.AsyncClient (created on the serving event loop)."""
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            headers=_SCRAPE_HEADERS,
+            limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE * 4, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _scrape_iam_source(src: Dict[str, object], timeout: float) -> Tuple[float, str]:
+    name = str(src["name"])
+    started = time.monotonic()
+    try:
+        resp = await _http().get(str(src["url"]), timeout=timeout)
+        resp.raise_for_status()
+        price, strategy = iam_extractor.extract(
+            name, resp.text, list(src["selectors"]), iam_scoreboard.last_good(name)  # type: ignore[arg-type]
+        )
+    except asyncio.CancelledError:
+        upstream_duration.observe(time.monotonic() - started, f"iam:{name}", "cancelled")
+        raise
+    except Exception as e:
+        elapsed = time.monotonic() - started
+        iam_scoreboard.record(name, False, elapsed, error=str(e))
+        upstream_duration.observe(elapsed, f"iam:{name}", "error")
+        raise
+    elapsed = time.monotonic() - started
+    iam_scoreboard.record(name, True, elapsed, strategy=strategy)
+    upstream_duration.observe(elapsed, f"iam:{name}", "ok")
+    return price, strategy
+
+
+async def get_morocco_price_iam_async(timeout: float = 10, hedge: Optional[str] = None) -> float:
+    """Async twin of market_data.get_morocco_price_iam (same hedging policy)."""
+    mode = (hedge or IAM_HEDGE_MODE).lower()
+    pending_sources = iam_scoreboard.ordered(IAM_SOURCES)
+    running: List["asyncio.Task"] = []
+    last_error: Optional[BaseException] = None
+
+    try:
+        while pending_sources or running:
+            delay: Optional[float] = None
+            if pending_sources:
+                src = pending_sources.pop(0)
+                running.append(asyncio.ensure_future(_scrape_iam_source(src, timeout)))
+                delay = _hedge_delay(src, mode, timeout)
+                if delay == 0.0 and pending_sources:
+                    continue
+
+            done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                running.remove(task)
+                try:
+                    price, _strategy = task.result()
+                    return price
+                except Exception as e:
+                    last_error = e
+    finally:
+        for task in running:
+            task.cancel()
+
+    raise RuntimeError(
+        f"Impossible de scraper le prix IAM depuis les sources publiques. Dernière erreur: {last_error}"
+    )
+
+
+async def _fetch_price(ticker: str) -> float:
+    if ticker == "IAM":
+        return await get_morocco_price_iam_async()
+    return await asyncio.to_thread(get_international_price, ticker)
+
+
+async def get_price_async(ticker: str) -> float:
+    """Cached, coalesced async price lookup sharing market_data.price_cache."""
+    key = ticker.upper()
+    cached = price_cache.peek(key)
+    if cached is not None:
+        return cached
+    fut = _inflight.get(key)
+    if fut is not None:
+        return await asyncio.shield(fut)
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        price = await _fetch_price(key)
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody else was waiting
+        raise
+    else:
+        price_cache.put(key, price)
+        fut.set_result(price)
+        return price
+    finally:
+        _inflight.pop(key, None)
+
+
+async def get_prices_async(tickers: Iterable[str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Async twin of market_data.get_prices: one batched download plus a concurrent IAM scrape."""
+    prices: Dict[str, float] = {}
+    misses: List[str] = []
+    for t in dict.fromkeys(t.upper() for t in tickers if t):
+        cached = price_cache.peek(t)
+        if cached is None:
+            misses.append(t)
+        else:
+            prices[t] = cached
+    if not misses:
+        return prices, {}
+
+    errors: Dict[str, str] = {}
+    international = [t for t in misses if t != "IAM"]
+    jobs = []
+    if international:
+        jobs.append(asyncio.to_thread(get_international_prices, international))
+    if "IAM" in misses:
+        jobs.append(get_price_async("IAM"))
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+
+    if international:
+        batch = results.pop(0)
+        if isinstance(batch, BaseException):
+            errors.update({t: str(batch) for t in international})
+        else:
+            for t, px in batch.items():
+                price_cache.put(t, px)
+            prices.update(batch)
+            for t in international:
+                if t not in batch:
+                    errors[t] = f"Impossible de récupérer le prix pour {t}"
+    if "IAM" in misses:
+        iam = results.pop(0)
+        if isinstance(iam, BaseException):
+            errors["IAM"] = str(iam)
+        else:
+            prices["IAM"] = iam
+    return prices, errors
@@ -0,0 +1,250 @@
+"""In-process performance metrics, exported in Prometheus text format.
+
+- Per-route request latency and status counts (Flask before/after hooks,
+  plus the native routes of the ASGI mode)
+- DB query count and time per request, and per-query latency (SQLAlchemy
+  cursor events on the shared engine)
+- Upstream call latency for yfinance, IAM scrapers and LLM providers
+- Mark-to-market sweep time of the risk engine
+
+Histograms use fixed bucket bounds and a preallocated counts list per label
+set; a label set is a tuple of strings looked up in a dict, so a request
+costs a few bisects and integer increments. Metrics are per process: with
+several gunicorn workers, each worker serves its own /metrics.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SWEEP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class Histogram:
+    """Cumulative-on-export histogram with fixed upper bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per label-value tuple."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...], bounds: Sequence[float]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.bounds = tuple(bounds)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.bounds))
+        return child
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        le = [_fmt(b) for b in self.bounds] + ["+Inf"]
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            base = _labels(self.labelnames, values)
+            sep = "," if base else ""
+            running = 0
+            for bound, count in zip(le, counts):
+                running += count
+                out.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {running}')
+            suffix = f"{{{base}}}" if base else ""
+            out.append(f"{self.name}_sum{suffix} {_fmt(total)}")
+            out.append(f"{self.name}_count{suffix} {running}")
+
+
+class CounterFamily:
+    """Monotonic counters, one per label-value tuple."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} counter")
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            base = _labels(self.labelnames, values)
+            out.append(f"{self.name}{{{base}}} {_fmt(value)}" if base else f"{self.name} {_fmt(value)}")
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+http_request_duration = HistogramFamily(
+    "tradesense_http_request_duration_seconds", "Request latency by route.", ("method", "route"), LATENCY_BUCKETS
+)
+http_requests = CounterFamily(
+    "tradesense_http_requests_total", "Requests by route and status code.", ("method", "route", "status")
+)
+db_queries_per_request = HistogramFamily(
+    "tradesense_db_queries_per_request", "DB queries issued while serving a request.", ("route",), QUERY_COUNT_BUCKETS
+)
+db_time_per_request = HistogramFamily(
+    "tradesense_db_time_per_request_seconds", "Time spent in DB queries per request.", ("route",), LATENCY_BUCKETS
+)
+db_query_duration = HistogramFamily(
+    "tradesense_db_query_duration_seconds", "Latency of individual DB queries.", (), LATENCY_BUCKETS
+)
+upstream_duration = HistogramFamily(
+    "tradesense_upstream_duration_seconds",
+    "Latency of calls to market data and LLM upstreams.",
+    ("upstream", "outcome"),
+    LATENCY_BUCKETS,
+)
+risk_sweep_duration = HistogramFamily(
+    "tradesense_risk_sweep_duration_seconds", "Time to revalue all open positions on a price update.", (), SWEEP_BUCKETS
+)
+
+FAMILIES = (
+    http_request_duration,
+    http_requests,
+    db_queries_per_request,
+    db_time_per_request,
+    db_query_duration,
+    upstream_duration,
+    risk_sweep_duration,
+)
+
+# Per-request DB accounting (greenlet-local under gevent, thread-local otherwise)
+_request = threading.local()
+
+
+@contextmanager
+def time_upstream(upstream: str) -> Iterator[None]:
+    """Record the duration of an upstream call, labelled ok / error."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, upstream, outcome)
+
+
+def begin_request() -> None:
+    _request.started = time.perf_counter()
+    _request.db_queries = 0
+    _request.db_time = 0.0
+
+
+def end_request(method: str, route: str, status: int) -> None:
+    started: Optional[float] = getattr(_request, "started", None)
+    if started is None:
+        return
+    _request.started = None
+    http_request_duration.observe(time.perf_counter() - started, method, route)
+    http_requests.inc(method, route, str(status))
+    db_queries_per_request.observe(_request.db_queries, route)
+    db_time_per_request.observe(_request.db_time, route)
+
+
+def instrument_engine(engine) -> None:
+    """Time every cursor execution on `engine` and attribute it to the current request."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        db_query_duration.observe(elapsed)
+        if getattr(_request, "started", None) is not None:
+            _request.db_queries += 1
+            _request.db_time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx) -> None:
+        starts = ctx.connection.info.get("metrics_query_start") if ctx.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def init_app(app) -> None:
+    """Install the request hooks on a Flask app (covers its blueprints)."""
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_begin() -> None:
+        begin_request()
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_end(exc) -> None:
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        status = 500 if exc is not None else g.get("metrics_status", 500)
+        end_request(request.method, rule, status)
+
+
+def render_gauges(prefix: str, help_text: str, values: Dict[str, object]) -> str:
+    """Render the numeric entries of a stats dict as `<prefix>_<key>` gauges."""
+    out: List[str] = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out.append(f"# HELP {prefix}_{key} {help_text}")
+            out.append(f"# TYPE {prefix}_{key} gauge")
+            out.append(f"{prefix}_{key} {_fmt(value)}")
+    return "\n".join(out) + "\n" if out else ""
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (0.0.4)."""
+    out: List[str] = []
+    for family in FAMILIES:
+        family.render(out)
+    return "\n".join(out) + "\n"
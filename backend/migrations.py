@@ -0,0 +1,169 @@
+"""Schema migrations for TradeSense AI.
+
+`Base.metadata.create_all` only creates missing tables; it never adds columns
+to tables that already exist. Each migration below brings an existing
+database up to the current models and backfills derived data. Migrations are
+idempotent and recorded in a `schema_migrations` table.
+
+Usage:
+    python migrations.py            # apply pending migrations to DATABASE_URL
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import Callable, List, Tuple
+
+from sqlalchemy import (
+    Column,
+    case,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+# Flexible imports whether run as a package or a script
+try:
+    from .models import Base, Trade, User, UserChallenge
+except ImportError:
+    from models import Base, Trade, User, UserChallenge
+
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("id", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def profit_pct_expr(total_pnl):
+    """SQL expression for a challenge's profit in percent of its start balance."""
+    return case(
+        (UserChallenge.start_balance > 0, total_pnl * 100.0 / UserChallenge.start_balance),
+        else_=0.0,
+    )
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    if not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def m0001_daily_baseline(conn: Connection) -> None:
+    """Add the start-of-day equity snapshot and backfill it for today (UTC)."""
+    _add_column(conn, "user_challenges", "day_start_equity", "FLOAT")
+    _add_column(conn, "user_challenges", "day_start_date", "DATE")
+
+    day_start = dt.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    pnl_before_today = (
+        select(func.coalesce(func.sum(Trade.profit_loss), 0.0))
+        .where(
+            Trade.challenge_id == UserChallenge.id,
+            Trade.timestamp < day_start,
+            Trade.profit_loss != None,  # noqa: E711
+        )
+        .scalar_subquery()
+    )
+    conn.execute(
+        update(UserChallenge)
+        .where(UserChallenge.day_start_date == None)  # noqa: E711
+        .values(
+            day_start_equity=UserChallenge.start_balance + pnl_before_today,
+            day_start_date=day_start.date(),
+        )
+    )
+
+
+def m0002_status_changed_at(conn: Connection) -> None:
+    """Add the timestamp at which a challenge left the 'active' status."""
+    _add_column(conn, "user_challenges", "status_changed_at", "TIMESTAMP")
+
+
+def m0003_leaderboard_columns(conn: Connection) -> None:
+    """Add the denormalized total_pnl / profit_pct columns, backfill them and index them."""
+    _add_column(conn, "user_challenges", "total_pnl", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "user_challenges", "profit_pct", "FLOAT NOT NULL DEFAULT 0")
+
+    total_pnl = (
+        select(func.coalesce(func.sum(Trade.profit_loss), 0.0))
+        .where(Trade.challenge_id == UserChallenge.id)
+        .scalar_subquery()
+    )
+    conn.execute(update(UserChallenge).values(total_pnl=total_pnl))
+    conn.execute(update(UserChallenge).values(profit_pct=profit_pct_expr(UserChallenge.total_pnl)))
+    for index in UserChallenge.__table__.indexes:
+        if index.name in {"ix_user_challenges_profit_pct", "ix_user_challenges_status_profit_pct"}:
+            index.create(bind=conn, checkfirst=True)
+
+
+def m0004_latest_challenge_index(conn: Connection) -> None:
+    """Index challenges by (user_id, start_date) for the latest-challenge lookup in /api/users."""
+    for index in UserChallenge.__table__.indexes:
+        if index.name == "ix_user_challenges_user_id_start_date":
+            index.create(bind=conn, checkfirst=True)
+
+
+def m0005_open_positions_index(conn: Connection) -> None:
+    """Partial index on open trades (close_price IS NULL) for the risk engine."""
+    for index in Trade.__table__.indexes:
+        if index.name == "ix_trades_open_positions":
+            index.create(bind=conn, checkfirst=True)
+
+
+def m0006_lower_user_indexes(conn: Connection) -> None:
+    """Expression indexes on lower(email) / lower(username) for case-insensitive login and register."""
+    # Expression indexes are not reflected, so checkfirst cannot see them: IF NOT EXISTS instead
+    for index in User.__table__.indexes:
+        if index.name in {"ix_users_email_lower", "ix_users_username_lower"}:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Ordered list of (id, migration). Append only; never rename an applied id.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_daily_baseline", m0001_daily_baseline),
+    ("0002_status_changed_at", m0002_status_changed_at),
+    ("0003_leaderboard_columns", m0003_leaderboard_columns),
+    ("0004_latest_challenge_index", m0004_latest_challenge_index),
+    ("0005_open_positions_index", m0005_open_positions_index),
+    ("0006_lower_user_indexes", m0006_lower_user_indexes),
+]
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Create missing tables, then apply pending migrations. Returns the ids applied."""
+    Base.metadata.create_all(bind=engine)
+    _meta.create_all(bind=engine)
+    applied: List[str] = []
+    with engine.begin() as conn:
+        done = set(conn.execute(select(schema_migrations.c.id)).scalars())
+        for mig_id, migration in MIGRATIONS:
+            if mig_id in done:
+                continue
+            migration(conn)
+            conn.execute(schema_migrations.insert().values(id=mig_id))
+            applied.append(mig_id)
+    return applied
+
+
+if __name__ == "__main__":
+    try:
+        from .db import engine as _engine
+    except ImportError:
+        from db import engine as _engine
+
+    applied = upgrade(_engine)
+    print("Migrations appliquées: " + (", ".join(applied) if applied else "aucune"))
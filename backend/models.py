@@ -8,12 +8,14 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Date,
     DateTime,
     ForeignKey,
     Enum,
     Float,
     CheckConstraint,
     Index,
+    text,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
@@ -55,6 +57,12 @@ class User(Base):
     )
     created_at = Column(DateTime, nullable=False, server_default=func.now())
 
+    # Case-insensitive lookups (login / register compare lower(email), lower(username))
+    __table_args__ = (
+        Index("ix_users_email_lower", func.lower(email)),
+        Index("ix_users_username_lower", func.lower(username)),
+    )
+
     # Relationships
     challenges = relationship(
         "UserChallenge",
@@ -88,6 +96,19 @@ class UserChallenge(Base):
 
     start_date = Column(DateTime, nullable=False, server_default=func.now())
 
+    # Start-of-day snapshot for the daily loss rule: equity before the first
+    # trade of `day_start_date` (UTC). Rolled forward lazily by services.
+    day_start_equity = Column(Float, nullable=True)
+    day_start_date = Column(Date, nullable=True)
+
+    # When the status left 'active' (timestamp of the trade that triggered the rule)
+    status_changed_at = Column(DateTime, nullable=True)
+
+    # Leaderboard figures, maintained in the trade transaction by services:
+    # total_pnl = sum(trades.profit_loss), profit_pct = total_pnl / start_balance * 100
+    total_pnl = Column(Float, nullable=False, default=0.0, server_default="0")
+    profit_pct = Column(Float, nullable=False, default=0.0, server_default="0")
+
     # Constraints & indexes
     __table_args__ = (
         CheckConstraint("start_balance >= 0", name="ck_challenge_start_balance_nonnegative"),
@@ -101,6 +122,9 @@ class UserChallenge(Base):
             name="ck_challenge_total_loss_limit_percent",
         ),
         Index("ix_user_challenges_user_id_status", "user_id", "status"),
+        Index("ix_user_challenges_user_id_start_date", "user_id", "start_date"),
+        Index("ix_user_challenges_profit_pct", "profit_pct", "id"),
+        Index("ix_user_challenges_status_profit_pct", "status", "profit_pct", "id"),
     )
 
     # Relationships
@@ -143,6 +167,13 @@ class Trade(Base):
         CheckConstraint("open_price >= 0", name="ck_trade_open_price_nonnegative"),
         CheckConstraint("close_price IS NULL OR close_price >= 0", name="ck_trade_close_price_nonnegative_or_null"),
         Index("ix_trades_challenge_id_timestamp", "challenge_id", "timestamp"),
+        # Open positions (no close yet), loaded by the risk engine
+        Index(
+            "ix_trades_open_positions",
+            "challenge_id",
+            sqlite_where=text("close_price IS NULL"),
+            postgresql_where=text("close_price IS NULL"),
+        ),
     )
 
     # Relationships
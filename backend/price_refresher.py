@@ -0,0 +1,278 @@
+"""Background price refresher for TradeSense AI.
+
+Keeps a registry of "hot" tickers (recently requested by clients), refreshes
+them on a schedule from worker threads and publishes the latest quote in
+process memory. HTTP handlers only read the published quote, so a request
+never waits on yfinance or the Moroccan scrapers once a ticker is warm.
+
+- Per-ticker refresh intervals (IAM is scraped, so it refreshes less often)
+- Exponential backoff for tickers whose source keeps failing, eviction after
+  max_failures consecutive failures
+- Idle eviction of tickers nobody asked for recently
+- At most max_tickers registered; past that new tickers are not refreshed
+- Tickers due in the same tick are fetched together (one batched download)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Flexible imports whether run as a package or a script
+try:
+    from .market_data import fetch_prices
+    from .config import (
+        PRICE_REFRESH_INTERVAL,
+        PRICE_REFRESH_INTERVAL_IAM,
+        PRICE_REFRESH_IDLE_TIMEOUT,
+        PRICE_REFRESH_MAX_BACKOFF,
+        PRICE_REFRESH_MAX_FAILURES,
+        PRICE_REFRESH_MAX_TICKERS,
+        PRICE_REFRESH_WORKERS,
+    )
+except ImportError:
+    from market_data import fetch_prices
+    from config import (
+        PRICE_REFRESH_INTERVAL,
+        PRICE_REFRESH_INTERVAL_IAM,
+        PRICE_REFRESH_IDLE_TIMEOUT,
+        PRICE_REFRESH_MAX_BACKOFF,
+        PRICE_REFRESH_MAX_FAILURES,
+        PRICE_REFRESH_MAX_TICKERS,
+        PRICE_REFRESH_WORKERS,
+    )
+
+
+class Quote:
+    """Immutable published quote. Replaced wholesale, never mutated."""
+
+    __slots__ = ("ticker", "price", "fetched_at")
+
+    def __init__(self, ticker: str, price: float, fetched_at: float) -> None:
+        self.ticker = ticker
+        self.price = price
+        self.fetched_at = fetched_at  # time.time() of the upstream fetch
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class _Entry:
+    """Scheduling state of one hot ticker (owned by the scheduler)."""
+
+    __slots__ = ("interval", "next_due", "last_requested", "failures", "last_error", "inflight")
+
+    def __init__(self, interval: float, now: float, next_due: float) -> None:
+        self.interval = interval
+        self.next_due = next_due
+        self.last_requested = now
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.inflight = False
+
+
+class PriceRefresher:
+    """Refresh hot tickers in the background and publish their latest quotes."""
+
+    def __init__(
+        self,
+        fetch_many: Callable[
+            [Iterable[str]], Tuple[Dict[str, float], Dict[str, str]]
+        ] = fetch_prices,
+        default_interval: float = 5.0,
+        intervals: Optional[Dict[str, float]] = None,
+        idle_timeout: float = 120.0,
+        max_backoff: float = 300.0,
+        max_workers: int = 4,
+        max_tickers: int = 500,
+        max_failures: int = 5,
+        tick: float = 0.25,
+    ) -> None:
+        self.fetch_many = fetch_many
+        self.default_interval = float(default_interval)
+        self.intervals = {k.upper(): float(v) for k, v in (intervals or {}).items()}
+        self.idle_timeout = float(idle_timeout)
+        self.max_backoff = float(max_backoff)
+        self.max_workers = max(1, int(max_workers))
+        self.max_tickers = int(max_tickers)
+        self.max_failures = int(max_failures)
+        self.tick = float(tick)
+        self.rejected = 0
+        self.evicted_failing = 0
+        # Published quotes: written by workers, read lock-free by request handlers.
+        self._quotes: Dict[str, Quote] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._listeners: List[Callable[[Quote], None]] = []
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def ensure_started(self) -> None:
+        """Start the scheduler lazily, once per process (safe after a fork)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="price-refresh"
+            )
+            self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.tick * 4)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---- public API ------------------------------------------------------
+
+    def interval_for(self, ticker: str) -> float:
+        return self.intervals.get(ticker.upper(), self.default_interval)
+
+    def touch(self, ticker: str, cold_fetch: bool = False) -> None:
+        """Mark `ticker` as hot so the scheduler keeps it fresh.
+
+        With `cold_fetch`, the caller fetches the first quote itself, so a
+        newly registered ticker is first refreshed one interval later rather
+        than fetched twice. A new ticker is not registered once max_tickers
+        are.
+        """
+        key = ticker.upper()
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_requested = now
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            if len(self._entries) >= self.max_tickers:
+                self.rejected += 1
+                return
+            interval = self.interval_for(key)
+            self._entries[key] = _Entry(interval, now, now + interval if cold_fetch else now)
+
+    def get(self, ticker: str, cold_fetch: bool = True) -> Optional[Quote]:
+        """Register interest in `ticker` and return its latest published quote, if any.
+
+        By default the caller is expected to fetch and publish the quote
+        itself when None is returned (see `touch`).
+        """
+        self.ensure_started()
+        self.touch(ticker, cold_fetch=cold_fetch)
+        return self._quotes.get(ticker.upper())
+
+    def publish(self, ticker: str, price: float, fetched_at: Optional[float] = None) -> Quote:
+        quote = Quote(ticker.upper(), float(price), time.time() if fetched_at is None else fetched_at)
+        entry = self._entries.get(quote.ticker)
+        if entry is not None:
+            # Only registered tickers keep a quote, so the quotes are bounded and evicted with them
+            self._quotes[quote.ticker] = quote
+            if not entry.inflight:
+                # Fresh quote published from outside the scheduler: don't refetch right away.
+                entry.next_due = time.monotonic() + entry.interval
+        for listener in list(self._listeners):
+            try:
+                listener(quote)
+            except Exception:
+                pass
+        return quote
+
+    def add_listener(self, listener: Callable[[Quote], None]) -> None:
+        """Call `listener(quote)` from the worker thread after each successful refresh."""
+        self._listeners.append(listener)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            tickers = {
+                key: {
+                    "interval": e.interval,
+                    "failures": e.failures,
+                    "last_error": e.last_error,
+                    "next_refresh_in": max(0.0, e.next_due - now),
+                    "idle_for": now - e.last_requested,
+                    "age": self._quotes[key].age if key in self._quotes else None,
+                }
+                for key, e in self._entries.items()
+            }
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "max_tickers": self.max_tickers,
+            "rejected": self.rejected,
+            "evicted_failing": self.evicted_failing,
+            "tickers": tickers,
+        }
+
+    # ---- scheduler -------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick):
+            now = time.monotonic()
+            due: List[str] = []
+            with self._lock:
+                for key, entry in list(self._entries.items()):
+                    if now - entry.last_requested > self.idle_timeout:
+                        del self._entries[key]
+                        self._quotes.pop(key, None)
+                        continue
+                    if not entry.inflight and entry.next_due <= now:
+                        entry.inflight = True
+                        due.append(key)
+            if due:
+                try:
+                    self._executor.submit(self._refresh, due)  # type: ignore[union-attr]
+                except RuntimeError:  # executor shut down
+                    return
+
+    def _refresh(self, keys: List[str]) -> None:
+        try:
+            prices, errors = self.fetch_many(keys)
+        except Exception as e:
+            prices, errors = {}, {k: str(e) for k in keys}
+        now = time.monotonic()
+        for key in keys:
+            entry = self._entries.get(key)
+            if key in prices:
+                if entry is not None:
+                    entry.failures = 0
+                    entry.last_error = None
+                    entry.next_due = now + entry.interval
+                    entry.inflight = False
+                self.publish(key, prices[key])
+            elif entry is not None:
+                entry.failures += 1
+                entry.last_error = errors.get(key, "prix indisponible")
+                entry.next_due = now + min(entry.interval * (2 ** entry.failures), self.max_backoff)
+                entry.inflight = False
+                if entry.failures >= self.max_failures:
+                    # Probably not a real ticker: drop it, a later request registers it again
+                    with self._lock:
+                        if self._entries.get(key) is entry:
+                            del self._entries[key]
+                            self._quotes.pop(key, None)
+                            self.evicted_failing += 1
+
+
+price_refresher = PriceRefresher(
+    default_interval=PRICE_REFRESH_INTERVAL,
+    intervals={"IAM": PRICE_REFRESH_INTERVAL_IAM},
+    idle_timeout=PRICE_REFRESH_IDLE_TIMEOUT,
+    max_backoff=PRICE_REFRESH_MAX_BACKOFF,
+    max_workers=PRICE_REFRESH_WORKERS,
+    max_tickers=PRICE_REFRESH_MAX_TICKERS,
+    max_failures=PRICE_REFRESH_MAX_FAILURES,
+)
@@ -0,0 +1,152 @@
+"""In-process pub/sub for streaming price updates to browsers.
+
+The background refresher publishes every fresh quote to `price_broker`. The
+broker drops quotes whose price did not change and fans the others out to
+the subscribers interested in that ticker. Each subscriber only keeps the
+latest pending quote per ticker, so a slow client never makes the broker
+buffer an unbounded backlog.
+
+Streaming handlers block on `Subscription.wait`, which is cheap under
+gunicorn's gevent worker (threading primitives are monkey-patched there).
+The ASGI entrypoint awaits `Subscription.wait_async` instead, which holds no
+thread while idle.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# Flexible imports whether run as a package or a script
+try:
+    from .price_refresher import Quote
+except ImportError:
+    from price_refresher import Quote
+
+
+class Subscription:
+    """One connected client: a set of tickers and the latest pending quote for each."""
+
+    def __init__(self, broker: "PriceBroker", tickers: Iterable[str]) -> None:
+        self.broker = broker
+        self.tickers: Set[str] = {t.upper() for t in tickers}
+        self._pending: Dict[str, Quote] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake: Optional[Callable[[], None]] = None  # set while wait_async is waiting
+        self.closed = False
+
+    def push(self, quote: Quote) -> None:
+        with self._lock:
+            self._pending[quote.ticker] = quote  # latest wins
+            wake = self._wake
+        self._ready.set()
+        if wake is not None:
+            wake()
+
+    def wait(self, timeout: Optional[float] = None) -> List[Quote]:
+        """Block until at least one update is pending (or timeout); return and clear them."""
+        self._ready.wait(timeout)
+        return self._take()
+
+    async def wait_async(self, timeout: Optional[float] = None) -> List[Quote]:
+        """Coroutine twin of `wait`: the event loop is woken from the publishing thread."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:  # loop closed
+                pass
+
+        with self._lock:
+            if self._pending:
+                ready.set()
+            else:
+                self._wake = wake
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._wake = None
+        return self._take()
+
+    def _take(self) -> List[Quote]:
+        with self._lock:
+            quotes = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+        return quotes
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class PriceBroker:
+    """Fan quote changes out to subscribers, deduplicating unchanged prices."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_ticker: Dict[str, Set[Subscription]] = {}
+        self._last_price: Dict[str, float] = {}
+        self.published = 0
+        self.suppressed = 0
+        self.deliveries = 0
+
+    def subscribe(self, tickers: Iterable[str]) -> Subscription:
+        sub = Subscription(self, tickers)
+        with self._lock:
+            for t in sub.tickers:
+                self._by_ticker.setdefault(t, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for t in sub.tickers:
+                subs = self._by_ticker.get(t)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._by_ticker[t]
+
+    def publish(self, quote: Quote) -> int:
+        """Deliver `quote` if its price changed; return the number of subscribers notified."""
+        with self._lock:
+            if self._last_price.get(quote.ticker) == quote.price:
+                self.suppressed += 1
+                return 0
+            self._last_price[quote.ticker] = quote.price
+            subs = list(self._by_ticker.get(quote.ticker, ()))
+            self.published += 1
+            self.deliveries += len(subs)
+        for sub in subs:
+            sub.push(quote)
+        return len(subs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscriptions": len({s for subs in self._by_ticker.values() for s in subs}),
+                "tickers": len(self._by_ticker),
+                "published": self.published,
+                "suppressed": self.suppressed,
+                "deliveries": self.deliveries,
+            }
+
+
+def format_sse(quote: Quote, event: str = "price") -> str:
+    """Serialize a quote as one Server-Sent Events message."""
+    data = json.dumps(
+        {"ticker": quote.ticker, "price": quote.price, "age": round(quote.age, 3), "ts": quote.fetched_at}
+    )
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+price_broker = PriceBroker()
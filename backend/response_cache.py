@@ -0,0 +1,261 @@
+"""Response cache with strong ETags for read-mostly GET routes.
+
+Decorate a view with `@cached("namespace", ttl)`:
+
+- a fresh cached body is served without running the view
+- every cached or freshly built 200 response carries a strong ETag (SHA-1 of
+  the body) and `Cache-Control: no-cache`, so browsers revalidate and get a
+  304 while the content is unchanged
+- writes call `invalidate("namespace", ...)` to drop entries explicitly, TTLs
+  only bound staleness for changes made outside the API
+- each namespace has a generation, bumped by `invalidate`: a body built while
+  an invalidation ran (the view may have read the data before the write) is
+  returned but not stored
+
+Backends (RESPONSE_CACHE_BACKEND):
+- "memory": per-process LRU; invalidation only reaches the current worker
+- "sqlite": a local SQLite file (RESPONSE_CACHE_PATH) shared by every worker
+  on the host, so an invalidation in one worker is seen by all of them
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Response, request
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_ENTRIES
+except ImportError:
+    from config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_ENTRIES
+
+
+# (etag, body, mimetype)
+Entry = Tuple[str, bytes, str]
+
+
+class MemoryBackend:
+    """Per-process LRU with per-entry expiry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, str, Entry]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, _ns, entry = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def set(self, key: str, namespace: str, entry: Entry, ttl: float, generation: int) -> bool:
+        """Store `entry` unless `namespace` was invalidated since `generation` was read."""
+        with self._lock:
+            if self._generations.get(namespace, 0) != generation:
+                return False
+            self._data[key] = (time.time() + ttl, namespace, entry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [k for k, (_e, ns, _v) in self._data.items() if ns == namespace]:
+                del self._data[key]
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Cache table in a local SQLite file, shared by the workers of one host."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int = 1024) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        if hasattr(os, "register_at_fork"):
+            # A forked child must open its own handle, not share the parent's
+            os.register_at_fork(after_in_child=self._forget_connections)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, expires REAL NOT NULL,"
+            " etag TEXT NOT NULL, body BLOB NOT NULL, mimetype TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_namespace ON response_cache (namespace)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache_generation ("
+            " namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a lost cache entry is only a miss
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._conn().execute(
+            "SELECT etag, body, mimetype FROM response_cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return (row[0], bytes(row[1]), row[2]) if row else None
+
+    def generation(self, namespace: str) -> int:
+        row = self._conn().execute(
+            "SELECT generation FROM response_cache_generation WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set(self, key: str, namespace: str, entry: Entry, ttl: float, generation: int) -> bool:
+        """Store `entry` unless `namespace` was invalidated since `generation` was read."""
+        conn = self._conn()
+        # One statement, so the generation check and the insert are atomic against invalidate()
+        stored = conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, namespace, expires, etag, body, mimetype)"
+            " SELECT ?, ?, ?, ?, ?, ?"
+            " WHERE COALESCE((SELECT generation FROM response_cache_generation WHERE namespace = ?), 0) = ?",
+            (key, namespace, time.time() + ttl, entry[0], entry[1], entry[2], namespace, generation),
+        ).rowcount
+        if not stored:
+            return False
+        self._writes += 1
+        if self._writes % 100 == 0:
+            conn.execute("DELETE FROM response_cache WHERE expires <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM response_cache WHERE key NOT IN"
+                " (SELECT key FROM response_cache ORDER BY expires DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        return True
+
+    def invalidate(self, namespace: str) -> None:
+        conn = self._conn()
+        # Bump first: a set() racing with the delete below then sees the new generation
+        conn.execute(
+            "INSERT INTO response_cache_generation (namespace, generation) VALUES (?, 1)"
+            " ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1",
+            (namespace,),
+        )
+        conn.execute("DELETE FROM response_cache WHERE namespace = ?", (namespace,))
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def make_backend(kind: str = RESPONSE_CACHE_BACKEND):
+    if kind == "sqlite":
+        return SQLiteBackend(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_ENTRIES)
+    if kind == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+    raise ValueError(f"RESPONSE_CACHE_BACKEND inconnu: {kind}")
+
+
+class ResponseCache:
+    """ETag-aware cache of GET responses, keyed by path and query string."""
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def cached(self, namespace: str, ttl: float) -> Callable:
+        def decorator(view: Callable) -> Callable:
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != "GET":
+                    return view(*args, **kwargs)
+                key = f"{namespace}:{request.full_path}"
+                entry = self.backend.get(key)
+                if entry is None:
+                    generation = self.backend.generation(namespace)
+                    resp = view(*args, **kwargs)
+                    if isinstance(resp, tuple) or resp.status_code != 200 or resp.is_streamed:
+                        return resp
+                    body = resp.get_data()
+                    entry = ('"' + hashlib.sha1(body).hexdigest() + '"', body, resp.mimetype)
+                    if not self.backend.set(key, namespace, entry, ttl, generation):
+                        self._count("stale")
+                    self._count("misses")
+                else:
+                    self._count("hits")
+                return self._respond(entry)
+
+            return wrapper
+
+        return decorator
+
+    def _respond(self, entry: Entry) -> Response:
+        etag, body, mimetype = entry
+        if request.if_none_match.contains(etag.strip('"')):
+            self._count("not_modified")
+            resp = Response(status=304)
+        else:
+            resp = Response(body, mimetype=mimetype)
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    def invalidate(self, *namespaces: str) -> None:
+        for ns in namespaces:
+            self.backend.invalidate(ns)
+        self._count("invalidations", len(namespaces))
+
+    def _count(self, field: str, n: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "entries": self.backend.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "stale": self.stale,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(make_backend())
+cached = response_cache.cached
+invalidate = response_cache.invalidate
@@ -0,0 +1,287 @@
+"""Mark-to-market risk engine for open positions.
+
+Open positions are trades without a close yet (close_price IS NULL). The
+realized equity of a challenge only moves when a trade is posted, so on its
+own a challenge whose open positions lose 12% intraday stays active until
+its next trade.
+
+The engine keeps the open positions of active challenges in flat arrays
+(challenge slot, symbol slot, signed quantity, open price) and on every
+price published by the refresher revalues all of them at once:
+
+    unrealized = quantity * (price[symbol] - open_price)
+    equity     = realized_equity + bincount(challenge, unrealized)
+
+then applies the total and daily loss rules of services.evaluate_rules
+against floors precomputed per challenge. Breached challenges leave the
+sweep immediately and are failed by a background thread in batched
+UPDATEs. Positions and realized equity are reloaded from the database every
+RISK_SYNC_INTERVAL seconds, which also keeps the symbols held hot in the
+price refresher.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select, update
+
+# Flexible imports whether run as a package or a script
+try:
+    from .models import ChallengeStatusEnum, Trade, UserChallenge
+    from .db import SessionLocal
+    from .price_refresher import price_refresher
+    from .metrics import risk_sweep_duration
+    from .response_cache import invalidate
+    from .config import RISK_SYNC_INTERVAL, RISK_FLUSH_INTERVAL
+except ImportError:
+    from models import ChallengeStatusEnum, Trade, UserChallenge
+    from db import SessionLocal
+    from price_refresher import price_refresher
+    from metrics import risk_sweep_duration
+    from response_cache import invalidate
+    from config import RISK_SYNC_INTERVAL, RISK_FLUSH_INTERVAL
+
+# Challenges failed per UPDATE statement
+_FLUSH_CHUNK = 500
+
+
+class _Book:
+    """Open positions of one sync, plus the loss floors of their challenges."""
+
+    __slots__ = ("challenge_ids", "realized", "total_floor", "daily_floor", "active",
+                 "pos_challenge", "pos_symbol", "pos_qty", "pos_open", "symbols", "symbol_index", "prices")
+
+    def __init__(self, positions: List[Any], challenges: List[Any], today: dt.date,
+                 last_prices: Dict[str, float], exclude: Set[int]) -> None:
+        # Rows are unpacked into columns once: attribute access per row and field dominates otherwise
+        ids, start_balance, equity, day_equity, day_date, daily_limit, total_limit = (
+            zip(*sorted(challenges, key=lambda c: c[0])) if challenges else ((),) * 7
+        )
+        self.challenge_ids = np.array(ids, dtype=np.int64)
+        self.realized = np.array(equity, dtype=np.float64)
+        # Same baseline as services.roll_daily_baseline: today's snapshot, or the equity before today's first trade
+        baseline = np.array(
+            [de if dd == today and de is not None else eq for de, dd, eq in zip(day_equity, day_date, equity)],
+            dtype=np.float64,
+        )
+        self.total_floor = np.array(start_balance, dtype=np.float64) * (1.0 - np.array(total_limit, dtype=np.float64))
+        self.daily_floor = baseline * (1.0 - np.array(daily_limit, dtype=np.float64))
+        self.active = ~np.isin(self.challenge_ids, np.fromiter(exclude, dtype=np.int64, count=len(exclude)))
+
+        held = set(ids)
+        positions = [p for p in positions if p[0] in held]
+        cids, symbols, sides, quantities, open_prices = zip(*positions) if positions else ((),) * 5
+        self.pos_challenge = np.searchsorted(self.challenge_ids, np.array(cids, dtype=np.int64))
+        self.symbol_index: Dict[str, int] = {}
+        self.pos_symbol = np.array(
+            [self.symbol_index.setdefault(s.upper(), len(self.symbol_index)) for s in symbols], dtype=np.int64
+        )
+        self.symbols = list(self.symbol_index)
+        self.pos_qty = np.array(quantities, dtype=np.float64)
+        self.pos_qty[[_side(t) != "buy" for t in sides]] *= -1.0
+        self.pos_open = np.array(open_prices, dtype=np.float64)
+        # Symbols never priced yet stay NaN and count as flat
+        self.prices = np.array([last_prices.get(s, np.nan) for s in self.symbols], dtype=np.float64)
+
+
+def _side(value: Any) -> str:
+    return getattr(value, "value", value)
+
+
+class RiskEngine:
+    """Revalue open positions on each quote and fail challenges that breach a loss limit."""
+
+    def __init__(self, session_factory=SessionLocal, refresher=None,
+                 sync_interval: float = RISK_SYNC_INTERVAL, flush_interval: float = RISK_FLUSH_INTERVAL) -> None:
+        self.session_factory = session_factory
+        self.refresher = refresher
+        self.sync_interval = float(sync_interval)
+        self.flush_interval = float(flush_interval)
+        self._book: Optional[_Book] = None
+        self._prices: Dict[str, float] = {}
+        self._pending: Set[int] = set()  # breached, not written yet
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._last_sync = 0.0
+        self.sweeps = 0
+        self.sweep_time = 0.0
+        self.sweep_max = 0.0
+        self.breaches = 0
+        self.failed_written = 0
+        self.flushes = 0
+        self.last_error: Optional[str] = None
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def ensure_started(self) -> None:
+        """Start the sync / flush thread lazily, once per process (safe after a fork)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="risk-engine", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 4)
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._last_sync >= self.sync_interval:
+                    self.sync()
+                self.flush()
+            except Exception as e:  # keep the thread alive; retried next round
+                self.last_error = str(e)
+            if self._stop.wait(self.flush_interval):
+                return
+
+    # ---- positions -------------------------------------------------------
+
+    def load(self, positions: Iterable[Any], challenges: Iterable[Any], today: Optional[dt.date] = None) -> None:
+        """Replace the book.
+
+        positions: (challenge_id, symbol, type ('buy' / 'sell'), quantity, open_price) rows
+        challenges: (id, start_balance, current_equity, day_start_equity, day_start_date,
+        daily_loss_limit, total_loss_limit) rows, active challenges only
+        """
+        today = today or dt.datetime.utcnow().date()
+        positions, challenges = list(positions), list(challenges)
+        with self._lock:
+            prices, pending = dict(self._prices), set(self._pending)
+        book = _Book(positions, challenges, today, prices, pending)
+        with self._lock:
+            for symbol, price in self._prices.items():  # quotes received while building
+                i = book.symbol_index.get(symbol)
+                if i is not None:
+                    book.prices[i] = price
+            book.active &= ~np.isin(book.challenge_ids, np.fromiter(self._pending, dtype=np.int64, count=len(self._pending)))
+            self._book = book
+        self._last_sync = time.monotonic()
+        if self.refresher is not None and book.symbols:
+            self.refresher.ensure_started()
+            for symbol in book.symbols:
+                self.refresher.touch(symbol)
+
+    def sync(self) -> None:
+        """Reload open positions and their challenges' figures from the database.
+
+        One statement (positions joined to their challenges), so both come from
+        the same snapshot whatever the isolation level: a challenge failed or
+        a trade closed meanwhile cannot leave positions without their figures.
+        """
+        session = self.session_factory()
+        try:
+            rows = session.execute(
+                select(Trade.challenge_id, Trade.symbol, Trade.type, Trade.quantity, Trade.open_price,
+                       UserChallenge.start_balance, UserChallenge.current_equity,
+                       UserChallenge.day_start_equity, UserChallenge.day_start_date,
+                       UserChallenge.daily_loss_limit, UserChallenge.total_loss_limit)
+                .join(UserChallenge, UserChallenge.id == Trade.challenge_id)
+                .where(Trade.close_price.is_(None), UserChallenge.status == ChallengeStatusEnum.active)
+            ).all()
+        finally:
+            session.close()
+        positions = [row[:5] for row in rows]
+        challenges = list({row[0]: (row[0], *row[5:]) for row in rows}.values())
+        self.load(positions, challenges)
+
+    # ---- revaluation -----------------------------------------------------
+
+    def on_quote(self, quote) -> None:
+        """Price listener: revalue every open position when a held symbol moves."""
+        book = self._book
+        if book is None:
+            return
+        i = book.symbol_index.get(quote.ticker)
+        with self._lock:
+            self._prices[quote.ticker] = quote.price
+            if i is None or book is not self._book or book.prices[i] == quote.price:
+                return
+            book.prices[i] = quote.price
+            self._sweep(book)
+
+    def _sweep(self, book: _Book) -> None:
+        started = time.perf_counter()
+        unrealized = book.pos_qty * (book.prices[book.pos_symbol] - book.pos_open)
+        np.nan_to_num(unrealized, copy=False)
+        equity = book.realized + np.bincount(book.pos_challenge, weights=unrealized, minlength=len(book.challenge_ids))
+        breached = book.active & ((equity <= book.total_floor) | (equity <= book.daily_floor))
+        if breached.any():
+            book.active &= ~breached
+            ids = book.challenge_ids[breached].tolist()
+            self._pending.update(ids)
+            self.breaches += len(ids)
+        elapsed = time.perf_counter() - started
+        self.sweeps += 1
+        self.sweep_time += elapsed
+        self.sweep_max = max(self.sweep_max, elapsed)
+        risk_sweep_duration.observe(elapsed)
+
+    def flush(self) -> int:
+        """Fail the breached challenges in batched UPDATEs. Returns the rows updated."""
+        with self._lock:
+            ids = sorted(self._pending)
+        if not ids:
+            return 0
+        now = dt.datetime.utcnow()
+        session = self.session_factory()
+        updated = 0
+        try:
+            for start in range(0, len(ids), _FLUSH_CHUNK):
+                result = session.execute(
+                    update(UserChallenge)
+                    .where(UserChallenge.id.in_(ids[start:start + _FLUSH_CHUNK]),
+                           UserChallenge.status == ChallengeStatusEnum.active)
+                    .values(status=ChallengeStatusEnum.failed, status_changed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                updated += result.rowcount
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        with self._lock:
+            self._pending.difference_update(ids)
+            self.flushes += 1
+            self.failed_written += updated
+        if updated:
+            invalidate("leaderboard", "users")
+        return updated
+
+    def stats(self) -> Dict[str, object]:
+        book = self._book
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "positions": len(book.pos_qty) if book else 0,
+                "challenges": int(book.active.sum()) if book else 0,
+                "symbols": len(book.symbols) if book else 0,
+                "sweeps": self.sweeps,
+                "avg_sweep_ms": round(self.sweep_time / self.sweeps * 1e3, 4) if self.sweeps else 0.0,
+                "max_sweep_ms": round(self.sweep_max * 1e3, 4),
+                "breaches": self.breaches,
+                "pending": len(self._pending),
+                "failed_written": self.failed_written,
+                "flushes": self.flushes,
+                "last_error": self.last_error,
+            }
+
+
+risk_engine = RiskEngine(refresher=price_refresher)
@@ -2,21 +2,28 @@
 
 Endpoints:
 - POST /api/buy-challenge
+- GET /api/users
 - GET /api/leaderboard
 - POST /api/trade
+- POST /api/trades/bulk
+- GET /api/challenges/<id>/trades
+- GET /api/challenges/<id>/trades/export
+- POST /api/admin/backtest
 """
 
 from __future__ import annotations
 
+import csv
 import datetime as dt
+import io
+import json
+import time
 from typing import Dict
 
-from flask import Blueprint, jsonify, request
-import os
-from sqlalchemy import func, desc
+from flask import Blueprint, Response, jsonify, request
+from sqlalchemy import and_, desc, func, or_, select
 from sqlalchemy.exc import IntegrityError
 import traceback
-from werkzeug.security import generate_password_hash, check_password_hash
 
 # Flexible imports package/script
 try:
@@ -25,93 +32,135 @@ try:
         UserChallenge,
         Trade,
         ChallengeStatusEnum,
-        TradeTypeEnum,
         PlatformSetting,
     )
-    from .services import SessionLocal, check_challenge_status
+    from .services import SessionLocal, TradeValidationError, execute_trade as run_trade, ingest_trades
+    from .config import AUTH_TOKEN_TTL, BULK_TRADES_MAX, TRADES_EXPORT_CHUNK
+    from .response_cache import cached, invalidate
+    from .chat_cache import chat_cache
+    from .auth import HashPoolBusy, auth_required, hash_pool, issue_token, token_claims
+    from . import backtest, llm
 except ImportError:
     from models import (
         User,
         UserChallenge,
         Trade,
         ChallengeStatusEnum,
-        TradeTypeEnum,
         PlatformSetting,
     )
-    from services import SessionLocal, check_challenge_status
+    from services import SessionLocal, TradeValidationError, execute_trade as run_trade, ingest_trades
+    from config import AUTH_TOKEN_TTL, BULK_TRADES_MAX, TRADES_EXPORT_CHUNK
+    from response_cache import cached, invalidate
+    from chat_cache import chat_cache
+    from auth import HashPoolBusy, auth_required, hash_pool, issue_token, token_claims
+    import backtest
+    import llm
 
 
 api = Blueprint("api", __name__, url_prefix="/api")
 
+def _busy():
+  resp = jsonify({"error": "Serveur occupé, réessayez dans un instant"})
+  resp.status_code = 503
+  resp.headers["Retry-After"] = "1"
+  return resp
+
 @api.route("/login", methods=["POST"])
 def login():
-  print(request.json)
   data = request.get_json(force=True) or {}
-  email = str(data.get("email") or "")
+  email = str(data.get("email") or "").strip().lower()
   password = str(data.get("password") or "")
   if not email or not password:
     return jsonify({"error": "email et mot de passe requis"}), 400
   session = SessionLocal()
   try:
-    user = session.query(User).filter(User.email == email).first()
-    if not user:
-      return jsonify({"error": "Utilisateur introuvable"}), 401
-    if not check_password_hash(user.password_hash, password):
-      return jsonify({"error": "Email ou mot de passe incorrect"}), 401
-    return jsonify({"status": "ok", "user_id": user.id, "role": getattr(user.role, "value", str(user.role))})
+    user = session.query(User.id, User.role, User.password_hash).filter(func.lower(User.email) == email).first()
   finally:
     session.close()
+  if not user:
+    return jsonify({"error": "Utilisateur introuvable"}), 401
+  # The connection is back in the pool before the (slow) hash check
+  try:
+    if not hash_pool.check(user.password_hash, password):
+      return jsonify({"error": "Email ou mot de passe incorrect"}), 401
+  except HashPoolBusy:
+    return _busy()
+  role = getattr(user.role, "value", str(user.role))
+  return jsonify({
+    "status": "ok",
+    "user_id": user.id,
+    "role": role,
+    "token": issue_token(user.id, role),
+    "expires_in": AUTH_TOKEN_TTL,
+  })
+
+@api.route("/me", methods=["GET"])
+@auth_required()
+def me():
+  """Identity carried by the bearer token (signature check only, no database query)."""
+  claims = token_claims()
+  return jsonify({"user_id": claims["uid"], "role": claims["role"]})
+
 @api.route("/chat", methods=["POST"])
 def chat():
-  data = request.get_json(force=True) or {}
-  text = str(data.get("message") or "").strip()
-  if not text:
-    return jsonify({"error": "message requis"}), 400
-  sys_prompt = "Tu es TradeSense AI, un expert en trading. Réponds de manière claire, professionnelle et utile."
-  try:
-    openai_key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY")
-    groq_key = os.environ.get("GROQ_API_KEY") or os.environ.get("GROQ_APIKEY")
-    if openai_key:
-      try:
-        from openai import OpenAI
-        client = OpenAI(api_key=openai_key)
-        resp = client.chat.completions.create(
-          model="gpt-4o-mini",
-          messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": text},
-          ],
-          temperature=0.3,
-        )
-        reply = (resp.choices[0].message.content or "").strip()
-        if not reply:
-          reply = "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."
-        return jsonify({"reply": reply})
-      except Exception as e:
-        pass
-    if groq_key:
-      try:
-        from groq import Groq
-        client = Groq(api_key=groq_key)
-        resp = client.chat.completions.create(
-          model="llama-3.1-8b-instant",
-          messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": text},
-          ],
-          temperature=0.3,
-        )
-        reply = (resp.choices[0].message.content or "").strip()
-        if not reply:
-          reply = "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."
-        return jsonify({"reply": reply})
-      except Exception as e:
-        pass
-    return jsonify({"reply": "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."})
-  except Exception as e:
-    return jsonify({"error": str(e)}), 502
+    """Answer a chat message with the AI assistant.
+
+    Payload: {"message": str, "stream": bool (optional)}
+    With "stream": true or `Accept: text/event-stream`, the reply is streamed
+    as SSE: `token` events ({"t": text}) then one `done` event ({"provider"}).
+    Otherwise returns {"reply": str}. See llm.ChatStream for provider failover.
+    Repeated and near-duplicate questions are answered from chat_cache.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    text = str(data.get("message") or "").strip()
+    if not text:
+        return jsonify({"error": "message requis"}), 400
+
+    wants_stream = bool(data.get("stream")) or request.accept_mimetypes.best == "text/event-stream"
+    hit = chat_cache.get(text)
+    if not wants_stream:
+        if hit is not None:
+            return jsonify({"reply": hit[0]})
+        try:
+            started = time.perf_counter()
+            stream = llm.ChatStream(text)
+            reply = "".join(stream).strip() or llm.FALLBACK_REPLY
+            if stream.completed:  # not the fallback, not cut short by an error or a stall
+                chat_cache.put(text, reply, time.perf_counter() - started)
+            return jsonify({"reply": reply})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 502
+
+    if hit is not None:
+        body = llm.sse_event("token", {"t": hit[0]}) + llm.sse_event("done", {"provider": "cache"})
+        return Response(body, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    stream = llm.ChatStream(text)
+
+    def generate():
+        started = time.perf_counter()
+        tokens = iter(stream)
+        parts = []
+        try:
+            for delta in tokens:
+                parts.append(delta)
+                yield llm.sse_event("token", {"t": delta})
+            if stream.completed:
+                chat_cache.put(text, "".join(parts).strip(), time.perf_counter() - started)
+            yield llm.sse_event("done", {"provider": stream.provider})
+        finally:
+            # Runs on client disconnect too (the server closes the response iterable)
+            tokens.close()
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @api.route("/platform-settings", methods=["GET", "POST"])
+@cached("platform-settings", ttl=300)
 def platform_settings():
   session = SessionLocal()
   try:
@@ -129,12 +178,12 @@ def platform_settings():
       session.add(row)
     session.commit()
     session.refresh(row)
+    invalidate("platform-settings")
     return jsonify({"status": "ok", "paypal_email": row.paypal_email})
   finally:
     session.close()
 @api.route("/register", methods=["POST"])
 def register():
-  print(request.json)
   data = request.get_json(force=True) or {}
   name = str(data.get("name") or data.get("username") or "").strip()
   email = str(data.get("email") or "").strip().lower()
@@ -143,16 +192,24 @@ def register():
     return jsonify({"error": "name, email et password requis"}), 400
   session = SessionLocal()
   try:
-    exists_email = session.query(User).filter(func.lower(User.email) == email).first()
+    exists_email = session.query(User.id).filter(func.lower(User.email) == email).first()
     if exists_email:
       return jsonify({"error": "Email déjà utilisé"}), 409
-    exists_username = session.query(User).filter(func.lower(User.username) == func.lower(name)).first()
+    exists_username = session.query(User.id).filter(func.lower(User.username) == func.lower(name)).first()
     if exists_username:
       return jsonify({"error": "Nom d'utilisateur déjà utilisé"}), 409
+  finally:
+    session.close()
+  try:
+    password_hash = hash_pool.hash(password)
+  except HashPoolBusy:
+    return _busy()
+  session = SessionLocal()
+  try:
     user = User(
       username=name,
       email=email,
-      password_hash=generate_password_hash(password),
+      password_hash=password_hash,
     )
     session.add(user)
     try:
@@ -161,6 +218,7 @@ def register():
       session.rollback()
       return jsonify({"error": "Identifiants déjà utilisés"}), 409
     session.refresh(user)
+    invalidate("users")
     return jsonify({"status": "ok", "user_id": user.id})
   except Exception as e:
     session.rollback()
@@ -168,34 +226,77 @@ def register():
     return jsonify({"error": str(e)}), 500
   finally:
     session.close()
+
+
+# Page size cap for GET /api/users
+USERS_MAX_LIMIT = 200
+
+
 @api.route("/users", methods=["GET"])
+@cached("users", ttl=30)
 def list_users():
+    """List users with the status of their latest challenge, one page at a time.
+
+    Query params (all optional):
+    - q: case-insensitive search in username and email
+    - id: a single user id
+    - limit: page size (default 50, max 200)
+    - cursor: `next_cursor` of the previous page (keyset on users.id, no OFFSET scan)
+    Returns: {"users": [{id, name, email, role, status}], "next_cursor": str | null}
+
+    The latest challenge status comes from a correlated LIMIT 1 subquery served by
+    ix_user_challenges_user_id_start_date, so a page costs one query.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), USERS_MAX_LIMIT)
+        cursor = int(request.args["cursor"]) if request.args.get("cursor") else None
+        user_id = int(request.args["id"]) if request.args.get("id") else None
+    except ValueError:
+        return jsonify({"error": "limit, cursor et id doivent être des entiers"}), 400
+    search = str(request.args.get("q") or "").strip().lower()
+
     session = SessionLocal()
     try:
-        rows = session.query(User).limit(50).all()
-        results = []
-        for u in rows:
-            last_challenge = (
-                session.query(UserChallenge)
-                .filter(UserChallenge.user_id == u.id)
-                .order_by(UserChallenge.start_date.desc())
-                .first()
-            )
-            status = (last_challenge.status.value if last_challenge else "active")
-            results.append(
-                {
-                    "id": u.id,
-                    "name": u.username,
-                    "email": u.email,
-                    "role": u.role.value if hasattr(u.role, "value") else str(u.role),
-                    "status": status,
-                }
-            )
-        return jsonify(results)
+        latest_status = (
+            select(UserChallenge.status)
+            .where(UserChallenge.user_id == User.id)
+            .order_by(UserChallenge.start_date.desc(), UserChallenge.id.desc())
+            .limit(1)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        q = session.query(User.id, User.username, User.email, User.role, latest_status.label("status"))
+        if user_id is not None:
+            q = q.filter(User.id == user_id)
+        if cursor is not None:
+            q = q.filter(User.id > cursor)
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            q = q.filter(or_(
+                func.lower(User.username).like(pattern, escape="\\"),
+                func.lower(User.email).like(pattern, escape="\\"),
+            ))
+        rows = q.order_by(User.id).limit(limit + 1).all()
+
+        results = [
+            {
+                "id": row.id,
+                "name": row.username,
+                "email": row.email,
+                "role": row.role.value if hasattr(row.role, "value") else str(row.role),
+                "status": row.status.value if row.status is not None else "active",
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = str(results[-1]["id"]) if len(rows) > limit else None
+        return jsonify({"users": results, "next_cursor": next_cursor})
     finally:
         session.close()
 
 
+# Page size cap for GET /api/leaderboard
+LEADERBOARD_MAX_LIMIT = 100
+
 # Simple plan mapping for challenge purchase
 PLAN_BALANCES: Dict[str, float] = {
     "starter": 5000.0,
@@ -239,6 +340,7 @@ def buy_challenge():
         session.add(challenge)
         session.commit()
         session.refresh(challenge)
+        invalidate("users", "leaderboard")
 
         return jsonify({"status": "Success", "challenge_id": challenge.id})
     finally:
@@ -246,33 +348,55 @@ def buy_challenge():
 
 
 @api.route("/leaderboard", methods=["GET"])
+@cached("leaderboard", ttl=5)
 def leaderboard():
-    """Return top 10 traders sorted by percentage profit computed from trades.
-
-    Profit% = sum(trades.profit_loss) / start_balance * 100
+    """Return traders sorted by percentage profit.
+
+    Profit% = sum(trades.profit_loss) / start_balance * 100, read from the
+    denormalized user_challenges.total_pnl / profit_pct columns (kept up to
+    date in the trade transaction), so the top-N is an indexed scan whatever
+    the number of trades.
+
+    Query params (all optional):
+    - limit: page size (default 10, max 100)
+    - offset: rows to skip (default 0)
+    - plan: starter | standard | pro | enterprise
+    - status: active | failed | passed
     Returns a list with user, challenge, profit_pct, total_pnl.
     """
-    session = SessionLocal()
     try:
-        profit_pct_expr = (
-            func.coalesce(func.sum(Trade.profit_loss), 0.0) / UserChallenge.start_balance * 100.0
-        ).label("profit_pct")
+        limit = min(max(int(request.args.get("limit", 10)), 1), LEADERBOARD_MAX_LIMIT)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit et offset doivent être des entiers"}), 400
+
+    plan = request.args.get("plan")
+    if plan is not None and plan.lower() not in PLAN_BALANCES:
+        return jsonify({"error": f"plan inconnu: {plan}"}), 400
+    status = request.args.get("status")
+    if status is not None and status.lower() not in ChallengeStatusEnum.__members__:
+        return jsonify({"error": f"status inconnu: {status}"}), 400
 
+    session = SessionLocal()
+    try:
         q = (
             session.query(
                 User.id.label("user_id"),
                 User.username.label("username"),
                 UserChallenge.id.label("challenge_id"),
                 UserChallenge.start_balance.label("start_balance"),
-                func.coalesce(func.sum(Trade.profit_loss), 0.0).label("total_pnl"),
-                profit_pct_expr,
+                UserChallenge.total_pnl.label("total_pnl"),
+                UserChallenge.profit_pct.label("profit_pct"),
             )
-            .join(UserChallenge, UserChallenge.user_id == User.id)
-            .outerjoin(Trade, Trade.challenge_id == UserChallenge.id)
-            .group_by(User.id, User.username, UserChallenge.id, UserChallenge.start_balance)
-            .order_by(desc(profit_pct_expr))
-            .limit(10)
+            .join(User, User.id == UserChallenge.user_id)
         )
+        if plan is not None:
+            # Plans are identified by their start balance (see PLAN_BALANCES)
+            q = q.filter(UserChallenge.start_balance == PLAN_BALANCES[plan.lower()])
+        if status is not None:
+            q = q.filter(UserChallenge.status == ChallengeStatusEnum[status.lower()])
+        # Matches ix_user_challenges_profit_pct / ix_user_challenges_status_profit_pct
+        q = q.order_by(desc(UserChallenge.profit_pct), desc(UserChallenge.id)).offset(offset).limit(limit)
 
         results = [
             {
@@ -286,14 +410,14 @@ def leaderboard():
             for row in q.all()
         ]
 
-        return jsonify({"leaderboard": results})
+        return jsonify({"leaderboard": results, "limit": limit, "offset": offset})
     finally:
         session.close()
 
 
 @api.route("/trade", methods=["POST"])
 def execute_trade():
-    """Execute a trade and update the associated challenge equity, then check status.
+    """Execute a trade, update the challenge equity and check its status in one transaction.
 
     Payload:
     {
@@ -329,58 +453,259 @@ def execute_trade():
 
     session = SessionLocal()
     try:
-        challenge = session.get(UserChallenge, challenge_id)
-        if not challenge:
+        result = run_trade(session, challenge_id, symbol, side, quantity, open_price, close_price)
+        if result is None:
             return jsonify({"error": f"Challenge {challenge_id} introuvable"}), 404
 
-        if side == "buy":
-            pnl = (close_price - open_price) * quantity
-            type_enum = TradeTypeEnum.buy
-        else:  # sell
-            pnl = (open_price - close_price) * quantity
-            type_enum = TradeTypeEnum.sell
-
-        trade = Trade(
-            challenge_id=challenge.id,
-            symbol=symbol,
-            type=type_enum,
-            quantity=quantity,
-            open_price=open_price,
-            close_price=close_price,
-            profit_loss=pnl,
-            timestamp=dt.datetime.utcnow(),
-        )
-
-        session.add(trade)
-
-        # Update challenge equity
-        challenge.current_equity = float(challenge.current_equity) + float(pnl)
-        session.add(challenge)
-        session.commit()
-        session.refresh(trade)
-        session.refresh(challenge)
-
-        # Check status after trade
-        updated_status = check_challenge_status(challenge.id)
-
+        trade = result["trade"]
+        challenge = result["challenge"]
+        # The users list shows the latest challenge status, which only changes on a flip
+        invalidate("leaderboard", *(("users",) if challenge["status"] != ChallengeStatusEnum.active else ()))
         return jsonify(
             {
                 "status": "Success",
                 "trade": {
-                    "id": trade.id,
-                    "symbol": trade.symbol,
-                    "type": trade.type.value,
-                    "quantity": trade.quantity,
-                    "open_price": trade.open_price,
-                    "close_price": trade.close_price,
-                    "profit_loss": trade.profit_loss,
+                    "id": trade["id"],
+                    "symbol": trade["symbol"],
+                    "type": trade["type"].value,
+                    "quantity": trade["quantity"],
+                    "open_price": trade["open_price"],
+                    "close_price": trade["close_price"],
+                    "profit_loss": trade["profit_loss"],
                 },
                 "challenge": {
-                    "id": challenge.id,
-                    "current_equity": challenge.current_equity,
-                    "status": updated_status.value,
+                    "id": challenge["id"],
+                    "current_equity": challenge["current_equity"],
+                    "status": challenge["status"].value,
                 },
             }
         )
     finally:
         session.close()
+
+
+_NDJSON_MIMETYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+
+@api.route("/trades/bulk", methods=["POST"])
+def bulk_trades():
+    """Import many closed trades at once (broker fills, replayed sessions).
+
+    Body: a JSON array of trades (same fields as POST /api/trade, plus an
+    optional ISO-8601 "timestamp"), or one trade per line with
+    Content-Type: application/x-ndjson (read as a stream).
+    The batch is all-or-nothing. Trades are applied per challenge in
+    chronological order after the challenge's existing trades; a trade older
+    than its latest stored trade (or its current day), or stamped in the
+    future, rejects the batch.
+    Returns: {"status": "Success", "inserted": n, "challenges": {id: {...}}}
+    """
+    if request.mimetype in _NDJSON_MIMETYPES:
+        records = []
+        for lineno, line in enumerate(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                return jsonify({"error": f"NDJSON invalide à la ligne {lineno + 1}"}), 400
+            if len(records) > BULK_TRADES_MAX:
+                break
+    else:
+        data = request.get_json(force=True, silent=True)
+        records = data.get("trades") if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return jsonify({"error": "tableau JSON de trades attendu"}), 400
+
+    if len(records) > BULK_TRADES_MAX:
+        return jsonify({"error": f"{BULK_TRADES_MAX} trades maximum par requête"}), 413
+
+    session = SessionLocal()
+    try:
+        summary = ingest_trades(session, records)
+    except TradeValidationError as e:
+        return jsonify({"error": str(e), "errors": e.errors[:100]}), 400
+    finally:
+        session.close()
+    invalidate("leaderboard", "users")
+    return jsonify({"status": "Success", **summary})
+
+
+# Page size cap for GET /api/challenges/<id>/trades
+TRADES_MAX_LIMIT = 500
+
+_TRADE_COLUMNS = ("id", "symbol", "type", "quantity", "open_price", "close_price", "profit_loss", "timestamp")
+
+
+def _trade_row(row) -> Dict:
+    return {
+        "id": row.id,
+        "symbol": row.symbol,
+        "type": row.type.value if hasattr(row.type, "value") else str(row.type),
+        "quantity": row.quantity,
+        "open_price": row.open_price,
+        "close_price": row.close_price,
+        "profit_loss": row.profit_loss,
+        "timestamp": row.timestamp.isoformat() if row.timestamp is not None else None,
+    }
+
+
+def _challenge_forbidden(session, challenge_id: int):
+    """404 / 403 response unless the challenge exists and the caller owns it or is an admin."""
+    owner = session.execute(
+        select(UserChallenge.user_id).where(UserChallenge.id == challenge_id)
+    ).scalar_one_or_none()
+    if owner is None:
+        return jsonify({"error": f"Challenge {challenge_id} introuvable"}), 404
+    claims = token_claims()
+    if claims.get("role") != "admin" and claims.get("uid") != owner:
+        return jsonify({"error": "Accès refusé"}), 403
+    return None
+
+
+@api.route("/challenges/<int:challenge_id>/trades", methods=["GET"])
+@auth_required()
+def challenge_trades(challenge_id: int):
+    """List a challenge's trades, newest first, one page at a time.
+
+    Query params (all optional):
+    - limit: page size (default 100, max 500)
+    - cursor: `next_cursor` of the previous page (keyset on (timestamp, id),
+      served by ix_trades_challenge_id_timestamp, no OFFSET scan)
+    Requires a bearer token of the challenge owner or of an admin.
+    Returns: {"trades": [{id, symbol, type, quantity, open_price, close_price,
+              profit_loss, timestamp}], "next_cursor": str | null}
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), TRADES_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit doit être un entier"}), 400
+    after = None
+    if request.args.get("cursor"):
+        stamp, _, trade_id = request.args["cursor"].rpartition("_")
+        try:
+            after = (dt.datetime.fromisoformat(stamp), int(trade_id))
+        except ValueError:
+            return jsonify({"error": "cursor invalide"}), 400
+
+    session = SessionLocal()
+    try:
+        denied = _challenge_forbidden(session, challenge_id)
+        if denied is not None:
+            return denied
+        stmt = select(*(getattr(Trade, c) for c in _TRADE_COLUMNS)).where(Trade.challenge_id == challenge_id)
+        if after is not None:
+            # The bare timestamp bound keeps the index range scan; the OR breaks ties on id
+            stmt = stmt.where(
+                Trade.timestamp <= after[0],
+                or_(Trade.timestamp < after[0], and_(Trade.timestamp == after[0], Trade.id < after[1])),
+            )
+        rows = session.execute(
+            stmt.order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit + 1)
+        ).all()
+
+        results = [_trade_row(row) for row in rows[:limit]]
+        next_cursor = f"{results[-1]['timestamp']}_{results[-1]['id']}" if len(rows) > limit else None
+        return jsonify({"trades": results, "next_cursor": next_cursor})
+    finally:
+        session.close()
+
+
+@api.route("/challenges/<int:challenge_id>/trades/export", methods=["GET"])
+@auth_required()
+def export_challenge_trades(challenge_id: int):
+    """Stream all of a challenge's trades, oldest first, as CSV (default) or NDJSON.
+
+    Query params: format=csv | ndjson
+    Requires a bearer token of the challenge owner or of an admin.
+
+    Rows are read with a server-side cursor (yield_per, TRADES_EXPORT_CHUNK
+    rows at a time) and written as they come, one chunk per batch: memory
+    stays constant whatever the number of trades and the first bytes (the
+    CSV header) leave before the query has finished.
+    """
+    fmt = str(request.args.get("format", "csv")).lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format doit être csv ou ndjson"}), 400
+
+    session = SessionLocal()
+    try:
+        denied = _challenge_forbidden(session, challenge_id)
+    finally:
+        session.close()
+    if denied is not None:
+        return denied
+
+    stmt = (
+        select(*(getattr(Trade, c) for c in _TRADE_COLUMNS))
+        .where(Trade.challenge_id == challenge_id)
+        .order_by(Trade.timestamp, Trade.id)
+    )
+
+    def generate():
+        if fmt == "csv":
+            yield ",".join(_TRADE_COLUMNS) + "\n"
+        session = SessionLocal()
+        try:
+            result = session.execute(stmt, execution_options={"yield_per": TRADES_EXPORT_CHUNK})
+            for part in result.partitions():
+                rows = [_trade_row(row) for row in part]
+                if fmt == "csv":
+                    buf = io.StringIO()
+                    writer = csv.writer(buf, lineterminator="\n")
+                    writer.writerows([r[c] for c in _TRADE_COLUMNS] for r in rows)
+                    yield buf.getvalue()
+                else:
+                    yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        finally:
+            session.close()
+
+    return Response(
+        generate(),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="challenge-{challenge_id}-trades.{fmt}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _grid_values(data: Dict, key: str):
+    """A backtest rule from the request body: a number, a list of numbers, or null/absent (own limits)."""
+    raw = data.get(key)
+    values = raw if isinstance(raw, list) else [raw]
+    try:
+        return [None if v is None else float(v) for v in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}: nombre, liste de nombres ou null attendu") from None
+
+
+@api.route("/admin/backtest", methods=["POST"])
+@auth_required(role="admin")
+def admin_backtest():
+    """Replay the stored trades under other rule parameters (vectorized, see backtest.py).
+
+    Body: {"daily_loss_limit": [0.03, 0.04], "total_loss_limit": 0.1, "profit_target": [0.08, 0.1]}
+    Each rule takes a value, a list of values (the grid is their product) or
+    null for each challenge's own limit. Nothing is written to the database.
+    Requires an admin bearer token (from /api/login).
+    Returns: {"challenges", "trades", "load_ms", "eval_ms", "workers",
+              "results": [{daily_loss_limit, total_loss_limit, profit_target,
+                           passed, failed, failed_daily, failed_total, active, avg_days_to_breach}]}
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        grid = backtest.make_grid(
+            _grid_values(data, "daily_loss_limit"),
+            _grid_values(data, "total_loss_limit"),
+            _grid_values(data, "profit_target"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    session = SessionLocal()
+    try:
+        return jsonify(backtest.backtest(session, grid))
+    finally:
+        session.close()
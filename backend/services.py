@@ -2,48 +2,51 @@
 
 Implements challenge status checks based on business rules:
 - Daily max loss: equity drops >= daily_loss_limit from start-of-day baseline -> FAILED
+  (baseline = equity snapshot taken before the first trade of the UTC day)
 - Total max loss: equity drops >= total_loss_limit from initial balance -> FAILED
 - Profit target: equity rises >= 10% from initial balance -> PASSED
+
+Trades are executed by `execute_trade`: PnL, equity and the rules above are
+computed in memory and persisted in a single transaction. `ingest_trades`
+does the same for a batch of trades (bulk import / replay).
 """
 
 from __future__ import annotations
 
+import csv
 import datetime as dt
-from typing import Optional
+import io
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.sql import func
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.orm import Session
 
 # Flexible imports whether run as a package or a script
 try:  # package-style
     from .models import (
-        Base,
         UserChallenge,
         Trade,
         ChallengeStatusEnum,
+        TradeTypeEnum,
     )
-    from .config import SQLALCHEMY_DATABASE_URL
+    from .db import SessionLocal
+    from .migrations import profit_pct_expr
+    from .config import TRADE_MAX_CLOCK_SKEW
 except ImportError:  # script-style
     from models import (
-        Base,
         UserChallenge,
         Trade,
         ChallengeStatusEnum,
+        TradeTypeEnum,
     )
-    from config import SQLALCHEMY_DATABASE_URL
-
-
-def _create_session_factory(db_url: str):
-    """Create a session factory bound to the given database URL."""
-    connect_args = {"check_same_thread": False} if db_url.startswith("sqlite") else {}
-    engine = create_engine(db_url, future=True, connect_args=connect_args)
-    # Ensure tables exist (dev convenience). In production, use migrations.
-    Base.metadata.create_all(bind=engine)
-    return scoped_session(sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True))
+    from db import SessionLocal
+    from migrations import profit_pct_expr
+    from config import TRADE_MAX_CLOCK_SKEW
 
 
-SessionLocal = _create_session_factory(SQLALCHEMY_DATABASE_URL)
+# Profit target as a fraction of the initial balance (10%)
+PROFIT_TARGET = 0.10
 
 
 def _utc_start_of_today(now: Optional[dt.datetime] = None) -> dt.datetime:
@@ -52,6 +55,49 @@ def _utc_start_of_today(now: Optional[dt.datetime] = None) -> dt.datetime:
     return ts.replace(hour=0, minute=0, second=0, microsecond=0)
 
 
+def roll_daily_baseline(challenge: UserChallenge, now: Optional[dt.datetime] = None) -> float:
+    """Return the challenge's start-of-day equity, rolling the snapshot to today if needed.
+
+    Call it before applying a trade's PnL: the first call on a new UTC day
+    snapshots the current equity (= start balance + PnL of all earlier days)
+    as the day's baseline. O(1), no scan of the trade history.
+    """
+    today = _utc_start_of_today(now).date()
+    if challenge.day_start_date != today or challenge.day_start_equity is None:
+        challenge.day_start_equity = float(challenge.current_equity)
+        challenge.day_start_date = today
+    return float(challenge.day_start_equity)
+
+
+def evaluate_rules(
+    start_balance: float,
+    current_equity: float,
+    day_start_equity: float,
+    daily_loss_limit: float,
+    total_loss_limit: float,
+    profit_target: float = PROFIT_TARGET,
+) -> Optional[ChallengeStatusEnum]:
+    """Return the status a rule triggers for these figures, or None if no rule triggers.
+
+    Pure function (no database access), checked in the documented order:
+    total max loss, daily max loss, profit target.
+    """
+    if current_equity <= start_balance * (1.0 - total_loss_limit):
+        return ChallengeStatusEnum.failed
+    if current_equity <= day_start_equity * (1.0 - daily_loss_limit):
+        return ChallengeStatusEnum.failed
+    if current_equity >= start_balance * (1.0 + profit_target):
+        return ChallengeStatusEnum.passed
+    return None
+
+
+def compute_pnl(side: str, quantity: int, open_price: float, close_price: float) -> float:
+    """PnL of a closed trade: long profits when price rises, short when it falls."""
+    if side == "buy":
+        return (close_price - open_price) * quantity
+    return (open_price - close_price) * quantity
+
+
 def check_challenge_status(challenge_id: int) -> ChallengeStatusEnum:
     """Evaluate and update a challenge's status according to business rules.
 
@@ -74,49 +120,369 @@ def check_challenge_status(challenge_id: int) -> ChallengeStatusEnum:
         if challenge.status in {ChallengeStatusEnum.failed, ChallengeStatusEnum.passed}:
             return challenge.status
 
-        start_balance = float(challenge.start_balance)
-        current_equity = float(challenge.current_equity)
-
-        # 1) Total Max Loss
-        total_threshold = start_balance * (1.0 - float(challenge.total_loss_limit))
-        if current_equity <= total_threshold:
-            challenge.status = ChallengeStatusEnum.failed
-            session.add(challenge)
+        new_status = evaluate_rules(
+            float(challenge.start_balance),
+            float(challenge.current_equity),
+            roll_daily_baseline(challenge),
+            float(challenge.daily_loss_limit),
+            float(challenge.total_loss_limit),
+        )
+        if new_status is not None:
+            challenge.status = new_status
+            challenge.status_changed_at = dt.datetime.utcnow()
+        if session.is_modified(challenge):  # status changed or baseline rolled forward
             session.commit()
-            session.refresh(challenge)
-            return challenge.status
+        return challenge.status
+    finally:
+        session.close()
 
-        # 2) Daily Max Loss (baseline = equity at start of UTC day)
-        day_start = _utc_start_of_today()
-        pnl_before_today = (
-            session.query(func.coalesce(func.sum(Trade.profit_loss), 0.0))
-            .filter(
-                Trade.challenge_id == challenge.id,
-                Trade.timestamp < day_start,
-                Trade.profit_loss != None,  # noqa: E711
-            )
-            .scalar()
+
+def execute_trade(
+    session: Session,
+    challenge_id: int,
+    symbol: str,
+    side: str,
+    quantity: int,
+    open_price: float,
+    close_price: float,
+    now: Optional[dt.datetime] = None,
+) -> Optional[Dict[str, Any]]:
+    """Record a closed trade, update equity and evaluate the rules in one transaction.
+
+    The equity change is applied with a single atomic
+    `UPDATE ... SET current_equity = current_equity + :pnl RETURNING ...`, which
+    also rolls the daily baseline forward on the first trade of a UTC day. Two
+    concurrent trades on the same challenge therefore serialize on the row and
+    cannot lose each other's update. Rules are then evaluated in memory on the
+    returned figures; the status is only written when it flips.
+
+    Returns a dict with the trade and challenge figures, or None if the
+    challenge does not exist.
+    """
+    now = now or dt.datetime.utcnow()
+    today = now.date()
+    pnl = float(compute_pnl(side, quantity, open_price, close_price))
+
+    rolls_today = or_(
+        UserChallenge.day_start_date == None,  # noqa: E711
+        UserChallenge.day_start_date != today,
+        UserChallenge.day_start_equity == None,  # noqa: E711
+    )
+    # SET expressions read the pre-update row, so the baseline is the equity before this trade.
+    stmt = (
+        update(UserChallenge)
+        .where(UserChallenge.id == challenge_id)
+        .values(
+            day_start_equity=case((rolls_today, UserChallenge.current_equity), else_=UserChallenge.day_start_equity),
+            day_start_date=today,
+            current_equity=UserChallenge.current_equity + pnl,
+            total_pnl=UserChallenge.total_pnl + pnl,
+            profit_pct=profit_pct_expr(UserChallenge.total_pnl + pnl),
         )
-        day_start_balance = start_balance + float(pnl_before_today or 0.0)
+        .execution_options(synchronize_session=False)
+    )
+    returned = (
+        UserChallenge.start_balance,
+        UserChallenge.current_equity,
+        UserChallenge.day_start_equity,
+        UserChallenge.daily_loss_limit,
+        UserChallenge.total_loss_limit,
+        UserChallenge.status,
+    )
+    returning = session.get_bind().dialect.update_returning
+    try:
+        if returning:
+            row = session.execute(stmt.returning(*returned)).one_or_none()
+        else:  # the UPDATE holds the row/database write lock until commit
+            result = session.execute(stmt)
+            row = None
+            if result.rowcount:
+                row = session.execute(select(*returned).where(UserChallenge.id == challenge_id)).one()
+        if row is None:
+            session.rollback()
+            return None
 
-        daily_threshold = day_start_balance * (1.0 - float(challenge.daily_loss_limit))
-        if current_equity <= daily_threshold:
-            challenge.status = ChallengeStatusEnum.failed
-            session.add(challenge)
-            session.commit()
-            session.refresh(challenge)
-            return challenge.status
+        status = row.status
+        if status == ChallengeStatusEnum.active:
+            new_status = evaluate_rules(
+                float(row.start_balance),
+                float(row.current_equity),
+                float(row.day_start_equity),
+                float(row.daily_loss_limit),
+                float(row.total_loss_limit),
+            )
+            if new_status is not None:
+                session.execute(
+                    update(UserChallenge)
+                    .where(UserChallenge.id == challenge_id, UserChallenge.status == ChallengeStatusEnum.active)
+                    .values(status=new_status, status_changed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                status = new_status
 
-        # 3) Profit Target (fixed 10%)
-        profit_target_equity = start_balance * 1.10
-        if current_equity >= profit_target_equity:
-            challenge.status = ChallengeStatusEnum.passed
-            session.add(challenge)
-            session.commit()
-            session.refresh(challenge)
-            return challenge.status
+        trade_values = {
+            "challenge_id": challenge_id,
+            "symbol": symbol,
+            "type": TradeTypeEnum(side),
+            "quantity": quantity,
+            "open_price": open_price,
+            "close_price": close_price,
+            "profit_loss": pnl,
+            "timestamp": now,
+        }
+        if returning:
+            trade_id = session.execute(insert(Trade).values(**trade_values).returning(Trade.id)).scalar_one()
+        else:  # no RETURNING: the ORM reads the new id from the cursor (lastrowid)
+            trade = Trade(**trade_values)
+            session.add(trade)
+            session.flush()
+            trade_id = trade.id
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
 
-        # No rule triggered; keep current status (likely 'active')
-        return challenge.status
-    finally:
-        session.close()
\ No newline at end of file
+    trade_values["id"] = trade_id
+    return {
+        "trade": trade_values,
+        "challenge": {"id": challenge_id, "current_equity": float(row.current_equity), "status": status},
+    }
+
+
+class TradeValidationError(ValueError):
+    """A batch of trades was rejected; `errors` lists [{"index": i, "error": msg}, ...]."""
+
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f"{len(errors)} trade(s) invalide(s)")
+        self.errors = errors
+
+
+_TRADE_FIELDS = ("challenge_id", "symbol", "type", "quantity", "open_price", "close_price")
+
+
+def parse_trade_timestamp(value: Any) -> dt.datetime:
+    """Parse an ISO-8601 timestamp (or epoch seconds) into a naive UTC datetime."""
+    if isinstance(value, (int, float)):
+        return dt.datetime.utcfromtimestamp(float(value))
+    ts = dt.datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def validate_trade_records(
+    records: Iterable[Any], now: Optional[dt.datetime] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Check and normalize raw trade payloads in one pass.
+
+    Returns (rows ready for insertion, errors). Each row carries its computed
+    `profit_loss` and a `timestamp` (the payload's, or `now`). Timestamps more
+    than TRADE_MAX_CLOCK_SKEW seconds ahead of `now` are rejected: folded, they
+    would move the daily baseline to a future day, and the next live trade
+    would then reset it and erase the current day's losses.
+    """
+    now = now or dt.datetime.utcnow()
+    latest = now + dt.timedelta(seconds=TRADE_MAX_CLOCK_SKEW)
+    rows: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for i, rec in enumerate(records):
+        if not isinstance(rec, dict):
+            errors.append({"index": i, "error": "objet JSON attendu"})
+            continue
+        missing = [f for f in _TRADE_FIELDS if f not in rec]
+        if missing:
+            errors.append({"index": i, "error": f"Champs manquants: {', '.join(missing)}"})
+            continue
+        try:
+            side = str(rec["type"]).lower()
+            quantity = int(rec["quantity"])
+            open_price = float(rec["open_price"])
+            close_price = float(rec["close_price"])
+            row = {
+                "challenge_id": int(rec["challenge_id"]),
+                "symbol": str(rec["symbol"]).upper(),
+                "type": side,
+                "quantity": quantity,
+                "open_price": open_price,
+                "close_price": close_price,
+                "timestamp": parse_trade_timestamp(rec["timestamp"]) if rec.get("timestamp") is not None else now,
+            }
+        except (TypeError, ValueError, OverflowError) as e:
+            errors.append({"index": i, "error": str(e)})
+            continue
+        if side not in {"buy", "sell"}:
+            errors.append({"index": i, "error": "type doit être 'buy' ou 'sell'"})
+        elif quantity <= 0:
+            errors.append({"index": i, "error": "quantity doit être > 0"})
+        elif open_price < 0 or close_price < 0:
+            errors.append({"index": i, "error": "Les prix doivent être >= 0"})
+        elif row["timestamp"] > latest:
+            errors.append({"index": i, "error": "timestamp dans le futur"})
+        else:
+            row["profit_loss"] = float(compute_pnl(side, quantity, open_price, close_price))
+            rows.append(row)
+    return rows, errors
+
+
+def fold_trades(state: Dict[str, Any], trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply chronologically sorted trades to a challenge `state` in memory.
+
+    The daily baseline rolls on the first trade of each later UTC day (never
+    back to an earlier one), equity and total PnL accumulate, and the rules are
+    checked after each trade while the challenge is active (the flip is stamped
+    with that trade's timestamp). Trades must not predate the state: callers
+    reject those (see ingest_trades).
+    """
+    for t in trades:
+        day = t["timestamp"].date()
+        if state["day_start_date"] is None or day > state["day_start_date"] or state["day_start_equity"] is None:
+            state["day_start_equity"] = state["current_equity"]
+            state["day_start_date"] = day
+        state["current_equity"] += t["profit_loss"]
+        state["total_pnl"] += t["profit_loss"]
+        if state["status"] == ChallengeStatusEnum.active:
+            new_status = evaluate_rules(
+                state["start_balance"],
+                state["current_equity"],
+                state["day_start_equity"],
+                state["daily_loss_limit"],
+                state["total_loss_limit"],
+            )
+            if new_status is not None:
+                state["status"] = new_status
+                state["status_changed_at"] = t["timestamp"]
+    return state
+
+
+def _insert_trades(session: Session, rows: List[Dict[str, Any]]) -> None:
+    """Insert trade rows with COPY on PostgreSQL/psycopg2, executemany elsewhere."""
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            writer.writerow([
+                r["challenge_id"], r["symbol"], r["type"], r["quantity"], r["open_price"],
+                r["close_price"], r["profit_loss"], r["timestamp"].isoformat(sep=" "),
+            ])
+        buf.seek(0)
+        dbapi_conn = session.connection().connection.dbapi_connection
+        with dbapi_conn.cursor() as cur:
+            cur.copy_expert(
+                "COPY trades (challenge_id, symbol, type, quantity, open_price, close_price, profit_loss, timestamp)"
+                " FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+        return
+    session.execute(insert(Trade), [{**r, "type": TradeTypeEnum(r["type"])} for r in rows])
+
+
+def ingest_trades(session: Session, records: Iterable[Any], chunk_size: int = 500) -> Dict[str, Any]:
+    """Validate, insert and fold a batch of trades in one transaction.
+
+    Trades are applied per challenge in timestamp order (submission order for
+    equal timestamps), on top of the challenge's current state. Backdated
+    trades cannot be folded on top of that state (they would move the daily
+    baseline back and hide the losses of the current day), so a trade older
+    than the challenge's latest stored trade or than its current baseline day
+    is rejected. The whole batch is rejected with TradeValidationError if any
+    record is invalid, backdated or references an unknown challenge.
+    """
+    rows, errors = validate_trade_records(records)
+    if errors:
+        raise TradeValidationError(errors)
+    if not rows:
+        return {"inserted": 0, "challenges": {}}
+
+    ids = sorted({r["challenge_id"] for r in rows})
+    cols = (
+        UserChallenge.id,
+        UserChallenge.start_balance,
+        UserChallenge.current_equity,
+        UserChallenge.day_start_equity,
+        UserChallenge.day_start_date,
+        UserChallenge.daily_loss_limit,
+        UserChallenge.total_loss_limit,
+        UserChallenge.status,
+        UserChallenge.status_changed_at,
+        UserChallenge.total_pnl,
+    )
+    try:
+        states: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            # Row locks (PostgreSQL) so concurrent single trades wait for the import
+            for row in session.execute(select(*cols).where(UserChallenge.id.in_(chunk)).with_for_update()):
+                state = dict(row._mapping)
+                for k in ("start_balance", "current_equity", "daily_loss_limit", "total_loss_limit", "total_pnl"):
+                    state[k] = float(state[k])
+                states[state["id"]] = state
+
+        unknown = [
+            {"index": i, "error": f"Challenge {r['challenge_id']} introuvable"}
+            for i, r in enumerate(rows) if r["challenge_id"] not in states
+        ]
+        if unknown:
+            raise TradeValidationError(unknown)
+
+        # Latest stored trade per challenge (ix_trades_challenge_id_timestamp)
+        latest: Dict[int, dt.datetime] = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            latest.update(session.execute(
+                select(Trade.challenge_id, func.max(Trade.timestamp))
+                .where(Trade.challenge_id.in_(chunk))
+                .group_by(Trade.challenge_id)
+            ).all())
+        backdated = []
+        for i, r in enumerate(rows):
+            st = states[r["challenge_id"]]
+            floor = latest.get(r["challenge_id"])
+            if st["day_start_date"] is not None:
+                day_start = dt.datetime.combine(st["day_start_date"], dt.time())
+                floor = day_start if floor is None else max(floor, day_start)
+            if floor is not None and r["timestamp"] < floor:
+                backdated.append({
+                    "index": i,
+                    "error": f"timestamp antérieur à l'état actuel du challenge {r['challenge_id']} ({floor.isoformat()})",
+                })
+        if backdated:
+            raise TradeValidationError(backdated)
+
+        ordered = sorted(rows, key=lambda r: (r["challenge_id"], r["timestamp"]))
+        for challenge_id, trades in groupby(ordered, key=lambda r: r["challenge_id"]):
+            fold_trades(states[challenge_id], list(trades))
+
+        _insert_trades(session, rows)
+        session.execute(
+            update(UserChallenge),
+            [
+                {
+                    "id": st["id"],
+                    "current_equity": st["current_equity"],
+                    "day_start_equity": st["day_start_equity"],
+                    "day_start_date": st["day_start_date"],
+                    "status": st["status"],
+                    "status_changed_at": st["status_changed_at"],
+                    "total_pnl": st["total_pnl"],
+                    "profit_pct": st["total_pnl"] * 100.0 / st["start_balance"] if st["start_balance"] > 0 else 0.0,
+                }
+                for st in states.values()
+            ],
+        )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return {
+        "inserted": len(rows),
+        "challenges": {
+            st["id"]: {
+                "current_equity": st["current_equity"],
+                "status": st["status"].value,
+                "status_changed_at": st["status_changed_at"].isoformat() if st["status_changed_at"] else None,
+            }
+            for st in states.values()
+        },
+    }
@@ -0,0 +1,144 @@
+"""Worker startup: heavy imports up front, optional quote warm-up, latency report.
+
+Some dependencies are imported lazily inside the functions that need them
+(yfinance and pandas for prices and candles, openai / groq for the chat), so
+the first request of each route in every fresh worker used to pay for those
+imports: several seconds right after a deploy. `preload_modules()` imports
+them while the app module loads. Under `gunicorn --preload` that happens once
+in the master and the workers share the pages copy-on-write; otherwise each
+worker pays at boot instead of on a user's request.
+
+`warm_up()` fetches the WARMUP_TICKERS quotes once and publishes them to the
+price cache and refresher, so the first price requests are served from memory
+(the gunicorn config calls it in the master after the preload).
+
+Everything per-connection (database pool, HTTP sessions, SQLite handles) is
+reset in forked children by the modules that own it (os.register_at_fork);
+background threads are started per process by their pid-checked
+ensure_started().
+
+The timings (module imports, app import, warm-up, first request of each
+route in this worker) are served by GET /api/startup/stats.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Flexible imports whether run as a package or a script
+try:
+    from .config import STARTUP_PRELOAD_MODULES, WARMUP_TICKERS
+except ImportError:
+    from config import STARTUP_PRELOAD_MODULES, WARMUP_TICKERS
+
+# Imported lazily by the request path; missing optional ones are reported, not fatal
+HEAVY_MODULES = ("pandas", "yfinance", "openai", "groq", "requests", "bs4")
+
+# Routes whose first request is recorded per worker
+_MAX_ROUTES = 50
+
+
+class StartupReport:
+    """Boot timings of this process and the first request latency of each route."""
+
+    def __init__(self) -> None:
+        self.boot_pid = os.getpid()
+        self.booted_at = time.time()
+        self.pid = self.boot_pid
+        self.started_at = self.booted_at
+        self.modules: Dict[str, Optional[float]] = {}
+        self.app_import: Optional[float] = None
+        self.warmup: Dict[str, object] = {}
+        self.first_requests: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def after_fork(self) -> None:
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.first_requests = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, route: str, elapsed: float) -> None:
+        if route in self.first_requests or len(self.first_requests) >= _MAX_ROUTES:
+            return
+        with self._lock:
+            self.first_requests.setdefault(route, {
+                "ms": round(elapsed * 1e3, 2),
+                "after_start_s": round(time.time() - self.started_at, 3),
+            })
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pid": self.pid,
+            "preloaded": self.pid != self.boot_pid,
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "app_import_ms": round(self.app_import * 1e3, 1) if self.app_import is not None else None,
+            "modules_ms": {k: (round(v * 1e3, 1) if v is not None else None) for k, v in self.modules.items()},
+            "warmup": self.warmup,
+            "first_requests": dict(self.first_requests),
+        }
+
+
+report = StartupReport()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=report.after_fork)
+
+
+def preload_modules(names=HEAVY_MODULES) -> Dict[str, Optional[float]]:
+    """Import `names` now, recording each import time (None when not installed)."""
+    if not STARTUP_PRELOAD_MODULES:
+        return {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            report.modules[name] = None
+            continue
+        report.modules[name] = time.perf_counter() - started
+    return report.modules
+
+
+def warm_up(tickers: Optional[List[str]] = None) -> Dict[str, object]:
+    """Fetch hot quotes once (cache + refresher) so first price requests don't wait on upstreams."""
+    try:
+        from .market_data import get_prices
+        from .price_refresher import price_refresher
+    except ImportError:
+        from market_data import get_prices
+        from price_refresher import price_refresher
+
+    tickers = tickers if tickers is not None else [t.strip().upper() for t in WARMUP_TICKERS.split(",") if t.strip()]
+    if not tickers:
+        return {}
+    started = time.perf_counter()
+    prices, errors = get_prices(tickers)
+    for ticker, price in prices.items():
+        price_refresher.touch(ticker)
+        price_refresher.publish(ticker, price)
+    report.warmup = {
+        "ms": round((time.perf_counter() - started) * 1e3, 1),
+        "tickers": sorted(prices),
+        "errors": errors,
+    }
+    return report.warmup
+
+
+def init_app(app) -> None:
+    """Record the latency of the first request of each route in this process."""
+    from flask import g, request
+
+    @app.before_request
+    def _startup_begin() -> None:
+        g.startup_started = time.perf_counter()
+
+    @app.teardown_request
+    def _startup_end(exc) -> None:
+        started = g.get("startup_started")
+        if started is not None and request.url_rule is not None:
+            report.record_request(request.url_rule.rule, time.perf_counter() - started)
@@ -5,7 +5,15 @@ export default function AIChat({ isOpen = false, onClose }) {
     { from: 'ai', text: 'Bonjour, comment puis-je vous aider ?' },
   ])
   const [input, setInput] = useState('')
+  const [streaming, setStreaming] = useState(false)
   const boxRef = useRef(null)
+  const abortRef = useRef(null)
+
+  // Coupe la génération en cours (et donc l’appel au fournisseur) à la fermeture
+  useEffect(() => {
+    if (!isOpen && abortRef.current) abortRef.current.abort()
+  }, [isOpen])
+  useEffect(() => () => abortRef.current?.abort(), [])
 
   useEffect(() => {
     if (boxRef.current) {
@@ -15,31 +23,62 @@ export default function AIChat({ isOpen = false, onClose }) {
 
   if (!isOpen) return null
 
+  const fallback = "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."
+
+  const appendToReply = (delta) => {
+    setMessages((m) => {
+      const last = m[m.length - 1]
+      return [...m.slice(0, -1), { ...last, text: last.text + delta }]
+    })
+  }
+
   const send = async () => {
     const text = input.trim()
-    if (!text) return
-    setMessages((m) => [...m, { from: 'user', text }])
+    if (!text || streaming) return
+    setMessages((m) => [...m, { from: 'user', text }, { from: 'ai', text: '' }])
     setInput('')
+    setStreaming(true)
+    const controller = new AbortController()
+    abortRef.current = controller
+    let received = false
     try {
       const res = await fetch('/api/chat', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: text }),
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+        body: JSON.stringify({ message: text, stream: true }),
+        signal: controller.signal,
       })
-      const j = await res.json().catch(() => ({}))
-      const reply = j?.reply || "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous..."
-      setMessages((m) => [...m, { from: 'ai', text: reply }])
-    } catch {
-      setTimeout(() => {
-        setMessages((m) => [
-          ...m,
-          {
-            from: 'ai',
-            text: "Je suis TradeSense AI, j'analyse actuellement les graphiques pour vous...",
-          },
-        ])
-      }, 1000)
+      if (!res.ok || !res.body) throw new Error('chat indisponible')
+      // Réponse en SSE : événements "token" ({t}) puis "done"
+      const reader = res.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop()
+        for (const evt of events) {
+          const lines = evt.split('\n')
+          const type = lines.find((l) => l.startsWith('event: '))?.slice(7)
+          const data = lines.find((l) => l.startsWith('data: '))?.slice(6)
+          if (type === 'token' && data) {
+            const t = JSON.parse(data).t || ''
+            if (t) {
+              received = true
+              appendToReply(t)
+            }
+          }
+        }
+      }
+    } catch (e) {
+      if (e?.name === 'AbortError') return
+    } finally {
+      if (abortRef.current === controller) abortRef.current = null
+      setStreaming(false)
     }
+    if (!received) appendToReply(fallback)
   }
 
   return (
@@ -80,7 +119,8 @@ export default function AIChat({ isOpen = false, onClose }) {
         />
         <button
           onClick={send}
-          className="rounded-md bg-sky-600 px-3 py-2 text-white hover:bg-sky-500"
+          disabled={streaming}
+          className="rounded-md bg-sky-600 px-3 py-2 text-white hover:bg-sky-500 disabled:opacity-50"
         >
           Envoyer
         </button>
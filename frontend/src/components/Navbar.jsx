@@ -17,9 +17,10 @@ export default function Navbar() {
     const load = async () => {
       if (!isLoggedIn || username) return
       try {
-        const res = await fetch('/api/users')
+        const res = await fetch(`/api/users?id=${encodeURIComponent(userId)}`)
         const j = await res.json()
-        const u = Array.isArray(j) ? j.find((r) => String(r.id) === String(userId)) : null
+        const rows = Array.isArray(j) ? j : (j?.users || [])
+        const u = rows.find((r) => String(r.id) === String(userId))
         const name = u?.name || ''
         if (active && name) {
           localStorage.setItem('username', name)
@@ -35,6 +36,7 @@ export default function Navbar() {
     localStorage.removeItem('auth')
     localStorage.removeItem('user_id')
     localStorage.removeItem('role')
+    localStorage.removeItem('token')
     localStorage.removeItem('username')
     navigate('/')
   }
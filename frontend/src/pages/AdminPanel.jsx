@@ -4,6 +4,9 @@ export default function AdminPanel() {
   const [users, setUsers] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [search, setSearch] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [showPaypal, setShowPaypal] = useState(false)
   const [paypalClientId, setPaypalClientId] = useState('')
   const [paypalSecret, setPaypalSecret] = useState('')
@@ -11,18 +14,33 @@ export default function AdminPanel() {
   const role = (localStorage.getItem('role') || '').toLowerCase()
   const isSuperAdmin = role === 'superadmin'
 
+  const fetchUsers = async (q, cursor) => {
+    const params = new URLSearchParams({ limit: '50' })
+    if (q) params.set('q', q)
+    if (cursor) params.set('cursor', cursor)
+    const res = await fetch(`/api/users?${params}`)
+    if (!res.ok) throw new Error('Erreur de chargement des utilisateurs')
+    const json = await res.json()
+    return Array.isArray(json)
+      ? { users: json, next_cursor: null }
+      : { users: json?.users || [], next_cursor: json?.next_cursor || null }
+  }
+
   useEffect(() => {
     let isMounted = true
     const load = async () => {
+      setLoading(true)
       try {
-        const res = await fetch('/api/users')
-        if (!res.ok) throw new Error('Erreur de chargement des utilisateurs')
-        const json = await res.json()
-        if (isMounted) setUsers(Array.isArray(json) ? json : (json?.users || []))
+        const page = await fetchUsers(search.trim(), null)
+        if (isMounted) {
+          setUsers(page.users)
+          setNextCursor(page.next_cursor)
+        }
       } catch {
         // Fallback mock data si l’API n’est pas prête
         if (isMounted) {
           setError('Impossible de contacter l’API, affichage de données simulées.')
+          setNextCursor(null)
           setUsers([
             { id: 1, name: 'Alice', email: 'alice@example.com', status: 'active', role: 'user' },
             { id: 2, name: 'Bob', email: 'bob@example.com', status: 'failed', role: 'user' },
@@ -33,9 +51,24 @@ export default function AdminPanel() {
         if (isMounted) setLoading(false)
       }
     }
-    load()
-    return () => { isMounted = false }
-  }, [])
+    // Petite temporisation pour ne pas interroger l’API à chaque frappe
+    const timer = setTimeout(load, search ? 300 : 0)
+    return () => { isMounted = false; clearTimeout(timer) }
+  }, [search])
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await fetchUsers(search.trim(), nextCursor)
+      setUsers((prev) => [...prev, ...page.users])
+      setNextCursor(page.next_cursor)
+    } catch {
+      setError('Impossible de charger la page suivante.')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   const handleSavePaypal = () => {
     // Simulation d’enregistrement
@@ -64,7 +97,17 @@ export default function AdminPanel() {
           <div className="mt-4 rounded-md bg-amber-500/15 px-4 py-2 text-amber-300 ring-1 ring-amber-500/30">{error}</div>
         )}
 
-        <div className="mt-6 rounded-xl bg-slate-800 ring-1 ring-white/10 overflow-x-auto">
+        <div className="mt-6">
+          <input
+            type="search"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            className="w-full sm:w-80 rounded-md border border-slate-700 bg-slate-800 text-white px-3 py-2 focus:outline-none focus:ring-2 focus:ring-sky-600"
+            placeholder="Rechercher par nom ou email"
+          />
+        </div>
+
+        <div className="mt-4 rounded-xl bg-slate-800 ring-1 ring-white/10 overflow-x-auto">
           <table className="min-w-full divide-y divide-slate-700">
             <thead className="bg-slate-800">
               <tr>
@@ -103,6 +146,18 @@ export default function AdminPanel() {
           </table>
         </div>
 
+        {nextCursor && !loading && (
+          <div className="mt-4 flex justify-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="rounded-md border border-slate-700 px-4 py-2 text-slate-300 hover:bg-slate-800 disabled:opacity-50"
+            >
+              {loadingMore ? 'Chargement...' : 'Charger plus'}
+            </button>
+          </div>
+        )}
+
         {showPaypal && (
           <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/40">
             <div className="w-full max-w-md rounded-lg bg-slate-900 p-6 shadow-lg ring-1 ring-white/10">
@@ -49,27 +49,53 @@ export default function Dashboard() {
 
   useEffect(() => {
     let mounted = true
+    let pollId = null
+    let source = null
+    const applyQuote = (ticker, price) => {
+      if (!mounted || !price) return
+      if (ticker === 'BTC-USD') setBtcPrice(Number(price))
+      if (ticker === 'IAM') setIamPrice(Number(price))
+    }
     const fetchPrices = async () => {
       try {
-        const [btcRes, iamRes] = await Promise.all([
-          fetch('/api/price/BTC-USD'),
-          fetch('/api/price/IAM'),
-        ])
-        const btcJson = await btcRes.json()
-        const iamJson = await iamRes.json()
-        if (!mounted) return
-        if (btcJson.price) setBtcPrice(Number(btcJson.price))
-        if (iamJson.price) setIamPrice(Number(iamJson.price))
+        const res = await fetch('/api/prices?tickers=BTC-USD,IAM')
+        const json = await res.json()
+        const prices = json?.prices || {}
+        Object.entries(prices).forEach(([ticker, q]) => applyQuote(ticker, q?.price))
       } catch {
         setIamPrice((v) => v ?? null)
         setBtcPrice((v) => v ?? null)
       }
     }
-    fetchPrices()
-    const id = setInterval(fetchPrices, 5000)
+    const startPolling = () => {
+      if (pollId) return
+      fetchPrices()
+      pollId = setInterval(fetchPrices, 5000)
+    }
+    // Prefer server push; fall back to polling if the stream is unavailable
+    if (typeof window.EventSource === 'function') {
+      source = new EventSource('/api/stream/prices?tickers=BTC-USD,IAM')
+      source.addEventListener('price', (e) => {
+        try {
+          const q = JSON.parse(e.data)
+          applyQuote(q.ticker, q.price)
+        } catch {
+          // ignore malformed event
+        }
+      })
+      source.onerror = () => {
+        if (source && source.readyState === EventSource.CLOSED) {
+          source = null
+          startPolling()
+        }
+      }
+    } else {
+      startPolling()
+    }
     return () => {
       mounted = false
-      clearInterval(id)
+      if (source) source.close()
+      if (pollId) clearInterval(pollId)
     }
   }, [])
 
@@ -20,6 +20,8 @@ export default function Login() {
       if (!userId) throw new Error('Identifiants incorrects')
       localStorage.setItem('user_id', String(userId))
       if (role) localStorage.setItem('role', role)
+      // Jeton signé (en-tête "Authorization: Bearer ...") pour les routes protégées
+      if (res?.data?.token) localStorage.setItem('token', res.data.token)
       const auth = { user_id: String(userId), role, logged_in: true }
       localStorage.setItem('auth', JSON.stringify(auth))
       navigate('/dashboard')